@@ -0,0 +1,83 @@
+"""Compare importing an export with `timet import` with inserting the same tasks one by one, like
+a script, which replays them with the models, does.
+
+usage: python benchmarks/bulk_import.py [--tasks N [N ...]] [--replayed N]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import create_database
+from timetracker.models import Project, Tag, Task, TaskToTag, db, init_db
+from timetracker.settings import load_settings
+from timetracker.time_utils import DatetimeParser
+
+RUN = "import sys; from timetracker.main import app; sys.argv = ['timet', *sys.argv[1:]]; app()"
+
+
+def timet(*args: str) -> None:
+    subprocess.run([sys.executable, "-c", RUN, *args], stdout=subprocess.DEVNULL, check=True)
+
+
+def measure_import(database: Path, export: Path) -> float:
+    create_database(database, 0)
+    start = time.perf_counter()
+    timet("-d", str(database), "import", "ndjson", str(export))
+    return time.perf_counter() - start
+
+
+def measure_replay(database: Path, export: Path, count: int) -> float:
+    # every task and tag is inserted in its own transaction, like each command does
+    create_database(database, 0)
+    init_db(database)
+    parser = DatetimeParser(load_settings().tz)
+    with export.open("r", encoding="utf-8") as file:
+        rows = [json.loads(line) for _, line in zip(range(count), file)]
+    start = time.perf_counter()
+    for row in rows:
+        project, _ = Project.get_or_create(
+            name=row["project"], defaults={"start": parser.parse(row["start"])}
+        )
+        task = Task.create(
+            name=row["task"],
+            note=row["note"],
+            start=parser.parse(row["start"]),
+            end=parser.parse(row["end"]),
+            project=project,
+        )
+        for tag in (row["task_tags"] or "").split(","):
+            TaskToTag.create(task=task, tag=Tag.get_or_create(name=tag)[0])
+    duration = time.perf_counter() - start
+    db.close()
+    return duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--replayed", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = Path(directory).joinpath("source.db")
+        target = Path(directory).joinpath("target.db")
+        export = Path(directory).joinpath("export.ndjson")
+
+        print(f"{'tasks':>10}{'import (s)':>12}{'import (rows/s)':>18}{'one by one (rows/s)':>22}")
+        for tasks in args.tasks:
+            create_database(source, tasks)
+            timet("-d", str(source), "export", "ndjson", "-o", str(export))
+            import_time = measure_import(target, export)
+            replay_time = measure_replay(target, export, min(args.replayed, tasks))
+            print(
+                f"{tasks:>10}{import_time:>12.2f}{tasks / import_time:>18,.0f}"
+                f"{min(args.replayed, tasks) / replay_time:>22,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare concurrent readers and a writer in rollback-journal mode and in WAL mode.
+
+The readers repeatedly run the export query inside a transaction, like a long recap session,
+while the writer starts and stops tasks, like `timet start`/`timet stop` from another terminal.
+In rollback-journal mode all connections are opened for writing, like before, while in WAL mode
+the readers use the read-only connections of the reporting commands.
+
+usage: python benchmarks/concurrency.py [--tasks N] [--readers N] [--seconds N]
+"""
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from peewee import OperationalError
+from synthetic import create_database
+from timetracker.models import Task, db, init_db
+from timetracker.queries import get_export_query
+
+
+def open_database(path: Path, mode: str, readonly: bool) -> None:
+    if mode == "wal":
+        init_db(path, readonly=readonly)
+    else:
+        db.init(path, pragmas={"foreign_keys": 1, "journal_mode": "delete"})
+
+
+def reader(path: Path, mode: str, deadline: float, results: multiprocessing.Queue) -> None:
+    open_database(path, mode, readonly=True)
+    queries = 0
+    errors = 0
+    while time.time() < deadline:
+        try:
+            with db:
+                for _ in get_export_query().tuples().iterator():
+                    pass
+            queries += 1
+        except OperationalError:
+            errors += 1
+    results.put(("reader", queries, errors))
+
+
+def writer(path: Path, mode: str, deadline: float, results: multiprocessing.Queue) -> None:
+    open_database(path, mode, readonly=False)
+    latencies = []
+    errors = 0
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            with db:
+                task = Task.create(name="benchmark", start=datetime.utcnow(), project=1)
+            with db:
+                Task.update(end=datetime.utcnow()).where(Task.id == task.id).execute()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            errors += 1
+        time.sleep(0.05)
+    results.put(("writer", latencies, errors))
+
+
+def run(path: Path, mode: str, readers: int, seconds: float) -> None:
+    deadline = time.time() + seconds
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=reader, args=(path, mode, deadline, results))
+        for _ in range(readers)
+    ]
+    processes.append(multiprocessing.Process(target=writer, args=(path, mode, deadline, results)))
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    reads = sum(outcome[1] for outcome in outcomes if outcome[0] == "reader")
+    read_errors = sum(outcome[2] for outcome in outcomes if outcome[0] == "reader")
+    _, latencies, write_errors = next(outcome for outcome in outcomes if outcome[0] == "writer")
+    writes = len(latencies)
+    latencies = sorted(latency * 1000 for latency in latencies) or [float("nan")]
+    print(
+        f"{mode:<10}{reads:>8}{read_errors:>8}{writes:>8}{write_errors:>8}"
+        f"{statistics.median(latencies):>10.1f}"
+        f"{latencies[int(len(latencies) * 0.95)]:>10.1f}{latencies[-1]:>10.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("benchmark.db")
+        print(
+            f"{'mode':<10}{'reads':>8}{'errors':>8}{'writes':>8}{'errors':>8}"
+            f"{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}"
+        )
+        for mode in ["rollback", "wal"]:
+            create_database(path, args.tasks)
+            if mode == "rollback":
+                db.init(path)
+                db.execute_sql("PRAGMA journal_mode = delete")
+                db.close()
+            run(path, mode, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
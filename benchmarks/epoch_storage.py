@@ -0,0 +1,106 @@
+"""Compare datetimes stored as integer seconds since the epoch with the ISO text, in which they
+used to be stored: the size of the database, a range scan and a sum over all durations in SQLite
+and loading the datetimes into Python.
+
+usage: python benchmarks/epoch_storage.py [--tasks N] [--runs N]
+"""
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from synthetic import create_database
+from timetracker.migrations import DATETIME_TRIGGERS
+from timetracker.models import IsoDateTimeField, Task
+
+RANGE = ("2018-01-01 00:00:00", "2018-12-31 23:59:59")
+EPOCH_RANGE = (1514764800, 1546300799)
+
+
+def convert_to_text(path: Path) -> None:
+    # the triggers would read the text as seconds
+    connection = sqlite3.connect(path)
+    for trigger in DATETIME_TRIGGERS:
+        connection.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+    connection.execute(
+        """UPDATE "task" SET "start" = datetime("start", 'unixepoch'), """
+        """"end" = datetime("end", 'unixepoch')"""
+    )
+    connection.execute("""UPDATE "project" SET "start" = datetime("start", 'unixepoch')""")
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        epoch_path = Path(directory).joinpath("epoch.db")
+        text_path = Path(directory).joinpath("text.db")
+        create_database(epoch_path, args.tasks)
+        connection = sqlite3.connect(epoch_path)
+        connection.execute("VACUUM")
+        connection.close()
+        shutil.copy(epoch_path, text_path)
+        convert_to_text(text_path)
+
+        epoch = sqlite3.connect(epoch_path)
+        text = sqlite3.connect(text_path)
+        # all tasks of a year, which are found by the index on the start
+        range_sql = 'SELECT COUNT(*), MAX("end") FROM "task" WHERE "start" BETWEEN ? AND ?'
+        rows = [
+            (
+                "size (MB)",
+                text_path.stat().st_size / 1e6,
+                epoch_path.stat().st_size / 1e6,
+            ),
+            (
+                "range (ms)",
+                measure(lambda: text.execute(range_sql, RANGE).fetchone(), args.runs),
+                measure(lambda: epoch.execute(range_sql, EPOCH_RANGE).fetchone(), args.runs),
+            ),
+            (
+                "sum (ms)",
+                measure(lambda: text.execute(
+                    'SELECT SUM(julianday("end") - julianday("start")) * 86400 FROM "task"'
+                ).fetchone(), args.runs),
+                measure(lambda: epoch.execute(
+                    'SELECT SUM("end" - "start") FROM "task"'
+                ).fetchone(), args.runs),
+            ),
+        ]
+        text_values = [value for value, in text.execute('SELECT "start" FROM "task"')]
+        epoch_values = [value for value, in epoch.execute('SELECT "start" FROM "task"')]
+        # the field, which read the text before
+        text_field = IsoDateTimeField()
+        rows.append((
+            "python (ms)",
+            measure(lambda: [text_field.python_value(value) for value in text_values], args.runs),
+            measure(lambda: [Task.start.python_value(value) for value in epoch_values], args.runs),
+        ))
+        text.close()
+        epoch.close()
+
+        print(f"{'':<14}{'text':>10}{'epoch':>10}")
+        for name, text_result, epoch_result in rows:
+            print(f"{name:<14}{text_result:>10.2f}{epoch_result:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
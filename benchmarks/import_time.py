@@ -0,0 +1,105 @@
+"""Measure the cold-start budget of each subcommand with `python -X importtime`.
+
+Every command is run in a fresh interpreter against a fresh copy of a throwaway database, with or
+without a running task, so that each run takes the same path. The script reports the
+cumulative import time, the wall time of the whole process and which of the heavy dependencies
+have been loaded.
+
+usage: python benchmarks/import_time.py [--runs N]
+"""
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HEAVY_MODULES = ["peewee", "pydantic", "rich.live", "textual"]
+# each command with whether a task has to be running for it
+COMMANDS = [
+    (["--help"], False),
+    (["start", "--help"], False),
+    (["start", "benchmark", "Default"], False),
+    (["status", "-d", "raw"], True),
+    (["stop"], True),
+    (["list", "-r"], False),
+    (["recap", "1/1/1990"], False),
+]
+SETUP = """
+from datetime import datetime
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Project, Task, db
+db.init(r"{path}", pragmas={{"foreign_keys": 1}})
+with db:
+    db.create_tables(MODELS)
+    migrate(db)
+    Project.create(name="Default", start=datetime.utcnow())
+    if {running}:
+        Task.create(name="benchmark", start=datetime.utcnow(), project=1)
+"""
+RUN = "import sys; from timetracker.main import app; sys.argv = ['timet', *sys.argv[1:]]; app()"
+
+
+def parse_importtime(stderr: str) -> tuple[int, set[str]]:
+    total = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.add(name.strip())
+        # only top-level imports are summed, as the nested ones are part of their cumulative time
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total, modules
+
+
+def run_command(db_path: Path, args: list[str]) -> tuple[int, float, set[str]]:
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN, "-d", str(db_path), *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    wall_time = time.perf_counter() - start
+    import_time, modules = parse_importtime(process.stderr)
+    return import_time, wall_time, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory).joinpath("benchmark.db")
+        templates = {}
+        for running in [False, True]:
+            templates[running] = Path(directory).joinpath(f"template_{running}.db")
+            setup = SETUP.format(path=templates[running], running=running)
+            subprocess.run([sys.executable, "-c", setup], check=True)
+
+        print(f"{'command':<28}{'imports (ms)':>14}{'wall (ms)':>12}  heavy modules")
+        for command, running in COMMANDS:
+            import_times = []
+            wall_times = []
+            for _ in range(args.runs):
+                # e.g. a second start or stop in a row would only time the error
+                shutil.copyfile(templates[running], db_path)
+                import_time, wall_time, modules = run_command(db_path, command)
+                import_times.append(import_time / 1000)
+                wall_times.append(wall_time * 1000)
+            heavy = [module for module in HEAVY_MODULES if module in modules]
+            print(
+                f"{' '.join(command):<28}"
+                f"{statistics.median(import_times):>14.1f}"
+                f"{statistics.median(wall_times):>12.1f}"
+                f"  {', '.join(heavy) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
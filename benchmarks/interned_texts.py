@@ -0,0 +1,109 @@
+"""Compare the task table with interned names and notes with a copy, which stores them inline on
+every row, as it used to: the size of the task table, grouping the tasks by name and reading all
+tasks like `export`.
+
+usage: python benchmarks/interned_texts.py [--tasks N] [--runs N]
+"""
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import create_database
+
+INTERNED_QUERIES = {
+    "group": (
+        'SELECT (SELECT "text" FROM "task_text" WHERE "id" = t."name_id"), COUNT(*), '
+        'SUM(t."end" - t."start") FROM "task" AS t GROUP BY t."name_id" ORDER BY 1'
+    ),
+    "export": (
+        'SELECT t."id", n."text", o."text", t."start", t."end" FROM "task" AS t '
+        'JOIN "task_text" AS n ON n."id" = t."name_id" '
+        'LEFT JOIN "task_text" AS o ON o."id" = t."note_id" ORDER BY t."start"'
+    ),
+}
+INLINE_QUERIES = {
+    "group": (
+        'SELECT "name", COUNT(*), SUM("end" - "start") FROM "task" GROUP BY "name" ORDER BY 1'
+    ),
+    "export": 'SELECT "id", "name", "note", "start", "end" FROM "task" ORDER BY "start"',
+}
+
+
+def store_inline(path: Path) -> None:
+    # the columns of foreign keys can't be dropped, so the task table is copied instead
+    connection = sqlite3.connect(path)
+    connection.execute(
+        'CREATE TABLE "task_inline" ("id" INTEGER NOT NULL PRIMARY KEY, '
+        '"name" VARCHAR(255) NOT NULL, "note" VARCHAR(255), "start" INTEGER NOT NULL, '
+        '"end" INTEGER, "target" INTEGER, "project_id" INTEGER NOT NULL, '
+        '"created_at" DATETIME, "updated_at" DATETIME)'
+    )
+    connection.execute(
+        'INSERT INTO "task_inline" SELECT t."id", n."text", o."text", t."start", t."end", '
+        't."target", t."project_id", t."created_at", t."updated_at" FROM "task" AS t '
+        'JOIN "task_text" AS n ON n."id" = t."name_id" '
+        'LEFT JOIN "task_text" AS o ON o."id" = t."note_id"'
+    )
+    connection.execute('DROP TABLE "task"')
+    # otherwise the triggers of the link tables, which refer to the dropped table, fail the rename
+    connection.execute("PRAGMA legacy_alter_table = ON")
+    connection.execute('ALTER TABLE "task_inline" RENAME TO "task"')
+    connection.execute('CREATE INDEX "task_start" ON "task" ("start")')
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def get_table_size(connection: sqlite3.Connection) -> float:
+    # the pages of the task table itself, without its indexes
+    size = connection.execute('SELECT SUM("pgsize") FROM "dbstat" WHERE "name" = ?', ("task",))
+    return size.fetchone()[0] / 1e6
+
+
+def measure(connection: sqlite3.Connection, sql: str, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        connection.execute(sql).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        interned_path = Path(directory).joinpath("interned.db")
+        inline_path = Path(directory).joinpath("inline.db")
+        create_database(interned_path, args.tasks)
+        connection = sqlite3.connect(interned_path)
+        connection.execute("VACUUM")
+        connection.close()
+        shutil.copy(interned_path, inline_path)
+        store_inline(inline_path)
+
+        interned = sqlite3.connect(interned_path)
+        inline = sqlite3.connect(inline_path)
+        print(f"{'':<14}{'inline':>10}{'interned':>10}")
+        inline_size, interned_size = get_table_size(inline), get_table_size(interned)
+        print(f"{'table (MB)':<14}{inline_size:>10.2f}{interned_size:>10.2f}")
+        for name, sql in INTERNED_QUERIES.items():
+            inline_time = measure(inline, INLINE_QUERIES[name], args.runs)
+            interned_time = measure(interned, sql, args.runs)
+            print(f"{name + ' (ms)':<14}{inline_time:>10.2f}{interned_time:>10.2f}")
+        assert (
+            interned.execute(INTERNED_QUERIES["group"]).fetchall()
+            == inline.execute(INLINE_QUERIES["group"]).fetchall()
+        )
+        interned.close()
+        inline.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare rendering each attribute of a recap layout cell by cell through the if/elif chain,
+like before, with the compiled renderers.
+
+usage: python benchmarks/layout_rendering.py [--tasks N] [--runs N]
+"""
+import argparse
+import random
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import get_args
+from zoneinfo import ZoneInfo
+
+from timetracker.layout import compile_column, render_rows
+from timetracker.queries import TaskRow
+from timetracker.settings import Column
+from timetracker.time_utils import format_seconds, to_aware_string
+
+TZ = ZoneInfo("Europe/Zurich")
+
+
+def old_render_cell(task: TaskRow, column: Column) -> str:
+    if column.attribute == "project":
+        return task.project
+    elif column.attribute == "task":
+        return task.name
+    elif column.attribute == "note":
+        return task.note
+    elif column.attribute == "start":
+        format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
+        return to_aware_string(task.start, TZ, format_spec)
+    elif column.attribute == "end":
+        format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
+        return to_aware_string(task.end, TZ, format_spec)
+    elif column.attribute == "target":
+        format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
+        return to_aware_string(task.target, TZ, format_spec)
+    elif column.attribute == "duration":
+        delta = task.end - task.start
+        return format_seconds(delta.total_seconds())
+    elif column.attribute == "id":
+        return str(task.id_)
+    elif column.attribute == "task_tags":
+        return task.task_tags
+    elif column.attribute == "project_tags":
+        return task.project_tags
+    raise ValueError
+
+
+def create_tasks(count: int) -> list[TaskRow]:
+    rng = random.Random(0)
+    tasks = []
+    current = datetime(2015, 1, 1, 8)
+    for i in range(1, count + 1):
+        end = current + timedelta(minutes=rng.randint(5, 240))
+        target = current + timedelta(hours=2) if rng.random() < 0.2 else None
+        tasks.append(TaskRow(
+            i, f"project {i % 20}", "tag 1,tag 2", f"task {i % 300}", "tag 3", None, current, end,
+            target,
+        ))
+        current = end + timedelta(minutes=rng.randint(0, 120))
+    return tasks
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    tasks = create_tasks(args.tasks)
+    attributes = get_args(Column.model_fields["attribute"].annotation)
+    columns = [Column(attribute=attribute) for attribute in attributes]
+
+    print(f"{'attribute':<14}{'if/elif (ms)':>14}{'compiled (ms)':>15}{'speedup':>10}")
+    for column in [*columns, None]:
+        layout = columns if column is None else [column]
+        old_time = measure(
+            lambda layout=layout: [[old_render_cell(task, c) for c in layout] for task in tasks],
+            args.runs,
+        )
+        renderers = [compile_column(c, TZ) for c in layout]
+        new_time = measure(
+            lambda renderers=renderers: list(render_rows(renderers, tasks)), args.runs
+        )
+        name = "all" if column is None else column.attribute
+        print(f"{name:<14}{old_time:>14.1f}{new_time:>15.1f}{old_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
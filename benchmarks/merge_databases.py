@@ -0,0 +1,58 @@
+"""Compare `timet merge` with exporting a database and importing it into another one, and the
+export of two attached databases with the export of one database, which holds the same tasks.
+
+usage: python benchmarks/merge_databases.py [--tasks N [N ...]]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import create_database
+
+RUN = "import sys; from timetracker.main import app; sys.argv = ['timet', *sys.argv[1:]]; app()"
+
+
+def timet(*args: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", RUN, *args], stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        first = Path(directory).joinpath("first.db")
+        second = Path(directory).joinpath("second.db")
+        export = Path(directory).joinpath("export.ndjson")
+
+        print(
+            f"{'tasks':>10}{'merge (s)':>12}{'export + import (s)':>22}"
+            f"{'union export (s)':>19}{'merged export (s)':>20}"
+        )
+        for tasks in args.tasks:
+            # both databases hold half of the tasks, the projects and tags have the same names
+            create_database(second, tasks // 2, seed=1)
+            create_database(first, tasks // 2)
+            union_time = timet(
+                "-d", str(first), "-d", str(second), "export", "ndjson", "-o", str(export)
+            )
+            merge_time = timet("-d", str(first), "merge", str(second))
+            merged_time = timet("-d", str(first), "export", "ndjson", "-o", str(export))
+
+            create_database(first, tasks // 2)
+            import_time = timet("-d", str(second), "export", "ndjson", "-o", str(export))
+            import_time += timet("-d", str(first), "import", "ndjson", str(export))
+            print(
+                f"{tasks:>10}{merge_time:>12.2f}{import_time:>22.2f}"
+                f"{union_time:>19.2f}{merged_time:>20.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
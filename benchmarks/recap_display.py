@@ -0,0 +1,57 @@
+"""Measure how long the recap display takes to show its first page and how much memory it holds
+after jumping through the whole history, for growing numbers of tasks.
+
+usage: python benchmarks/recap_display.py [--tasks N [N ...]]
+"""
+import argparse
+import asyncio
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from synthetic import create_database
+from timetracker.models import init_db
+from timetracker.queries import get_recap_query
+from timetracker.settings import load_settings
+from timetracker.tui import RecapDisplay, RecapTable
+
+
+async def measure(tasks: int) -> tuple[float, float]:
+    settings = load_settings().model_copy(update={"show_total": True, "sections": "days"})
+    app = RecapDisplay(get_recap_query(None, None, [], []), settings, False)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    async with app.run_test(size=(120, 40)) as pilot:
+        table = app.query_one(RecapTable)
+        while 0 not in table.pages:
+            await pilot.pause(0.001)
+        first_page = time.perf_counter() - start
+        for row in [tasks // 2, tasks // 4, tasks - 1, 0]:
+            table.scroll_to(y=row, animate=False)
+            await pilot.pause(0.5)
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return first_page * 1000, memory / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000, 300_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("benchmark.db")
+        print(f"{'tasks':>8}{'first page (ms)':>18}{'memory (MB)':>14}")
+        for tasks in args.tasks:
+            create_database(path, tasks)
+            init_db(path, readonly=True)
+            first_page, memory = asyncio.run(measure(tasks))
+            print(f"{tasks:>8}{first_page:>18.0f}{memory:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare the old `BETWEEN ... OR BETWEEN` recap filter with the R*Tree interval filter.
+
+usage: python benchmarks/recap_range.py [--tasks N] [--runs N]
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from peewee import ModelSelect
+from synthetic import create_database
+from timetracker.models import Task, db
+from timetracker.queries import get_recap_query, get_task_query
+
+RANGES = {
+    "day": (datetime(2018, 6, 1), datetime(2018, 6, 1, 23, 59, 59)),
+    "month": (datetime(2018, 6, 1), datetime(2018, 6, 30, 23, 59, 59)),
+    "year": (datetime(2018, 1, 1), datetime(2018, 12, 31, 23, 59, 59)),
+}
+
+
+def old_recap_query(start: datetime, end: datetime) -> ModelSelect:
+    return (get_task_query().where(Task.end.is_null(False))
+                            .where(Task.start.between(start, end) | Task.end.between(start, end))
+                            .order_by(Task.start))
+
+
+def measure(query: ModelSelect, runs: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = len(list(query.clone().tuples()))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("benchmark.db")
+        create_database(path, args.tasks)
+        db.init(path)
+
+        print(f"{'range':<8}{'rows':>8}{'old (ms)':>12}{'r*tree (ms)':>14}")
+        with db:
+            for name, (start, end) in RANGES.items():
+                old_time, old_rows = measure(old_recap_query(start, end), args.runs)
+                new_time, new_rows = measure(
+                    get_recap_query((start, end), None, [], []), args.runs
+                )
+                # the old filter misses the tasks that span the whole range
+                print(f"{name:<8}{new_rows:>8}{old_time:>12.1f}{new_time:>14.1f}")
+                assert new_rows >= old_rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the time and memory, which it takes to read the tasks of recap and export as models
+with a joined project, like before, and as plain named tuples.
+
+usage: python benchmarks/recap_rows.py [--tasks N] [--runs N]
+"""
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import MethodType
+
+from peewee import DateTimeField, ModelSelect, fn
+from synthetic import create_database
+from timetracker.models import Project, ProjectToTag, Tag, Task, TaskToTag, db
+from timetracker.queries import get_export_query
+
+
+def old_export_query() -> ModelSelect:
+    task_tags = (TaskToTag.select(fn.GROUP_CONCAT(Tag.name))
+                          .join(Tag)
+                          .where(TaskToTag.task_id == Task.id))
+    project_tags = (ProjectToTag.select(fn.GROUP_CONCAT(Tag.name))
+                                .join(Tag)
+                                .where(ProjectToTag.project_id == Project.id))
+    return (Task.select(Task, Project, task_tags.alias("task_tags"),
+                        project_tags.alias("project_tags"))
+                .join(Project)
+                .order_by(Task.start))
+
+
+@contextmanager
+def strptime_datetimes(enabled: bool) -> Iterator[None]:
+    # the datetimes used to be converted by peewee's DateTimeField, which tries its formats with
+    # strptime, instead of fromisoformat
+    fields = [Task.start, Task.end, Task.target]
+    if enabled:
+        for field in fields:
+            field.adapt = MethodType(DateTimeField.adapt, field)
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.__dict__.pop("adapt", None)
+
+
+def measure_time(query: ModelSelect, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in query.clone():
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_memory(query: ModelSelect) -> float:
+    # the memory held by all rows at once, like the list that the JSON export builds
+    gc.collect()
+    tracemalloc.start()
+    rows = list(query.clone())
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    return memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("benchmark.db")
+        create_database(path, args.tasks)
+        db.init(path)
+
+        per_100k = 100_000 / args.tasks
+        print(f"{'rows':<22}{'time / 100k (s)':>18}{'memory / 100k (MB)':>21}")
+        with db:
+            for name, query, strptime in [
+                ("models, strptime", old_export_query(), True),
+                ("models", old_export_query(), False),
+                ("named tuples", get_export_query(), False),
+            ]:
+                with strptime_datetimes(strptime):
+                    seconds = measure_time(query, args.runs)
+                    memory = measure_memory(query)
+                print(f"{name:<22}{seconds * per_100k:>18.2f}{memory * per_100k / 1e6:>21.1f}")
+
+if __name__ == "__main__":
+    main()
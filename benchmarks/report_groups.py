@@ -0,0 +1,75 @@
+"""Compare the grouped totals of `report`, which SQLite adds up, with loading all tasks and adding
+up their durations in Python, as the total of the recap used to be computed.
+
+usage: python benchmarks/report_groups.py [--tasks N] [--runs N]
+"""
+import argparse
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from synthetic import create_database
+from timetracker.models import db
+from timetracker.queries import get_recap_query, get_report_query
+
+GROUPS = [["project"], ["month", "project"], ["day"], ["task", "project"], ["tag"]]
+
+
+def python_report(groups: list[str]) -> int:
+    keys: dict[str, Callable] = {
+        "project": lambda task: task.project,
+        "task": lambda task: task.name,
+        "day": lambda task: task.start.date(),
+        "month": lambda task: task.start.strftime("%Y-%m"),
+    }
+    totals: dict[tuple, timedelta] = defaultdict(timedelta)
+    for task in get_recap_query(None, None, [], []).iterator():
+        if groups == ["tag"]:
+            # a task counts towards the tags of its project as well, but only once towards each
+            tags = {*(task.task_tags or "").split(","), *(task.project_tags or "").split(",")}
+            for tag in tags - {""} or {None}:
+                totals[(tag,)] += task.end - task.start
+        else:
+            totals[tuple(keys[group](task) for group in groups)] += task.end - task.start
+    return len(totals)
+
+
+def sql_report(groups: list[str]) -> int:
+    return len(list(get_report_query(groups, None, None, [], [], ZoneInfo("UTC")).iterator()))
+
+
+def measure(report: Callable[[list[str]], int], groups: list[str], runs: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = report(groups)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("report.db")
+        create_database(path, args.tasks)
+        db.init(path)
+
+        print(f"{'groups':<16}{'rows':>8}{'python (ms)':>14}{'sql (ms)':>11}")
+        with db:
+            for groups in GROUPS:
+                python_time, _ = measure(python_report, groups, args.runs)
+                sql_time, rows = measure(sql_report, groups, args.runs)
+                print(f"{', '.join(groups):<16}{rows:>8}{python_time:>14.1f}{sql_time:>11.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
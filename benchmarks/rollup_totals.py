@@ -0,0 +1,77 @@
+"""Compare the section totals of the recap read from the daily rollup with those summed over all
+tasks, and measure how much the rollup triggers slow down creating the database.
+
+usage: python benchmarks/rollup_totals.py [--tasks N [N ...]] [--runs N]
+"""
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from synthetic import create_database
+from timetracker.migrations import rebuild_task_rollup
+from timetracker.models import db
+from timetracker.queries import (
+    get_recap_query,
+    get_rollup_section_summary,
+    get_section_summary,
+)
+
+UTC = ZoneInfo("UTC")
+
+
+def measure(summarize: Callable[[], object], runs: int) -> tuple[float, list]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        summary = list(summarize())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("rollup.db")
+        print(
+            f"{'tasks':>10}{'create (s)':>12}{'rebuild (s)':>13}"
+            f"{'tasks (ms)':>12}{'rollup (ms)':>13}{'project (ms)':>14}"
+        )
+        for tasks in args.tasks:
+            start = time.perf_counter()
+            create_database(path, tasks)
+            create_time = time.perf_counter() - start
+            db.init(path)
+
+            with db:
+                start = time.perf_counter()
+                with db.atomic():
+                    rebuild_task_rollup(db)
+                rebuild_time = time.perf_counter() - start
+                task_time, task_summary = measure(
+                    lambda: get_section_summary(get_recap_query(None, None, [], []), "months"),
+                    args.runs,
+                )
+                rollup_time, rollup_summary = measure(
+                    lambda: get_rollup_section_summary(None, "months", None, UTC), args.runs
+                )
+                project_time, _ = measure(
+                    lambda: get_rollup_section_summary("project 0", "months", None, UTC),
+                    args.runs,
+                )
+            db.close()
+            print(
+                f"{tasks:>10}{create_time:>12.2f}{rebuild_time:>13.2f}"
+                f"{task_time:>12.2f}{rollup_time:>13.2f}{project_time:>14.2f}"
+            )
+            assert task_summary == rollup_summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure the peak memory and the run-time of exporting growing numbers of tasks, to check that
+the memory of a streamed export doesn't depend on the number of tasks.
+
+The peak RSS includes the pages of the database, which SQLite maps into memory, so it grows
+until it reaches the mmap_size and cache_size settings, while the memory of the export itself
+stays the same.
+
+usage: python benchmarks/streaming_export.py [--tasks N [N ...]] [--type TYPE] [--gzip]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from synthetic import create_database
+
+
+RUN = "import sys; from timetracker.main import app; sys.argv = ['timet', *sys.argv[1:]]; app()"
+
+
+def measure(database: Path, file_type: str, compress: bool) -> tuple[float, float]:
+    command = [sys.executable, "-c", RUN, "-d", str(database), "export", file_type, "-o", "-"]
+    if compress:
+        command.append("--gzip")
+    start = time.perf_counter()
+    # each export runs in its own process, so that its peak memory can be read afterwards
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    duration = time.perf_counter() - start
+    if status != 0:
+        raise RuntimeError("the export failed")
+    return duration, usage.ru_maxrss / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--type", default="json", choices=["csv", "json", "ndjson"])
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'tasks':>10}{'time (s)':>10}{'peak RSS (MB)':>16}")
+        for tasks in args.tasks:
+            path = Path(directory).joinpath(f"benchmark_{tasks}.db")
+            create_database(path, tasks)
+            duration, peak_memory = measure(path, args.type, args.gzip)
+            print(f"{tasks:>10}{duration:>10.2f}{peak_memory:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
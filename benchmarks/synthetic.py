@@ -0,0 +1,79 @@
+"""Helpers to create databases with a large synthetic history for the benchmarks."""
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from timetracker.migrations import migrate
+from timetracker.models import (
+    MODELS,
+    Project,
+    ProjectToTag,
+    Tag,
+    Task,
+    TaskToTag,
+    db,
+    intern_texts,
+)
+
+BATCH_SIZE = 5000
+TASK_NAMES = [f"task {i}" for i in range(300)]
+NOTES = [None, None, None, "meeting", "ticket 1234", "review"]
+
+
+def create_database(
+    path: Path,
+    tasks: int,
+    projects: int = 20,
+    tags: int = 50,
+    tags_per_task: int = 2,
+    tags_per_project: int = 2,
+    seed: int = 0,
+) -> None:
+    """Create a database at `path` with `tasks` finished tasks, starting on 01/01/2015."""
+    rng = random.Random(seed)
+    path.unlink(missing_ok=True)
+    db.init(path, pragmas={"foreign_keys": 1, "journal_mode": "wal", "synchronous": "off"})
+    with db:
+        db.create_tables(MODELS)
+        migrate(db)
+        start = datetime(2015, 1, 1, 8)
+
+        with db.atomic():
+            Tag.insert_many([{"name": f"tag {i}"} for i in range(tags)]).execute()
+            Project.insert_many(
+                [{"name": f"project {i}", "start": start} for i in range(projects)]
+            ).execute()
+            ProjectToTag.insert_many([
+                {"project": project, "tag": tag}
+                for project in range(1, projects + 1)
+                for tag in rng.sample(range(1, tags + 1), tags_per_project)
+            ]).execute()
+            text_ids = intern_texts(TASK_NAMES + NOTES)
+
+        task_id = 1
+        current = start
+        while task_id <= tasks:
+            task_rows = []
+            link_rows = []
+            for _ in range(min(BATCH_SIZE, tasks - task_id + 1)):
+                duration = timedelta(minutes=rng.randint(5, 240))
+                task_rows.append({
+                    "id": task_id,
+                    "name_text": text_ids[rng.choice(TASK_NAMES)],
+                    "note_text": text_ids.get(rng.choice(NOTES)),
+                    "start": current,
+                    "end": current + duration,
+                    "target": None,
+                    "project": rng.randint(1, projects),
+                })
+                link_rows.extend(
+                    {"task": task_id, "tag": tag}
+                    for tag in rng.sample(range(1, tags + 1), tags_per_task)
+                )
+                current += duration + timedelta(minutes=rng.randint(0, 120))
+                task_id += 1
+            with db.atomic():
+                Task.insert_many(task_rows).execute()
+                TaskToTag.insert_many(link_rows).execute()
+        db.execute_sql("ANALYZE")
+    db.close()
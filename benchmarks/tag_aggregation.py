@@ -0,0 +1,84 @@
+"""Compare the old tag aggregation, which joined both link tables and grouped the result, with
+the correlated subqueries on heavily tagged data.
+
+usage: python benchmarks/tag_aggregation.py [--tasks N] [--tags-per-task N] [--runs N]
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from peewee import JOIN, ModelSelect, fn
+from synthetic import create_database
+from timetracker.models import Project, ProjectToTag, Tag, Task, TaskToTag, db
+from timetracker.queries import get_export_query, get_recap_query
+
+MONTH = (datetime(2016, 6, 1), datetime(2016, 6, 30, 23, 59, 59))
+
+
+def old_task_query() -> ModelSelect:
+    task_tag = Tag.alias()
+    project_tag = Tag.alias()
+    concat_task_tags = fn.GROUP_CONCAT(task_tag.name.distinct()).alias("task_tags")
+    concat_project_tags = fn.GROUP_CONCAT(project_tag.name.distinct()).alias("project_tags")
+    return (Task.select(Task, Project, concat_task_tags, concat_project_tags)
+                .join(TaskToTag, JOIN.LEFT_OUTER)
+                .join(task_tag, JOIN.LEFT_OUTER)
+                .switch(Task)
+                .join(Project)
+                .join(ProjectToTag, JOIN.LEFT_OUTER)
+                .join(project_tag, JOIN.LEFT_OUTER)
+                .group_by(Task.id))
+
+
+def measure(query: ModelSelect, runs: int) -> float:
+    # the rows are read from the cursor, so that peewee's conversion of the datetime columns,
+    # which is the same for both queries, doesn't hide the work done by SQLite
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in db.execute(query):
+            pass
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--tags-per-task", type=int, default=8)
+    parser.add_argument("--tags-per-project", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("benchmark.db")
+        create_database(
+            path,
+            args.tasks,
+            tags=200,
+            tags_per_task=args.tags_per_task,
+            tags_per_project=args.tags_per_project,
+        )
+        db.init(path)
+
+        with db:
+            old_recap = (old_task_query().where(Task.start.between(*MONTH))
+                                         .order_by(Task.start))
+            new_recap = get_recap_query(MONTH, None, [], [])
+            old_export = old_task_query().order_by(Task.start)
+            new_export = get_export_query()
+
+            print(f"{'query':<10}{'old (ms)':>12}{'new (ms)':>12}{'speedup':>10}")
+            for name, old, new in [
+                ("recap", old_recap, new_recap),
+                ("export", old_export, new_export),
+            ]:
+                old_time = measure(old, args.runs)
+                new_time = measure(new, args.runs)
+                print(f"{name:<10}{old_time:>12.1f}{new_time:>12.1f}{old_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
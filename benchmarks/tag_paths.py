@@ -0,0 +1,84 @@
+"""Compare filtering by a tag and all tags below it through range scans of the index of the tag
+names with matching the names with LIKE, which compares the pattern with every tag: looking up
+the tags and exporting their tasks.
+
+usage: python benchmarks/tag_paths.py [--tasks N] [--tags N] [--runs N]
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from peewee import Expression
+from synthetic import create_database
+from timetracker.models import Tag, Task, TaskToTag, db
+from timetracker.queries import get_export_query, get_tag_condition
+
+# a client, whose projects make up a hundredth of all tags, and one of its projects
+PATHS = ["client/42", "client/42/project/4242"]
+
+
+def create_tag_paths(path: Path) -> None:
+    # the tags are spread over 100 clients with a project each
+    connection = sqlite3.connect(path)
+    connection.execute(
+        """UPDATE "tag" SET "name" = 'client/' || ("id" % 100) || '/project/' || "id" """
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def like_condition(tag: str) -> Expression:
+    return (Tag.name == tag) | (Tag.name ** f"{tag}/%")
+
+
+def lookup(condition: Expression) -> int:
+    return len(list(Tag.select(Tag.id).where(condition).tuples()))
+
+
+def export(condition: Expression) -> int:
+    tagged_tasks = TaskToTag.select(TaskToTag.task_id).join(Tag).where(condition)
+    query = get_export_query().where(Task.id.in_(tagged_tasks))
+    return len(list(query.tuples().iterator()))
+
+
+def measure(function: Callable[[], int], runs: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("tags.db")
+        create_database(path, args.tasks, tags=args.tags)
+        create_tag_paths(path)
+        db.init(path)
+
+        print(f"{'tag':<26}{'query':<8}{'rows':>8}{'like (ms)':>12}{'range (ms)':>12}")
+        with db:
+            for tag in PATHS:
+                for name, function in [("lookup", lookup), ("export", export)]:
+                    like = like_condition(tag)
+                    like_time, like_rows = measure(lambda: function(like), args.runs)
+                    condition = get_tag_condition([tag])
+                    range_time, rows = measure(lambda: function(condition), args.runs)
+                    assert rows == like_rows
+                    print(f"{tag:<26}{name:<8}{rows:>8}{like_time:>12.2f}{range_time:>12.2f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare evaluating tag queries against the inverted index, which starts with the shortest
+list of tasks and looks the other tags up for each of its tasks, with combining the tasks of the
+tags and of their projects from the link tables with INTERSECT and EXCEPT, which reads every list
+in full: the ids of the matching tasks and the export of the tasks.
+
+usage: python benchmarks/tag_query.py [--tasks N] [--rare N] [--runs N]
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from peewee import SelectQuery
+from synthetic import create_database
+from timetracker.models import ProjectToTag, Tag, Task, TaskToTag, db
+from timetracker.parsers import TagClause, parse_tag_query
+from timetracker.queries import get_export_query, get_tag_condition, get_tag_query_condition
+
+# a rare tag, a tag of the tasks and the projects, and both of them against each other
+QUERIES = ["rare AND tag 1", "tag 1 AND tag 2", "tag 1 AND NOT tag 2", "ANY(tag 1, tag 2)"]
+
+
+def create_rare_tag(path: Path, count: int) -> None:
+    # the rare tag is given to every n-th task
+    connection = sqlite3.connect(path)
+    connection.execute("""INSERT INTO "tag" ("name") VALUES ('rare')""")
+    connection.execute(
+        'INSERT INTO "task_to_tag" ("task_id", "tag_id") SELECT "id", '
+        """(SELECT "id" FROM "tag" WHERE "name" = 'rare') FROM "task" WHERE "id" % ? = 0""",
+        ((connection.execute('SELECT COUNT(*) FROM "task"').fetchone()[0] // count),),
+    )
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def get_link_query(clauses: list[TagClause]) -> SelectQuery:
+    # the tasks of each clause, combined in the order of the query
+    query = None
+    for i, clause in enumerate(clauses):
+        tags = Tag.select(Tag.id).where(get_tag_condition(clause.tags))
+        projects = ProjectToTag.select(ProjectToTag.project_id).where(ProjectToTag.tag.in_(tags))
+        # SQLite combines compound selects from left to right, so each union is a subquery
+        tagged = (TaskToTag.select(TaskToTag.task_id).where(TaskToTag.tag.in_(tags))
+                  | Task.select(Task.id).where(Task.project.in_(projects))).alias(f"clause{i}")
+        tasks = Task.select(tagged.c.task_id).from_(tagged)
+        if query is None:
+            query = Task.select(Task.id.alias("task_id")) - tasks if clause.negated else tasks
+        else:
+            query = query - tasks if clause.negated else query & tasks
+    return query
+
+
+def link_ids(clauses: list[TagClause]) -> int:
+    # the ids are read from the tasks in both cases, like the filters of `recap` and `export`
+    return len(Task.select(Task.id).where(Task.id.in_(get_link_query(clauses))).tuples())
+
+
+def index_ids(clauses: list[TagClause]) -> int:
+    return len(Task.select(Task.id).where(get_tag_query_condition(clauses)).tuples())
+
+
+def link_export(clauses: list[TagClause]) -> int:
+    matches = get_link_query(clauses).alias("matches")
+    query = get_export_query().where(Task.id.in_(Task.select(matches.c.task_id).from_(matches)))
+    return len(list(query.tuples().iterator()))
+
+
+def index_export(clauses: list[TagClause]) -> int:
+    return len(list(get_export_query(tag_query=clauses).tuples().iterator()))
+
+
+def measure(function: Callable[[], int], runs: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--rare", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("tags.db")
+        create_database(path, args.tasks)
+        create_rare_tag(path, args.rare)
+        db.init(path)
+
+        print(f"{'tag query':<22}{'query':<8}{'rows':>8}{'links (ms)':>12}{'index (ms)':>12}")
+        with db:
+            for query in QUERIES:
+                clauses = parse_tag_query(query)
+                rows = [("ids", link_ids, index_ids), ("export", link_export, index_export)]
+                for name, links, index in rows:
+                    links_time, links_rows = measure(lambda: links(clauses), args.runs)
+                    index_time, count = measure(lambda: index(clauses), args.runs)
+                    assert count == links_rows
+                    print(f"{query:<22}{name:<8}{count:>8}{links_time:>12.1f}{index_time:>12.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
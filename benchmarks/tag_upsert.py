@@ -0,0 +1,68 @@
+"""Compare creating and linking the tags of `start` with one upsert, one lookup and one insert
+with calling get_or_create and create for each tag, like `start` used to do.
+
+usage: python benchmarks/tag_upsert.py [--tags N [N ...]] [--repeat N]
+"""
+import argparse
+import itertools
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from synthetic import create_database
+from timetracker.commands import add_tags
+from timetracker.models import Tag, Task, TaskToTag, db, init_db
+
+NEW_TAGS = itertools.count()
+
+
+def add_tags_one_by_one(task_id: int, tags: list[str]) -> None:
+    tag_ids = set()
+    for tag in tags:
+        tag_ids.add(Tag.get_or_create(name=tag)[0].id)
+    for tag_id in tag_ids:
+        TaskToTag.create(task=task_id, tag=tag_id)
+
+
+def measure(add: Callable[[int, list[str]], None], tags: int, repeat: int) -> float:
+    # half of the tags exist already, like the usual tags of a task, the others are new
+    duration = 0.0
+    for _ in range(repeat):
+        names = [f"tag {j}" for j in range(tags // 2)]
+        names += [f"new tag {next(NEW_TAGS)}" for _ in range(tags - tags // 2)]
+        with db:
+            start = time.perf_counter()
+            task = Task.create(name="task", start=datetime.utcnow(), project=1)
+            add(task.id, names)
+            duration += time.perf_counter() - start
+    return duration / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tags", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("tags.db")
+        create_database(path, 10_000, tags=100)
+        init_db(path)
+
+        print(f"{'tags':>6}{'one by one (ms)':>18}{'batched (ms)':>15}{'speedup':>10}")
+        for tags in args.tags:
+            one_by_one = measure(add_tags_one_by_one, tags, args.repeat)
+            batched = measure(
+                lambda task_id, names: add_tags(TaskToTag.task, task_id, names), tags, args.repeat
+            )
+            print(
+                f"{tags:>6}{one_by_one * 1000:>18.3f}{batched * 1000:>15.3f}"
+                f"{one_by_one / batched:>9.1f}x"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
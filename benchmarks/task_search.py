@@ -0,0 +1,91 @@
+"""Compare finding the tasks through the FTS5 index with scanning their texts with LIKE, as it
+would have to be done without the index, for a frequent, a rare and a term, which every task
+matches: the ids of all matches, all matching tasks like `export --match` and the best 20 matches
+of `search`, which can't be ranked without the index.
+
+usage: python benchmarks/task_search.py [--tasks N] [--runs N]
+"""
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from synthetic import create_database
+from timetracker.models import Project, TaskText, db
+from timetracker.queries import get_export_query, get_search_query
+
+# the note of every sixth task, the name of every 300th task and the names of all tasks
+TERMS = [("review", "%review%"), ('"task 42"', "%task 42"), ("task", "%task%")]
+LIKE_SQL = (
+    'SELECT t."id" FROM "task" AS t JOIN "project" AS p ON p."id" = t."project_id" '
+    'JOIN "task_text" AS n ON n."id" = t."name_id" '
+    'LEFT JOIN "task_text" AS o ON o."id" = t."note_id" '
+    'WHERE n."text" LIKE ?1 OR o."text" LIKE ?1 OR p."name" LIKE ?1'
+)
+MATCH_SQL = 'SELECT "rowid" FROM "task_search" WHERE "task_search" MATCH ?'
+
+
+def measure(function: Callable[[], int], runs: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, rows
+
+
+def like_export(pattern: str) -> int:
+    # the same export, filtered by the texts, which it has already joined
+    name, note = TaskText.alias("name"), TaskText.alias("note")
+    query = get_export_query().where(
+        (name.text ** pattern) | (note.text ** pattern) | (Project.name ** pattern)
+    )
+    return len(list(query.tuples().iterator()))
+
+
+def get_index_size() -> float:
+    # the shadow tables, in which FTS5 stores the index
+    size = db.execute_sql(
+        """SELECT SUM("pgsize") FROM "dbstat" WHERE "name" LIKE 'task\\_search\\_%' ESCAPE '\\'"""
+    )
+    return size.fetchone()[0] / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("search.db")
+        create_database(path, args.tasks)
+        db.init(path)
+
+        with db:
+            print(f"index: {get_index_size():.2f} MB")
+            print(f"{'term':<12}{'query':<8}{'rows':>8}{'like (ms)':>12}{'fts5 (ms)':>12}")
+            for match, pattern in TERMS:
+                rows = [
+                    (
+                        "ids",
+                        lambda: len(db.execute_sql(LIKE_SQL, (pattern,)).fetchall()),
+                        lambda: len(db.execute_sql(MATCH_SQL, (match,)).fetchall()),
+                    ),
+                    (
+                        "export",
+                        lambda: like_export(pattern),
+                        lambda: len(list(get_export_query(match=match).tuples().iterator())),
+                    ),
+                    ("search", None, lambda: len(list(get_search_query(match, 20).tuples()))),
+                ]
+                for name, like, fts in rows:
+                    like_time = "-" if like is None else f"{measure(like, args.runs)[0]:.1f}"
+                    fts_time, count = measure(fts, args.runs)
+                    print(f"{match:<12}{name:<8}{count:>8}{like_time:>12}{fts_time:>12.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare formatting the datetimes and durations of many tasks one by one with to_aware_string
+and format_seconds, and with the cached formatters.
+
+usage: python benchmarks/time_formatting.py [--tasks N] [--tz TZ] [--runs N]
+"""
+import argparse
+import random
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from timetracker.time_utils import (
+    DEFAULT_FORMAT,
+    DatetimeFormatter,
+    DurationFormatter,
+    format_seconds,
+    to_aware_string,
+)
+
+
+def measure(function: Callable[[], object], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--tz", default="Europe/Zurich")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # the same distribution as in synthetic.py: tasks of 5 to 240 minutes with gaps of up to 2 hours
+    rng = random.Random(0)
+    tz = ZoneInfo(args.tz)
+    starts = []
+    durations = []
+    current = datetime(2015, 1, 1, 8)
+    for _ in range(args.tasks):
+        duration = timedelta(minutes=rng.randint(5, 240))
+        starts.append(current)
+        durations.append(duration.total_seconds())
+        current += duration + timedelta(minutes=rng.randint(0, 120))
+
+    print(f"{'column':<12}{'one by one (ms)':>18}{'formatter (ms)':>17}{'speedup':>10}")
+    for name, one_by_one, formatter in [
+        (
+            "datetimes",
+            lambda: [to_aware_string(dt, tz) for dt in starts],
+            lambda: DatetimeFormatter(tz).format_column(starts),
+        ),
+        (
+            "dates",
+            lambda: [to_aware_string(dt, tz, "%d/%m/%Y") for dt in starts],
+            lambda: DatetimeFormatter(tz, "%d/%m/%Y").format_column(starts),
+        ),
+        (
+            "durations",
+            lambda: [format_seconds(duration) for duration in durations],
+            lambda: DurationFormatter().format_column(durations),
+        ),
+    ]:
+        old_time = measure(one_by_one, args.runs)
+        new_time = measure(formatter, args.runs)
+        print(f"{name:<12}{old_time:>18.1f}{new_time:>17.1f}{old_time / new_time:>9.1f}x")
+
+    assert DatetimeFormatter(tz, DEFAULT_FORMAT).format_column(starts) == [
+        to_aware_string(dt, tz) for dt in starts
+    ]
+
+
+if __name__ == "__main__":
+    main()
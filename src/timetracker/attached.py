@@ -0,0 +1,195 @@
+# Several databases are read at once by attaching them to the connection of the first one and
+# shadowing its tables with temporary views, which combine the tables of all databases with
+# UNION ALL. Temporary objects take precedence over those of the main database, so the queries of
+# `recap`, `export`, `list` and `status` run on the views as they are.
+from peewee import SqliteDatabase
+
+# the ids of the n-th database are offset by n * ID_OFFSET in the views, so that they stay unique
+ID_OFFSET = 1_000_000_000
+# the schema, under which `merge` attaches the database, whose tasks it copies
+SOURCE_SCHEMA = "source"
+
+
+def get_schemas(count: int) -> list[str]:
+    return ["main"] + [f"db{i}" for i in range(1, count)]
+
+
+def offset(alias: str, column: str, i: int) -> str:
+    return f'{alias}."{column}"' + (f" + {i * ID_OFFSET}" if i != 0 else "")
+
+
+def get_shared_id(
+    table: str, schemas: list[str], i: int, alias: str, column: str = "name"
+) -> str:
+    # projects, tags and the texts of tasks are matched by name, the first database with a name
+    # determines its id
+    own_id = offset(alias, "id", i)
+    if i == 0:
+        return own_id
+    lookups = [
+        f'(SELECT {offset("s", "id", j)} FROM "{schema}"."{table}" AS s '
+        f'WHERE s."{column}" = {alias}."{column}")'
+        for j, schema in enumerate(schemas[:i])
+    ]
+    return f"COALESCE({', '.join(lookups)}, {own_id})"
+
+
+def get_new_names(
+    table: str, schemas: list[str], i: int, alias: str, column: str = "name"
+) -> str:
+    # the projects, tags and texts, whose names don't occur in any of the previous databases
+    conditions = [
+        f'NOT EXISTS (SELECT 1 FROM "{schema}"."{table}" AS s '
+        f'WHERE s."{column}" = {alias}."{column}")'
+        for schema in schemas[:i]
+    ]
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def create_union_views(db: SqliteDatabase, schemas: list[str]) -> None:
+    selects: dict[str, list[str]] = {
+        "project": [],
+        "tag": [],
+        "task_text": [],
+        "task": [],
+        "task_to_tag": [],
+        "project_to_tag": [],
+        "tag_posting": [],
+        "task_interval": [],
+        "task_tombstone": [],
+        "task_rollup": [],
+    }
+    for i, schema in enumerate(schemas):
+        project_id = get_shared_id("project", schemas, i, "p")
+        tag_id = get_shared_id("tag", schemas, i, "g")
+        name_id = get_shared_id("task_text", schemas, i, "n", "text")
+        note_id = get_shared_id("task_text", schemas, i, "o", "text")
+        selects["project"].append(
+            f'SELECT {offset("p", "id", i)} AS "id", p."name", p."start", p."end", '
+            f'p."created_at", p."updated_at", p."change_seq" FROM "{schema}"."project" AS p'
+            + get_new_names("project", schemas, i, "p")
+        )
+        # the task counts only guide the order of tag queries, a tag shared by several databases
+        # keeps the count of the first one
+        selects["tag"].append(
+            f'SELECT {offset("g", "id", i)} AS "id", g."name", g."task_count" '
+            f'FROM "{schema}"."tag" AS g'
+            + get_new_names("tag", schemas, i, "g")
+        )
+        selects["task_text"].append(
+            f'SELECT {offset("n", "id", i)} AS "id", n."text" FROM "{schema}"."task_text" AS n'
+            + get_new_names("task_text", schemas, i, "n", "text")
+        )
+        selects["task"].append(
+            f'SELECT {offset("t", "id", i)} AS "id", {name_id} AS "name_id", '
+            f'{note_id} AS "note_id", t."start", t."end", t."target", '
+            f'{project_id} AS "project_id", t."created_at", t."updated_at", t."change_seq" '
+            f'FROM "{schema}"."task" AS t '
+            f'JOIN "{schema}"."project" AS p ON p."id" = t."project_id" '
+            f'JOIN "{schema}"."task_text" AS n ON n."id" = t."name_id" '
+            f'LEFT JOIN "{schema}"."task_text" AS o ON o."id" = t."note_id"'
+        )
+        selects["task_to_tag"].append(
+            f'SELECT {offset("l", "task_id", i)} AS "task_id", {tag_id} AS "tag_id", '
+            f'l."created_at", l."updated_at" FROM "{schema}"."task_to_tag" AS l '
+            f'JOIN "{schema}"."tag" AS g ON g."id" = l."tag_id"'
+        )
+        selects["project_to_tag"].append(
+            f'SELECT {project_id} AS "project_id", {tag_id} AS "tag_id", '
+            f'l."created_at", l."updated_at" FROM "{schema}"."project_to_tag" AS l '
+            f'JOIN "{schema}"."project" AS p ON p."id" = l."project_id" '
+            f'JOIN "{schema}"."tag" AS g ON g."id" = l."tag_id"'
+        )
+        selects["tag_posting"].append(
+            f'SELECT {tag_id} AS "tag_id", {offset("x", "task_id", i)} AS "task_id" '
+            f'FROM "{schema}"."tag_posting" AS x JOIN "{schema}"."tag" AS g ON g."id" = x."tag_id"'
+        )
+        selects["task_interval"].append(
+            f'SELECT {offset("r", "id", i)} AS "id", r."start", r."end" '
+            f'FROM "{schema}"."task_interval" AS r'
+        )
+        selects["task_rollup"].append(
+            f'SELECT r."day", {project_id} AS "project_id", r."milliseconds", r."count" '
+            f'FROM "{schema}"."task_rollup" AS r '
+            f'JOIN "{schema}"."project" AS p ON p."id" = r."project_id"'
+        )
+        selects["task_tombstone"].append(
+            f'SELECT {offset("d", "id", i)} AS "id", d."deleted_at", d."change_seq" '
+            f'FROM "{schema}"."task_tombstone" AS d'
+        )
+
+    for table, table_selects in selects.items():
+        body = " UNION ALL ".join(table_selects)
+        if table == "project_to_tag":
+            # a project, which is tagged the same in several databases, keeps each tag only once
+            body = (
+                'SELECT "project_id", "tag_id", MIN("created_at") AS "created_at", '
+                f'MAX("updated_at") AS "updated_at" FROM ({body}) GROUP BY "project_id", "tag_id"'
+            )
+        db.execute_sql(f'CREATE TEMP VIEW "{table}" AS {body}')
+
+
+def merge_database(db: SqliteDatabase) -> int:
+    # copies all tasks of the attached source database, which aren't already in the main
+    # database, with INSERT ... SELECT, so that none of them pass through Python; projects and
+    # tags are matched by name and the tasks keep their ids, offset by the largest id of the
+    # main database, which is how their tags are found again; the rows are new to the main
+    # database, so their timestamps are left to the triggers, as `export --since-last` would
+    # skip rows, which keep the older timestamps of the source
+    source = SOURCE_SCHEMA
+    task_offset = db.execute_sql('SELECT COALESCE(MAX("id"), 0) FROM "main"."task"').fetchone()[0]
+    db.execute_sql(
+        'INSERT INTO "main"."project" ("name", "start", "end") '
+        f'SELECT "name", "start", "end" FROM "{source}"."project" '
+        # WHERE true keeps SQLite from parsing ON CONFLICT as part of a join
+        'WHERE true ON CONFLICT ("name") DO NOTHING'
+    )
+    db.execute_sql(
+        f'INSERT INTO "main"."tag" ("name") SELECT "name" FROM "{source}"."tag" '
+        'WHERE true ON CONFLICT ("name") DO NOTHING'
+    )
+    db.execute_sql(
+        f'INSERT INTO "main"."task_text" ("text") SELECT "text" FROM "{source}"."task_text" '
+        'WHERE true ON CONFLICT ("text") DO NOTHING'
+    )
+    # a task with the same project, name and start has been merged before
+    count = db.execute_sql(
+        'INSERT INTO "main"."task" ("id", "name_id", "note_id", "start", "end", "target", '
+        '"project_id") '
+        'SELECT t."id" + ?, mn."id", mo."id", t."start", t."end", t."target", mp."id" '
+        f'FROM "{source}"."task" AS t '
+        f'JOIN "{source}"."project" AS p ON p."id" = t."project_id" '
+        'JOIN "main"."project" AS mp ON mp."name" = p."name" '
+        f'JOIN "{source}"."task_text" AS n ON n."id" = t."name_id" '
+        'JOIN "main"."task_text" AS mn ON mn."text" = n."text" '
+        f'LEFT JOIN "{source}"."task_text" AS o ON o."id" = t."note_id" '
+        'LEFT JOIN "main"."task_text" AS mo ON mo."text" = o."text" '
+        'WHERE NOT EXISTS (SELECT 1 FROM "main"."task" AS m '
+        'WHERE m."start" = t."start" AND m."project_id" = mp."id" AND m."name_id" = mn."id")',
+        (task_offset,),
+    ).rowcount
+    running = db.execute_sql('SELECT COUNT(*) FROM "main"."task" WHERE "end" IS NULL').fetchone()
+    if running[0] > 1:
+        message = "Both databases have a running task, one of them has to be stopped!"
+        raise ValueError(message)
+    # only the tags of the tasks, which have just been inserted, are copied
+    db.execute_sql(
+        'INSERT INTO "main"."task_to_tag" ("task_id", "tag_id") '
+        'SELECT m."id", mg."id" '
+        f'FROM "{source}"."task_to_tag" AS l '
+        'JOIN "main"."task" AS m ON m."id" = l."task_id" + ? '
+        f'JOIN "{source}"."tag" AS g ON g."id" = l."tag_id" '
+        'JOIN "main"."tag" AS mg ON mg."name" = g."name"',
+        (task_offset,),
+    )
+    db.execute_sql(
+        'INSERT INTO "main"."project_to_tag" ("project_id", "tag_id") '
+        'SELECT mp."id", mg."id" '
+        f'FROM "{source}"."project_to_tag" AS l '
+        f'JOIN "{source}"."project" AS p ON p."id" = l."project_id" '
+        'JOIN "main"."project" AS mp ON mp."name" = p."name" '
+        f'JOIN "{source}"."tag" AS g ON g."id" = l."tag_id" '
+        'JOIN "main"."tag" AS mg ON mg."name" = g."name" '
+        'WHERE true ON CONFLICT ("project_id", "tag_id") DO NOTHING'
+    )
+    return count
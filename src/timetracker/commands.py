@@ -1,60 +1,84 @@
 import csv
+import io
 import json
 import re
-from collections.abc import Iterable
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timedelta
+from functools import partial
 from importlib.abc import Traversable
 from importlib.resources import files
-from importlib.abc import Traversable
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import TYPE_CHECKING, Annotated, Any, Optional, TextIO
 from zoneinfo import ZoneInfo
 
 import typer
-from peewee import JOIN, DoesNotExist, IntegrityError, OperationalError, fn
-from pydantic import ValidationError
 
-from .display import RecapDisplay, display_project_list, display_status
-from .enums import DisplayType, FileType, TableType
+from .enums import DisplayType, FileType, GroupType, TableType
 from .error_utils import print_error_box
-from .models import DB_FILE, Project, ProjectToTag, Tag, Task, TaskToTag, db
-from .parsers import parse_date_range
-from .settings import Settings
-from .time_utils import format_seconds, to_aware_string
+from .time_utils import format_seconds
+
+if TYPE_CHECKING:
+    from peewee import Field, Model
+
+    from .layout import Cell
+    from .queries import TaskRow
 
+# peewee, pydantic, rich.live and textual are imported inside of the commands that need them,
+# as they make up most of the startup time, which is noticeable when timet is used in scripts
 app = typer.Typer(context_settings={"help_option_names": ["-h", "--help"]})
-try:
-    # somehow model_validate_json raises a NotImplementedError
-    with files("timetracker").joinpath("settings.json").open("r") as file:
-        model_dict = json.load(file)
-    settings = Settings.model_validate(model_dict)
-except FileNotFoundError:
-    settings = Settings()
-except ValidationError as e:
-    print_error_box("The validation of the settings failed!")
+READ_ONLY_COMMANDS = ["list", "status", "recap", "report", "search", "export"]
+# the imported tasks are inserted in batches, so that only one batch is held in memory
+INSERT_BATCH_SIZE = 5000
+# the size of the pieces, in which JSON arrays are imported
+READ_SIZE = 1 << 16
 
 
 @app.callback()
-def entry(db_file: Annotated[Optional[Path], typer.Option("-d", "--database")] = None) -> None:
-    if db_file is None:
-        db_file = DB_FILE
-    db.init(db_file, pragmas={"foreign_keys": 1})
+def entry(
+    ctx: typer.Context,
+    db_files: Annotated[Optional[list[Path]], typer.Option("-d", "--database")] = None
+) -> None:
+    from .models import DB_FILE, init_db
+
+    # shell completion only parses the arguments
+    if ctx.resilient_parsing:
+        return
+    db_file, *attached = db_files or [DB_FILE]
+    # the reporting commands can read several databases at once, as if they were one
+    if len(attached) > 0 and ctx.invoked_subcommand not in READ_ONLY_COMMANDS:
+        print_error_box(
+            "Only " + ", ".join(READ_ONLY_COMMANDS) + " can read multiple databases at once!"
+        )
+    for path in attached:
+        if not path.is_file():
+            print_error_box(f"The database {path} doesn't exist!")
+    # export keeps its watermark next to the first database
+    ctx.obj = db_file
+    # reporting commands never take a write lock, so they can't block the other commands, and
+    # they neither create nor upgrade a database
+    init_db(
+        db_file, readonly=ctx.invoked_subcommand in READ_ONLY_COMMANDS, attached=attached
+    )
 
 
 @app.command(help="create a new project")
 def create(
     project_name: str, tags_as_str: Annotated[Optional[str], typer.Option("-t", "--tags")] = None
 ) -> None:
-    tags = map(str.strip, tags_as_str.split(",")) if tags_as_str is not None else []
+    from peewee import IntegrityError, OperationalError
+
+    from .models import Project, ProjectToTag, db
+    from .parsers import parse_tag
+
+    tags = map(parse_tag, tags_as_str.split(",")) if tags_as_str is not None else []
 
     try:
         with db:
             project = Project.create(name=project_name, start=datetime.utcnow())
-            tag_ids = set()
-            for tag in tags:
-                tag_ids.add(Tag.get_or_create(name=tag)[0].id)
-            for tag_id in tag_ids:
-                ProjectToTag.create(project=project, tag=tag_id)
+            add_tags(ProjectToTag.project, project.id, tags)
         print(f'"{project_name}" has been succesfully created!')
     except IntegrityError:
         print(f"A project, called {project_name}, does already exist!")
@@ -65,6 +89,10 @@ def create(
 
 @app.command()
 def complete(project_name: str) -> None:
+    from peewee import DoesNotExist, OperationalError
+
+    from .models import Project, db
+
     try:
         with db:
             project = Project.get(Project.name == project_name)
@@ -82,6 +110,10 @@ def complete(project_name: str) -> None:
 
 @app.command()
 def delete(project_name: str, yes: Annotated[bool, typer.Option("-y", "--yes")] = False) -> None:
+    from peewee import DoesNotExist, OperationalError
+
+    from .models import Project, db
+
     try:
         with db:
             if Project.select().count() == 1:
@@ -113,10 +145,40 @@ def delete(project_name: str, yes: Annotated[bool, typer.Option("-y", "--yes")]
     delete_unused_tags()
 
 
+def update_state() -> None:
+    from .models import db
+    from .queries import get_running_task
+    from .state import write_state
+
+    with db:
+        write_state(db.database, get_running_task())
+
+
+def add_tags(owner_field: "Field", owner_id: int, tags: Iterable[str]) -> None:
+    from .models import Tag
+
+    # all tags are created with one upsert, looked up with one query and linked with one insert,
+    # instead of taking two queries for each tag
+    names = list(dict.fromkeys(tags))
+    if len(names) == 0:
+        return
+    insert_tags = Tag.insert_many([(name,) for name in names], fields=[Tag.name])
+    insert_tags.on_conflict(action="nothing").execute()
+    tag_ids = Tag.select(Tag.id).where(Tag.name.in_(names)).tuples()
+    link_model = owner_field.model
+    link_model.insert_many(
+        [(owner_id, tag_id) for tag_id, in tag_ids], fields=[owner_field, link_model.tag]
+    ).execute()
+
+
 def delete_unused_tags() -> None:
-    task_tag_sq = TaskToTag.select().where(TaskToTag.tag_id == Tag.id)
-    project_tag_sq = ProjectToTag.select().where(ProjectToTag.tag_id == Tag.id)
-    Tag.delete().where(~fn.EXISTS(task_tag_sq) & ~fn.EXISTS(project_tag_sq)).execute()
+    from peewee import SQL
+
+    from .models import Tag
+
+    # the reference counts are kept by triggers; peewee would pass 0 as a parameter, which keeps
+    # SQLite from using the partial index of the unused tags
+    Tag.delete().where(Tag.reference_count == SQL("0")).execute()
 
 
 @app.command("list")
@@ -124,19 +186,20 @@ def list_projects(
     all_: Annotated[bool, typer.Option("-a", "--all")] = False,
     raw: Annotated[bool, typer.Option("-r", "--raw")] = False
 ) -> None:
-    concat_tags = fn.GROUP_CONCAT(Tag.name, ", ").alias("tags")
+    from peewee import OperationalError
+
+    from .display import display_project_list
+    from .models import db
+    from .queries import get_project_list_query
+    from .settings import load_settings
+
     try:
         with db:
-            query = (Project.select(Project, concat_tags)
-                            .join(ProjectToTag, JOIN.LEFT_OUTER)
-                            .join(Tag, JOIN.LEFT_OUTER)
-                            .group_by(Project.id))
-            if not all_:
-                query = query.where(Project.end.is_null())
+            query = get_project_list_query(all_)
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
 
-    display_project_list(raw, query, all_, settings.tz)
+    display_project_list(raw, query, all_, load_settings().tz)
 
 
 @app.command()
@@ -148,18 +211,23 @@ def start(
     until: Annotated[Optional[str], typer.Option("-u", "--until")] = None,
     for_: Annotated[Optional[str], typer.Option("-f", "--for")] = None
 ) -> None:
+    from peewee import DoesNotExist, OperationalError
+
+    from .models import Project, Task, TaskToTag, db
+    from .parsers import parse_tag
+    from .queries import get_running_task_query
+
     if until is not None and for_ is not None:
         print_error_box("until and for_ are mutually exclusive")
 
     start = datetime.utcnow()
-    target = get_target(start, settings.tz, until, for_)
-    tags = map(str.strip, tags_as_str.split(",")) if tags_as_str is not None else None
+    target = get_target(start, until, for_)
+    tags = map(parse_tag, tags_as_str.split(",")) if tags_as_str is not None else None
 
     try:
         with db:
-            ongoing_tasks = Task.select().where(Task.end.is_null()).count()
-            if ongoing_tasks != 0:
-                task = Task.get(Task.end.is_null())
+            task = get_running_task_query().get_or_none()
+            if task is not None:
                 print(f'There\'s already an ongoing task, called "{task.name}"!')
                 raise SystemExit(1)
             project = Project.get(Project.name == project_name)
@@ -167,11 +235,8 @@ def start(
                 name=task_name, start=start, target=target, note=note, project=project
             )
             if tags is not None:
-                tag_ids = set()
-                for tag in tags:
-                    tag_ids.add(Tag.get_or_create(name=tag)[0].id)
-                for tag_id in tag_ids:
-                    TaskToTag.create(task=task, tag=tag_id)
+                add_tags(TaskToTag.task, task.id, tags)
+        update_state()
         print(f'"{task.name}" has been succesfully started in "{project_name}"!')
     except DoesNotExist:
         print(f'A project, named "{project_name}", does not exist!')
@@ -180,7 +245,7 @@ def start(
         print_error_box("The database isn't initialized properly!")
 
 
-def get_target(start: datetime, tz: ZoneInfo, until: str, for_: str) -> datetime | None:
+def get_target(start: datetime, until: str, for_: str) -> datetime | None:
     pattern = re.compile(r"(?P<hour>\d{1,2})(:(?P<minute>\d{1,2}))?")
     target = None
     if until is not None:
@@ -193,6 +258,10 @@ def get_target(start: datetime, tz: ZoneInfo, until: str, for_: str) -> datetime
             raise SystemExit(1)
         hour = int(match.group("hour"))
         minute = int(match.group("minute") or 0)
+        # the timezone is only needed here, so the settings are loaded lazily
+        from .settings import load_settings
+
+        tz = load_settings().tz
         target = start.astimezone(tz).replace(hour=hour, minute=minute)
         target = target.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
         if target <= start:
@@ -215,24 +284,42 @@ def get_target(start: datetime, tz: ZoneInfo, until: str, for_: str) -> datetime
 def status(
     display: Annotated[Optional[DisplayType], typer.Option("-d", "--display")] = None
 ) -> None:
+    from peewee import DoesNotExist, OperationalError
+
+    from .display import display_status
+    from .models import db
+    from .queries import get_running_task_query
+
     try:
         with db:
-            task = Task.get(Task.end.is_null())
+            task = get_running_task_query().get()
     except DoesNotExist:
         print("There's currently no task running!")
         raise SystemExit(1) from None
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
 
-    type_ = display.value if display is not None else settings.status
-    display_status(type_, task, settings.tz)
+    type_ = display.value if display is not None else None
+    tz = ZoneInfo("UTC")
+    # the settings are only loaded, if they are actually needed
+    if type_ is None or type_ in ["table", "t"]:
+        from .settings import load_settings
+
+        type_ = type_ or load_settings().status
+        tz = load_settings().tz
+    display_status(type_, task, tz)
 
 
 @app.command()
 def stop() -> None:
+    from peewee import DoesNotExist, OperationalError
+
+    from .models import db
+    from .queries import get_running_task_query
+
     try:
         with db:
-            task = Task.get(Task.end.is_null())
+            task = get_running_task_query().get()
             task.end = datetime.utcnow()
             task.save()
     except DoesNotExist:
@@ -240,6 +327,7 @@ def stop() -> None:
         raise SystemExit(1) from None
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
+    update_state()
 
     now = datetime.utcnow()
     start_delta = now - task.start
@@ -265,164 +353,589 @@ def recap(
     id_: Annotated[bool, typer.Option("-i", "--id")] = False,
     tags_as_str: Annotated[Optional[str], typer.Option("-t", "--tags")] = None,
     task_tags_as_str: Annotated[Optional[str], typer.Option("-tt", "--task_tags")] = None,
-    project_tags_as_str: Annotated[Optional[str], typer.Option("-pt", "--project_tags")] = None
+    project_tags_as_str: Annotated[Optional[str], typer.Option("-pt", "--project_tags")] = None,
+    match: Annotated[Optional[str], typer.Option("-m", "--match")] = None,
+    tag_query_as_str: Annotated[Optional[str], typer.Option("-tq", "--tag_query")] = None
 ) -> None:
-    task_tag = Tag.alias()
-    project_tag = Tag.alias()
-    concat_task_tags = fn.GROUP_CONCAT(task_tag.name.distinct()).alias("task_tags")
-    concat_project_tags = fn.GROUP_CONCAT(project_tag.name.distinct()).alias("project_tags")
+    from peewee import OperationalError
+
+    from .models import db
+    from .parsers import parse_date_range, parse_tag_query, parse_tags
+    from .queries import get_recap_query, get_rollup_section_summary
+    from .settings import load_settings
+
+    date_range = None
+    if start_input is not None or end_input is not None:
+        date_range = parse_date_range(start_input, end_input)
+    task_tags, project_tags = parse_tags(tags_as_str, task_tags_as_str, project_tags_as_str)
+    tag_query = [] if tag_query_as_str is None else parse_tag_query(tag_query_as_str)
+
     try:
         with db:
-            query = (Task.select(Task, Project, concat_task_tags, concat_project_tags)
-                         .join(TaskToTag, JOIN.LEFT_OUTER)
-                         .join(task_tag, JOIN.LEFT_OUTER)
-                         .switch(Task)
-                         .join(Project)
-                         .join(ProjectToTag, JOIN.LEFT_OUTER)
-                         .join(project_tag, JOIN.LEFT_OUTER)
-                         .group_by(Task.id)
-                         .where(Task.end.is_null(False)))
-
-            if start_input is not None or end_input is not None:
-                start, end = parse_date_range(start_input, end_input)
-                query = query.where(Task.start.between(start, end) | Task.end.between(start, end))
-
-            if project_name is not None:
-                query = query.where(Project.name == project_name)
-
-            task_tags = []
-            project_tags = []
-            if tags_as_str is not None:
-                task_tags.extend(map(str.strip, tags_as_str.split(",")))
-                project_tags.extend(map(str.strip, tags_as_str.split(",")))
-            if task_tags_as_str is not None:
-                task_tags.extend(map(str.strip, task_tags_as_str.split(",")))
-            if project_tags_as_str is not None:
-                project_tags.extend(map(str.strip, project_tags_as_str.split(",")))
-
-            task_tag = Tag.alias()
-            project_tag = Tag.alias()
-            task_tags_subquery = (TaskToTag.select()
-                                .join(task_tag)
-                                .where(TaskToTag.task_id == Task.id)
-                                .where(task_tag.name.in_(task_tags)))
-            project_tags_subquery = (ProjectToTag.select()
-                                .join(project_tag)
-                                .where(ProjectToTag.project_id == Project.id)
-                                .where(project_tag.name.in_(project_tags)))
-
-            if len(task_tags) != 0 and len(project_tags) != 0:
-                query = query.where(
-                    (fn.EXISTS(task_tags_subquery)) | (fn.EXISTS(project_tags_subquery))
-                )
-            elif len(task_tags) != 0 and len(project_tags) == 0:
-                query = query.where(fn.EXISTS(task_tags_subquery))
-            elif len(task_tags) == 0 and len(project_tags) != 0:
-                query = query.where(fn.EXISTS(project_tags_subquery))
-
-    except OperationalError:  # can occur when a table doesn't exist
-        print_error_box("The database isn't initialized properly!")
+            query = get_recap_query(
+                date_range, project_name, task_tags, project_tags, match, tag_query
+            )
+            # the tasks themselves are only loaded page by page, while they are displayed
+            found = query.exists()
+    except OperationalError as error:
+        print_query_error(error)
 
-    if query.count() == 0:
+    if not found:
         print("No tasks found!")
         return
 
-    query = query.order_by(Task.start)
-    app = RecapDisplay(query, settings, id_)
+    from .tui import RecapDisplay
+
+    settings = load_settings()
+    # without tags or a search, the sections and their totals are looked up in the rollup
+    summarize = None
+    untagged = len(task_tags) == 0 and len(project_tags) == 0 and len(tag_query) == 0
+    if untagged and match is None:
+        summarize = partial(
+            get_rollup_section_summary, project_name, settings.sections, date_range, settings.tz
+        )
+    app = RecapDisplay(query, settings, id_, summarize)
     app.run()
 
 
 @app.command()
-def export(file_type: FileType) -> None:
-    task_tag = Tag.alias()
-    project_tag = Tag.alias()
-    concat_task_tags = fn.GROUP_CONCAT(task_tag.name.distinct()).alias("task_tags")
-    concat_project_tags = fn.GROUP_CONCAT(project_tag.name.distinct()).alias("project_tags")
+def report(
+    start_input: Annotated[Optional[str], typer.Argument()] = None,
+    end_input: Annotated[Optional[str], typer.Argument()] = None,
+    groups: Annotated[Optional[list[GroupType]], typer.Option("-b", "--by")] = None,
+    project_name: Annotated[Optional[str], typer.Option("-p", "--project")] = None,
+    tags_as_str: Annotated[Optional[str], typer.Option("-t", "--tags")] = None,
+    task_tags_as_str: Annotated[Optional[str], typer.Option("-tt", "--task_tags")] = None,
+    project_tags_as_str: Annotated[Optional[str], typer.Option("-pt", "--project_tags")] = None,
+    raw: Annotated[bool, typer.Option("-r", "--raw")] = False
+) -> None:
+    from peewee import OperationalError
+
+    from .display import display_report
+    from .models import db, get_timezone
+    from .parsers import parse_date_range, parse_tags
+    from .queries import get_report_query
+
+    date_range = None
+    if start_input is not None or end_input is not None:
+        date_range = parse_date_range(start_input, end_input)
+    task_tags, project_tags = parse_tags(tags_as_str, task_tags_as_str, project_tags_as_str)
+    # each group is only used once, in the order, in which it has been given first
+    group_names = list(dict.fromkeys(group.value for group in groups or [GroupType.project]))
+
     try:
         with db:
-            tasks = (Task.select(Task, Project, concat_task_tags, concat_project_tags)
-                         .join(TaskToTag, JOIN.LEFT_OUTER)
-                         .join(task_tag, JOIN.LEFT_OUTER)
-                         .switch(Task)
-                         .join(Project)
-                         .join(ProjectToTag, JOIN.LEFT_OUTER)
-                         .join(project_tag, JOIN.LEFT_OUTER)
-                         .group_by(Task.id)
-                         .order_by(Task.start))
+            query = get_report_query(
+                group_names, date_range, project_name, task_tags, project_tags, get_timezone()
+            )
+            # the groups are streamed from the cursor, like the tasks of an export
+            display_report(raw, group_names, query.iterator())
+    except OperationalError:  # can occur when a table doesn't exist
+        print_error_box("The database isn't initialized properly!")
+
+
+@app.command()
+def search(
+    match: str,
+    limit: Annotated[int, typer.Option("-l", "--limit")] = 20,
+    raw: Annotated[bool, typer.Option("-r", "--raw")] = False
+) -> None:
+    from peewee import OperationalError
+
+    from .display import display_search_results
+    from .models import db
+    from .queries import get_search_query
+    from .settings import load_settings
+
+    tz = load_settings().tz
+    try:
+        with db:
+            display_search_results(raw, get_search_query(match, limit).iterator(), tz)
+    except OperationalError as error:
+        print_query_error(error)
+
+
+def print_query_error(error: Exception) -> None:
+    # SQLite reports invalid search queries like any other error
+    if str(error).startswith("fts5:"):
+        print_error_box(f"The search query is invalid, {error}!")
+    # can occur when a table doesn't exist
+    print_error_box("The database isn't initialized properly!")
+
+
+@app.command()
+def export(
+    ctx: typer.Context,
+    file_type: FileType,
+    start_input: Annotated[Optional[str], typer.Argument()] = None,
+    end_input: Annotated[Optional[str], typer.Argument()] = None,
+    project_name: Annotated[Optional[str], typer.Option("-p", "--project")] = None,
+    tags_as_str: Annotated[Optional[str], typer.Option("-t", "--tags")] = None,
+    task_tags_as_str: Annotated[Optional[str], typer.Option("-tt", "--task_tags")] = None,
+    project_tags_as_str: Annotated[Optional[str], typer.Option("-pt", "--project_tags")] = None,
+    match: Annotated[Optional[str], typer.Option("-m", "--match")] = None,
+    tag_query_as_str: Annotated[Optional[str], typer.Option("-tq", "--tag_query")] = None,
+    output: Annotated[Optional[Path], typer.Option("-o", "--output", allow_dash=True)] = None,
+    compress: Annotated[bool, typer.Option("-z", "--gzip")] = False,
+    since_last: Annotated[bool, typer.Option("-s", "--since-last")] = False
+) -> None:
+    from peewee import OperationalError
+
+    from .models import db
+    from .parsers import parse_date_range, parse_tag_query, parse_tags
+    from .queries import (
+        get_change_watermark,
+        get_changed_export_query,
+        get_deleted_task_ids,
+        get_export_query,
+    )
+    from .settings import load_settings
+    from .watermark import read_watermark, write_watermark
+
+    date_range = None
+    if start_input is not None or end_input is not None:
+        date_range = parse_date_range(start_input, end_input)
+    task_tags, project_tags = parse_tags(tags_as_str, task_tags_as_str, project_tags_as_str)
+    tag_query = [] if tag_query_as_str is None else parse_tag_query(tag_query_as_str)
+    # the changes of each database are numbered on their own, so they can't share a watermark
+    if since_last and len(db.attached) > 0:
+        print_error_box("Only a single database can be exported with --since-last!")
+    # the watermark is checked before the output is opened
+    watermark = read_watermark(ctx.obj) if since_last else None
+
+    tz = load_settings().tz
+    writers = {
+        "csv": write_tasks_to_csv,
+        "json": write_tasks_to_json,
+        "ndjson": write_tasks_to_ndjson,
+    }
+
+    to_stdout = output == Path("-")
+    file_path: Path | Traversable | None = output
+    if output is None or output.is_dir():
+        file_name = datetime.now(tz).strftime("%d-%m-%Y_%H-%M-%S") + f".{file_type.value}"
+        if compress:
+            file_name += ".gz"
+        file_path = (files("timetracker") if output is None else output).joinpath(file_name)
+
+    try:
+        with db, open_output(None if to_stdout else file_path, compress) as file:
+            deleted = None
+            # the same filters as in recap, which are all applied by SQLite
+            tasks = get_export_query(
+                date_range, project_name, task_tags, project_tags, match, tag_query
+            )
+            if since_last:
+                # the new watermark is read in the same transaction as the changes, so that no
+                # change can slip in between
+                new_watermark = get_change_watermark()
+                deleted = get_deleted_task_ids(watermark)
+                tasks = get_changed_export_query(tasks, watermark)
+            # the rows are streamed from the cursor, instead of being cached by the query
+            writers[file_type.value](tasks.iterator(), file, tz, deleted)
+    except OperationalError as error:
+        print_query_error(error)
+
+    if since_last:
+        write_watermark(ctx.obj, new_watermark)
+    if not to_stdout:
+        print(f"The completed tasks have been exported to {file_path}!")
+
+
+@contextmanager
+def open_output(path: Path | Traversable | None, compress: bool) -> Iterator[TextIO]:
+    # without a path, the export is written to stdout, so that it can be piped
+    with ExitStack() as stack:
+        binary = sys.stdout.buffer if path is None else stack.enter_context(path.open("wb"))
+        if compress:
+            import gzip
+
+            binary = stack.enter_context(gzip.GzipFile(fileobj=binary, mode="wb"))
+        file = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        try:
+            yield file
+        finally:
+            # detaching keeps the wrapper from closing stdout, once it's garbage collected
+            file.flush()
+            file.detach()
+
+
+def get_export_chunks(
+    tasks: Iterable["TaskRow"], tz: ZoneInfo, deleted: Optional[list[int]]
+) -> Iterator[list[tuple["Cell", ...]]]:
+    from .layout import CHUNK_SIZE, EXPORT_LAYOUT, compile_layout, render_chunks
+
+    chunks = render_chunks(compile_layout(EXPORT_LAYOUT, tz), tasks)
+    if deleted is None:
+        yield from chunks
+        return
+
+    # an incremental export marks every row as deleted or not, the deleted tasks come first and
+    # only have their ID, so that a task, which reuses the ID of a deleted one, isn't lost
+    blank = (None,) * (len(EXPORT_LAYOUT) - 1)
+    for i in range(0, len(deleted), CHUNK_SIZE):
+        yield [(id_, *blank, True) for id_ in deleted[i:i + CHUNK_SIZE]]
+    for rows in chunks:
+        yield [(*row, False) for row in rows]
+
+
+def get_export_keys(deleted: Optional[list[int]]) -> list[str]:
+    from .layout import EXPORT_LAYOUT
+
+    keys = [column.attribute for column in EXPORT_LAYOUT]
+    return keys if deleted is None else [*keys, "deleted"]
+
+
+def write_tasks_to_csv(
+    tasks: Iterable["TaskRow"], file: TextIO, tz: ZoneInfo, deleted: Optional[list[int]] = None
+) -> None:
+    from .layout import EXPORT_LAYOUT
+
+    writer = csv.writer(file)
+    headers = [column.header_name for column in EXPORT_LAYOUT]
+    writer.writerow(headers + ([] if deleted is None else ["Deleted"]))
+    for rows in get_export_chunks(tasks, tz, deleted):
+        writer.writerows(rows)
+
+
+def write_tasks_to_json(
+    tasks: Iterable["TaskRow"], file: TextIO, tz: ZoneInfo, deleted: Optional[list[int]] = None
+) -> None:
+    keys = get_export_keys(deleted)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    # the array is written chunk by chunk, with one object per line, so that it's never held in
+    # memory as a whole
+    separator = "[\n  "
+    for rows in get_export_chunks(tasks, tz, deleted):
+        objects = (encode(dict(zip(keys, row, strict=True))) for row in rows)
+        file.write(separator + ",\n  ".join(objects))
+        separator = ",\n  "
+    file.write("[]\n" if separator == "[\n  " else "\n]\n")
+
+
+def write_tasks_to_ndjson(
+    tasks: Iterable["TaskRow"], file: TextIO, tz: ZoneInfo, deleted: Optional[list[int]] = None
+) -> None:
+    keys = get_export_keys(deleted)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for rows in get_export_chunks(tasks, tz, deleted):
+        file.write("".join(encode(dict(zip(keys, row, strict=True))) + "\n" for row in rows))
+
+
+@app.command("import")
+def import_tasks(
+    file_type: FileType,
+    path: Annotated[Path, typer.Argument(allow_dash=True)],
+    compress: Annotated[bool, typer.Option("-z", "--gzip")] = False
+) -> None:
+    from peewee import OperationalError
+
+    from .models import db
+    from .settings import load_settings
+
+    readers = {
+        "csv": read_tasks_from_csv,
+        "json": read_tasks_from_json,
+        "ndjson": read_tasks_from_ndjson,
+    }
+
+    tz = load_settings().tz
+    start = time.perf_counter()
+    try:
+        input_path = None if path == Path("-") else path
+        with db.connection_context(), open_input(input_path, compress) as file:
+            count = insert_tasks(readers[file_type.value](file), tz)
+    except FileNotFoundError:
+        print(f'The file "{path}" does not exist!')
+        raise SystemExit(1) from None
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
+    except (KeyError, ValueError) as e:
+        print_error_box(f"The tasks couldn't be imported, nothing has been changed!\n{e!r}")
+    duration = time.perf_counter() - start
+
+    print(
+        f"{count} tasks have been imported in {duration:.2f}s "
+        f"({count / duration:,.0f} rows/s)"
+    )
+
+
+@contextmanager
+def open_input(path: Optional[Path], compress: bool) -> Iterator[TextIO]:
+    # without a path, the tasks are read from stdin
+    with ExitStack() as stack:
+        binary = sys.stdin.buffer if path is None else stack.enter_context(path.open("rb"))
+        if compress:
+            import gzip
+
+            binary = stack.enter_context(gzip.GzipFile(fileobj=binary, mode="rb"))
+        file = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+        try:
+            yield file
+        finally:
+            file.detach()
+
+
+def read_tasks_from_csv(file: TextIO) -> Iterator[dict[str, str]]:
+    from .layout import EXPORT_LAYOUT
+
+    attributes = {column.header_name: column.attribute for column in EXPORT_LAYOUT}
+    attributes["Deleted"] = "deleted"
+    reader = csv.reader(file)
+    keys = [attributes.get(header, header) for header in next(reader, [])]
+    for row in reader:
+        yield dict(zip(keys, row, strict=True))
+
+
+def read_tasks_from_json(file: TextIO) -> Iterator[dict[str, Any]]:
+    # the array is decoded object by object, while it's read piece by piece
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        message = "the file doesn't contain a JSON array"
+        raise ValueError(message)
+    position = 1
+    while True:
+        position = separators.match(buffer, position).end()
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            if position == len(buffer):
+                message = "the array is incomplete"
+                raise json.JSONDecodeError(message, buffer, position)
+            task, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # the next object doesn't fit into the buffer, unless the file has ended
+            piece = file.read(READ_SIZE)
+            if piece == "":
+                raise
+            buffer = buffer[position:] + piece
+            position = 0
+            continue
+        yield task
+
+
+def read_tasks_from_ndjson(file: TextIO) -> Iterator[dict[str, Any]]:
+    for line in file:
+        if not line.isspace():
+            yield json.loads(line)
+
 
-    file_name = datetime.now(settings.tz).strftime("%d-%m-%Y_%H-%M-%S")
-    file_path = files("timetracker").joinpath(file_name)
-
-    if file_type.value == "csv":
-        file_path = file_path.with_suffix(".csv")
-        write_tasks_to_csv(tasks, file_path)
-    elif file_type.value == "json":
-        file_path = file_path.with_suffix(".json")
-        write_tasks_to_json(tasks, file_path)
-    else:
-        raise ValueError
-
-    print("A list with all completed tasks has been exported!")
-
-
-def write_tasks_to_csv(tasks: Iterable[Task], path: Path | Traversable) -> None:
-    with path.open("w", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            "ID",
-            "Project",
-            "Project Tags",
-            "Task",
-            "Task Tags",
-            "Note",
-            "Start",
-            "End",
-            "Target",
-            "Duration",
+def insert_tasks(rows: Iterable[dict[str, Any]], tz: ZoneInfo) -> int:
+    from peewee import chunked
+
+    from .models import db
+
+    # all tasks are imported in one transaction, so that a failed import leaves nothing behind
+    with db.atomic("IMMEDIATE"):
+        importer = TaskImporter(tz)
+        # the tags of each batch are linked before its tasks are inserted, so that the triggers
+        # don't update the new tasks again, the foreign keys are checked, once it's committed
+        db.pragma("defer_foreign_keys", "on")
+        return sum(importer.insert_batch(batch) for batch in chunked(rows, INSERT_BATCH_SIZE))
+
+
+class TaskImporter:
+    # the names of projects, tags and texts are resolved in memory, only new ones are inserted
+    # right away
+    def __init__(self, tz: ZoneInfo) -> None:
+        from peewee import fn
+
+        from .models import (
+            Project,
+            ProjectToTag,
+            Tag,
+            Task,
+            TaskText,
+            TaskToTag,
+            change_sequence,
+            db,
+        )
+        from .time_utils import DatetimeParser
+
+        self.parser = DatetimeParser(tz)
+        self.project_ids = dict(Project.select(Project.name, Project.id).tuples())
+        self.tag_ids = dict(Tag.select(Tag.name, Tag.id).tuples())
+        self.text_ids = dict(TaskText.select(TaskText.text, TaskText.id).tuples())
+        # the IDs are assigned here, so that the tags can be linked without reading the tasks
+        # back
+        self.task_id = Task.select(fn.MAX(Task.id)).scalar() or 0
+        # peewee would build the SQL of each inserted value again, which takes several times
+        # longer than the inserts themselves, so the statements are built once and executed for
+        # each row
+        self.insert_task = get_insert_sql(Task, [
+            Task.id,
+            Task.name_text,
+            Task.note_text,
+            Task.start,
+            Task.end,
+            Task.target,
+            Task.project,
+            Task.created_at,
+            Task.updated_at,
+            Task.change_seq,
         ])
-        for task in tasks:
-            if task.end is None:
+        self.insert_task_tag = get_insert_sql(
+            TaskToTag, [TaskToTag.task, TaskToTag.tag, TaskToTag.created_at, TaskToTag.updated_at]
+        )
+        self.insert_project_tag = get_insert_sql(
+            ProjectToTag, [ProjectToTag.project, ProjectToTag.tag]
+        )
+        # the timestamps are set here instead of by the triggers, the import holds the write lock,
+        # so no other change can get a later timestamp in the meantime
+        self.now = datetime.utcnow().isoformat(" ", "milliseconds")
+        # the tasks of an import are committed together, so they share a single change number
+        change_sequence.update(value=change_sequence.value + 1).execute(db)
+        self.change_seq = Task.select(change_sequence.value).from_(change_sequence).scalar()
+        self.tasks: list[tuple] = []
+        self.task_tags: list[tuple] = []
+        self.project_tags: list[tuple] = []
+
+    def get_tag_ids(self, tags_as_str: Optional[str]) -> set[int]:
+        from .models import Tag
+
+        ids = set()
+        for tag in map(str.strip, (tags_as_str or "").split(",")):
+            if tag == "":
                 continue
-            delta = task.end - task.start
-            duration = format_seconds(delta.total_seconds())
-            writer.writerow([
-                task.id,
-                task.project.name,
-                task.project_tags,
-                task.name,
-                task.task_tags,
-                task.note,
-                to_aware_string(task.start, settings.tz),
-                to_aware_string(task.end, settings.tz),
-                to_aware_string(task.target, settings.tz),
-                duration,
-            ])
-
-
-def write_tasks_to_json(tasks: Iterable[Task], path: Path | Traversable) -> None:
-    json_array = []
-    for task in tasks:
-        if task.end is None:
-            continue
-        delta = task.end - task.start
-        duration = format_seconds(delta.total_seconds())
-        json_array.append({
-            "id": task.id,
-            "project": task.project.name,
-            "project_tags": task.project_tags,
-            "task": task.name,
-            "task_tags": task.task_tags,
-            "note": task.note,
-            "start": to_aware_string(task.start, settings.tz),
-            "end": to_aware_string(task.end, settings.tz),
-            "target": to_aware_string(task.target, settings.tz),
-            "duration": duration,
-        })
-
-    with path.open("w", encoding="utf-8") as file:
-        json.dump(json_array, file, ensure_ascii=False, indent=2)
+            if tag not in self.tag_ids:
+                self.tag_ids[tag] = Tag.insert(name=tag).execute()
+            ids.add(self.tag_ids[tag])
+        return ids
+
+    def get_text_id(self, text: Optional[str]) -> Optional[int]:
+        from .models import TaskText
+
+        if text is None:
+            return None
+        if text not in self.text_ids:
+            self.text_ids[text] = TaskText.insert(text=text).execute()
+        return self.text_ids[text]
+
+    def get_project_id(self, row: dict[str, Any], start: int) -> int:
+        from .models import Project
+
+        project_id = self.project_ids.get(row["project"])
+        if project_id is None:
+            project_id = Project.insert(name=row["project"], start=start).execute()
+            self.project_ids[row["project"]] = project_id
+            self.project_tags.extend(
+                (project_id, tag_id) for tag_id in self.get_tag_ids(row["project_tags"])
+            )
+        return project_id
+
+    def add_row(self, row: dict[str, Any]) -> None:
+        from .models import to_epoch_seconds
+
+        start = to_epoch_seconds(self.parser.parse(row["start"]))
+        end = to_epoch_seconds(self.parser.parse(row["end"]))
+        if start is None or end is None:
+            message = f'the task "{row["task"]}" has no start or end'
+            raise ValueError(message)
+        project_id = self.get_project_id(row, start)
+        self.task_id += 1
+        target = to_epoch_seconds(self.parser.parse(row["target"]))
+        name_id = self.get_text_id(row["task"])
+        note_id = self.get_text_id(row["note"] or None)
+        self.tasks.append((
+            self.task_id,
+            name_id,
+            note_id,
+            start,
+            end,
+            target,
+            project_id,
+            self.now,
+            self.now,
+            self.change_seq,
+        ))
+        self.task_tags.extend(
+            (self.task_id, tag_id, self.now, self.now)
+            for tag_id in self.get_tag_ids(row["task_tags"])
+        )
+
+    def insert_batch(self, rows: Iterable[dict[str, Any]]) -> int:
+        from .models import db
+
+        for row in rows:
+            # the tasks, which have been deleted according to an incremental export
+            if row.get("deleted") not in [True, "True"]:
+                self.add_row(row)
+        cursor = db.cursor()
+        cursor.executemany(self.insert_task_tag, self.task_tags)
+        cursor.executemany(self.insert_task, self.tasks)
+        cursor.executemany(self.insert_project_tag, self.project_tags)
+        count = len(self.tasks)
+        self.tasks, self.task_tags, self.project_tags = [], [], []
+        return count
+
+
+def get_insert_sql(model: type["Model"], fields: list["Field"]) -> str:
+    sql, _ = model.insert_many([[None] * len(fields)], fields=fields).sql()
+    return sql
+
+
+@app.command()
+def merge(paths: list[Path]) -> None:
+    from peewee import OperationalError
+
+    from .attached import SOURCE_SCHEMA, merge_database
+    from .models import db, upgrade_db
+
+    for path in paths:
+        if not path.is_file():
+            print(f'The file "{path}" does not exist!')
+            raise SystemExit(1)
+
+    start = time.perf_counter()
+    try:
+        with db.connection_context():
+            for path in paths:
+                upgrade_db(path)
+                # databases can't be attached within a transaction
+                db.execute_sql("ATTACH DATABASE ? AS ?", (str(path), SOURCE_SCHEMA))
+                try:
+                    with db.atomic("IMMEDIATE"):
+                        count = merge_database(db)
+                finally:
+                    db.execute_sql("DETACH DATABASE ?", (SOURCE_SCHEMA,))
+                print(f'{count} tasks have been merged from "{path}"')
+    except OperationalError:  # can occur when a table doesn't exist
+        print_error_box("The database isn't initialized properly!")
+    except ValueError as e:
+        print_error_box(f'The tasks of "{path}" couldn\'t be merged!\n{e}')
+    update_state()
+
+    print(f"The databases have been merged in {time.perf_counter() - start:.2f}s")
+
+
+@app.command()
+def rollup() -> None:
+    from peewee import OperationalError
+
+    from .models import db
+    from .settings import load_settings
+
+    start = time.perf_counter()
+    try:
+        with db:
+            rebuild_rollup(load_settings().tz)
+    except OperationalError:  # can occur when a table doesn't exist
+        print_error_box("The database isn't initialized properly!")
+
+    print(f"The daily totals have been rebuilt in {time.perf_counter() - start:.2f}s")
+
+
+def rebuild_rollup(tz: ZoneInfo) -> None:
+    from .migrations import rebuild_task_rollup, set_utc_offsets
+    from .models import db
+    from .time_utils import get_utc_offsets
+
+    # the days of the rollup depend on the timezone, so they are rebuilt along with its offsets
+    with db.atomic():
+        set_utc_offsets(db, get_utc_offsets(tz))
+        rebuild_task_rollup(db)
 
 
 @app.command("settings")
@@ -430,6 +943,9 @@ def set_settings(
     set_: tuple[str, str],
     list_: Annotated[bool, typer.Option("-l", "--list")] = False
 ) -> None:
+    from .settings import load_settings, save_settings
+
+    settings = load_settings()
     if set_ is None and not list_:
         print("At least one of the two possible flags, --set or --list, must be specified!")
         return
@@ -442,9 +958,18 @@ def set_settings(
             return
 
         setattr(settings, key, value)
-        with files("timetracker").joinpath("settings.json").open("w") as file:
-            json.dump(settings.model_dump(mode="json"), file, ensure_ascii=False, indent=2)
+        save_settings(settings)
         print(f"{key} has been set to {value}")
+        if key == "tz":
+            from peewee import OperationalError
+
+            from .models import db
+
+            try:
+                with db:
+                    rebuild_rollup(settings.tz)
+            except OperationalError:  # the migrations build the rollup, once the tables exist
+                pass
         if list_:
             print()
 
@@ -460,6 +985,7 @@ def edit(table_type: TableType, specifier: str, attribute: str, value: str) -> N
         changed = edit_task(specifier, attribute, value)
     elif table_type in ["project", "p"]:
         changed = edit_project(specifier, attribute, value)
+    update_state()
 
     match changed:
         case 0:
@@ -471,20 +997,34 @@ def edit(table_type: TableType, specifier: str, attribute: str, value: str) -> N
 
 
 def edit_task(id_: int, attribute: str, value: Optional[str]) -> int:
+    from peewee import OperationalError
+
+    from .models import Task, db, intern_texts
+
     if attribute == "tags":
         print_error_box("not yet implemented")
     try:
         with db:
+            if attribute in ["name", "note"]:
+                # the tasks only store the ids of their interned names and notes
+                value = intern_texts([value]).get(value)
+                attribute = f"{attribute}_text"
             changed = (Task.update({attribute: value})
                            .where(Task.id == id_)
                            .execute())
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
+    except ValueError as e:  # can occur when a datetime is malformed
+        print_error_box(f'"{value}" isn\'t a valid {attribute}!\n{e}')
 
     return changed
 
 
 def edit_project(name: str, attribute: str, value: Optional[str]) -> int:
+    from peewee import OperationalError
+
+    from .models import Project, db
+
     if attribute == "tags":
         print_error_box("not yet implemented")
     try:
@@ -494,5 +1034,7 @@ def edit_project(name: str, attribute: str, value: Optional[str]) -> int:
                               .execute())
     except OperationalError:  # can occur when a table doesn't exist
         print_error_box("The database isn't initialized properly!")
+    except ValueError as e:  # can occur when a datetime is malformed
+        print_error_box(f'"{value}" isn\'t a valid {attribute}!\n{e}')
 
     return changed
@@ -1,21 +1,23 @@
-from collections.abc import Sequence
-from datetime import datetime, timedelta
+from collections.abc import Iterator
+from datetime import datetime
 from time import sleep
 from zoneinfo import ZoneInfo
 
 from peewee import ModelSelect
 from rich import box
 from rich.console import Console
-from rich.live import Live
 from rich.table import Table
-from textual.app import App, ComposeResult
-from textual.binding import Binding
-from textual.reactive import reactive
-from textual.widgets import Footer, Static
 
 from .models import Task
-from .settings import Settings
-from .time_utils import format_seconds, get_time_as_ascii_string, to_aware_string
+from .queries import TaskRow
+from .time_utils import (
+    DatetimeFormatter,
+    format_seconds,
+    get_raw_status,
+    get_status_message_with_target,
+    get_status_message_without_target,
+    to_aware_string,
+)
 
 
 def display_status(type_: str, task: Task, tz: ZoneInfo) -> None:
@@ -25,6 +27,9 @@ def display_status(type_: str, task: Task, tz: ZoneInfo) -> None:
         case "table" | "t":
             display_status_table(task, tz)
         case "fullscreen" | "f":
+            # textual is by far the heaviest dependency, so it's only imported when needed
+            from .tui import StatusDisplay
+
             app = StatusDisplay(task)
             app.run()
         case "raw" | "r":
@@ -34,15 +39,7 @@ def display_status(type_: str, task: Task, tz: ZoneInfo) -> None:
 
 
 def display_raw_time(task: Task) -> None:
-    print(f"{task.project.name} > {task.name}")
-    # this is to avoid rounding errors
-    start = task.start.replace(microsecond=0)
-    target = None if task.target is None else task.target.replace(microsecond=0)
-    if target is None:
-        message = get_status_message_without_target(start)
-    else:
-        message = get_status_message_with_target(start, target)
-    print(message)
+    print(get_raw_status(task.project.name, task.name, task.start, task.target))
 
 
 def display_updating_time(task: Task) -> None:
@@ -64,28 +61,6 @@ def display_updating_time(task: Task) -> None:
             raise SystemExit(0) from None
 
 
-def get_status_message_without_target(start: datetime) -> str:
-    delta = datetime.utcnow() - start
-    string = format_seconds(delta.total_seconds())
-    return f"The task has been running for {string}"
-
-
-def get_status_message_with_target(start: datetime, target: datetime) -> str:
-    now = datetime.utcnow().replace(microsecond=0)
-    start_delta = now - start
-    start_string = format_seconds(start_delta.total_seconds())
-    target_delta = target - now
-    target_string = format_seconds(target_delta.total_seconds())
-
-    message = f"The task has been running for {start_string} and the target "
-    if target_delta.total_seconds() > 0:
-        message += f"is reached in {target_string}"
-    else:
-        message += f"has been reached {target_string} ago"
-
-    return message
-
-
 def display_project_list(raw: bool, projects: ModelSelect, all_: bool, tz: ZoneInfo) -> None:
     if raw:
         display_raw_project_list(projects, all_, tz)
@@ -96,6 +71,7 @@ def display_project_list(raw: bool, projects: ModelSelect, all_: bool, tz: ZoneI
 def display_project_list_as_table(projects: ModelSelect, include_finished: bool, tz: ZoneInfo
 ) -> None:
     table = Table("Project", "Tags", "Started", show_lines=True, box=box.ROUNDED)
+    formatter = DatetimeFormatter(tz)
 
     if include_finished:
         table.add_column("Finished")
@@ -103,15 +79,15 @@ def display_project_list_as_table(projects: ModelSelect, include_finished: bool,
             table.add_row(
                 project["name"],
                 project["tags"],
-                to_aware_string(project["start"], tz, "%d/%m/%Y %H:%M:%S"),
-                to_aware_string(project["end"], tz, "%d/%m/%Y %H:%M:%S"),
+                formatter.format_datetime(project["start"]),
+                formatter.format_datetime(project["end"]),
             )
     else:
         for project in projects.dicts().execute():
             table.add_row(
                 project["name"],
                 project["tags"],
-                to_aware_string(project["start"], tz, "%d/%m/%Y %H:%M:%S"),
+                formatter.format_datetime(project["start"]),
             )
 
     console = Console()
@@ -119,6 +95,7 @@ def display_project_list_as_table(projects: ModelSelect, include_finished: bool,
 
 
 def display_raw_project_list(projects: ModelSelect, include_finished: bool, tz: ZoneInfo) -> None:
+    formatter = DatetimeFormatter(tz)
     if include_finished:
         print("Project | Tags | Started | Finished")
     else:
@@ -126,13 +103,67 @@ def display_raw_project_list(projects: ModelSelect, include_finished: bool, tz:
     for project in projects.dicts().execute():
         message = f"{project['name']}"
         message += f" | {project['tags']}"
-        message += f" | {to_aware_string(project['start'], tz, '%d/%m/%Y %H:%M:%S')}"
+        message += f" | {formatter.format_datetime(project['start'])}"
         if include_finished:
-            message += f" | {to_aware_string(project['end'], tz, '%d/%m/%Y %H:%M:%S')}"
+            message += f" | {formatter.format_datetime(project['end'])}"
         print(message)
 
 
+def display_report(raw: bool, groups: list[str], rows: Iterator[tuple]) -> None:
+    headers = [group.capitalize() for group in groups] + ["Tasks", "Duration"]
+    if raw:
+        # each group is printed as soon as it's read, so that raw reports can be piped
+        print(" | ".join(headers))
+        for *keys, count, seconds in rows:
+            cells = [key or "-" for key in keys]
+            print(" | ".join([*cells, str(count), format_seconds(round(seconds))]))
+        return
+
+    table = Table(*headers, box=box.ROUNDED)
+    for *keys, count, seconds in rows:
+        table.add_row(*[key or "-" for key in keys], str(count), format_seconds(round(seconds)))
+    if table.row_count == 0:
+        print("No tasks found!")
+        return
+
+    console = Console()
+    console.print(table)
+
+
+def display_search_results(raw: bool, tasks: Iterator[TaskRow], tz: ZoneInfo) -> None:
+    headers = ["ID", "Project", "Task", "Note", "Start", "Duration"]
+    formatter = DatetimeFormatter(tz)
+
+    def get_cells(task: TaskRow) -> list[str]:
+        # running tasks are found as well, they don't have a duration yet
+        duration = "-"
+        if task.end is not None:
+            duration = format_seconds((task.end - task.start).total_seconds())
+        return [
+            str(task.id_), task.project, task.name, task.note or "-",
+            formatter.format_datetime(task.start), duration,
+        ]
+
+    if raw:
+        print(" | ".join(headers))
+        for task in tasks:
+            print(" | ".join(get_cells(task)))
+        return
+
+    table = Table(*headers, box=box.ROUNDED)
+    for task in tasks:
+        table.add_row(*get_cells(task))
+    if table.row_count == 0:
+        print("No tasks found!")
+        return
+
+    console = Console()
+    console.print(table)
+
+
 def display_status_table(task: Task, tz: ZoneInfo) -> None:
+    from rich.live import Live
+
     def generate_status_table() -> Table:
         now = datetime.utcnow()
         start_delta = now - task.start
@@ -163,138 +194,3 @@ def display_status_table(task: Task, tz: ZoneInfo) -> None:
                 sleep(0.2)
             except KeyboardInterrupt:
                 raise SystemExit(0) from None
-
-
-class StatusDisplay(App):
-    BINDINGS = [
-        Binding("q", "quit", "Quit", priority=True),
-    ]
-
-    class Clock(Static):
-        time_str = reactive("00:00:00")
-
-        def __init__(self, task: Task) -> None:
-            super().__init__("")
-            self.task_ = task
-
-        def on_mount(self) -> None:
-            if self.task_.target is not None:
-                self.set_interval(0.25, self.update_target)
-            else:
-                self.set_interval(0.25, self.update_run_time)
-            self.styles.height = "100%"
-            self.styles.content_align = ("center", "middle")
-            self.styles.border = ("heavy", "white")
-            self.styles.border_title_style = "bold"
-            self.border_title = f"{self.task_.project.name} > {self.task_.name}"
-            self.border_subtitle = "press q to quit"
-
-        def update_run_time(self) -> None:
-            delta = datetime.utcnow() - self.task_.start
-            self.time_str = format_seconds(delta.total_seconds())
-
-        def update_target(self) -> None:
-            delta = self.task_.target - datetime.utcnow()
-            self.time_str = format_seconds(delta.total_seconds())
-
-        def watch_time_str(self, time_str: str) -> None:
-            self.update(get_time_as_ascii_string(time_str))
-
-    def __init__(self, task: Task) -> None:
-        super().__init__()
-        self.task_ = task
-
-    def compose(self) -> ComposeResult:
-        clock = self.Clock(self.task_)
-        yield clock
-
-
-class RecapDisplay(App):
-    BINDINGS = [
-        Binding("q", "quit", "Quit", priority=True),
-        Binding("j", "scroll(10)", "Scroll Down", priority=True),
-        Binding("k", "scroll( -10)", "Scroll Up", priority=True),
-    ]
-
-    def __init__(self, tasks: Sequence[Task], settings: Settings, id_: bool) -> None:
-        super().__init__()
-        self.tasks = tasks
-        self.settings = settings
-        self.id_ = id_
-
-    def action_scroll(self, y: int) -> None:
-        self.screen.scroll_relative(0, y)
-
-    def compose(self) -> ComposeResult:
-        table = Table(expand=True, row_styles=["white on grey19", "white"], box=box.ROUNDED)
-
-        if self.id_:
-            table.add_column("ID")
-        for column in self.settings.recap_layout:
-            table.add_column(column.header_name)
-
-        total_duration = timedelta()
-        previous_task_start = self.tasks[0].start
-        for task in self.tasks:
-            if self.new_section_started(previous_task_start, task.start):
-                table.add_section()
-            previous_task_start = task.start
-
-            args = []
-            if self.id_:
-                args.append(str(task.id))
-            for column in self.settings.recap_layout:
-                if column.attribute == "project":
-                    args.append(task.project.name)
-                elif column.attribute == "task":
-                    args.append(task.name)
-                elif column.attribute == "note":
-                    args.append(task.note)
-                elif column.attribute == "start":
-                    format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
-                    args.append(to_aware_string(task.start, self.settings.tz, format_spec))
-                elif column.attribute == "end":
-                    format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
-                    args.append(to_aware_string(task.end, self.settings.tz, format_spec))
-                elif column.attribute == "target":
-                    format_spec = column.options.get("format", "%d/%m/%Y %H:%M:%S")
-                    args.append(to_aware_string(task.target, self.settings.tz, format_spec))
-                elif column.attribute == "duration":
-                    delta = task.end - task.start
-                    total_duration += delta
-                    args.append(format_seconds(delta.total_seconds()))
-                elif column.attribute == "id":
-                    args.append(str(task.id))
-                elif column.attribute == "task_tags":
-                    args.append(task.task_tags)
-                elif column.attribute == "project_tags":
-                    args.append(task.project_tags)
-
-            table.add_row(*args)
-
-        if self.settings.show_total:
-            table.add_section()
-            args = [""] * (len(self.settings.recap_layout) - 2)
-            args += ["total", format_seconds(total_duration.total_seconds())]
-            table.add_row(*args)
-
-        yield Static(table)
-        yield Footer()
-
-    def new_section_started(self, previous_dt: datetime, next_dt: datetime) -> bool:
-        if self.settings.sections == "none":
-            return False
-        elif self.settings.sections == "days":
-            return (
-                previous_dt.day != next_dt.day
-                or previous_dt.month != next_dt.month
-                or previous_dt.year != next_dt.year
-            )
-        elif self.settings.sections == "weeks":
-            week_end = previous_dt + timedelta(days=6 - previous_dt.weekday())
-            week_end = week_end.replace(hour=23, minute=59, second=59, microsecond=999999)
-            return next_dt > week_end
-        elif self.settings.sections == "months":
-            return previous_dt.month != next_dt.month or previous_dt.year != next_dt.year
-        else:
-            raise ValueError
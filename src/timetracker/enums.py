@@ -14,6 +14,7 @@ class DisplayType(str, Enum):
 
 class FileType(str, Enum):
     json = "json"
+    ndjson = "ndjson"
     csv = "csv"
 
 
@@ -22,3 +23,12 @@ class TableType(str, Enum):
     t = "t"
     project = "project"
     p = "p"
+
+
+class GroupType(str, Enum):
+    project = "project"
+    task = "task"
+    tag = "tag"
+    day = "day"
+    week = "week"
+    month = "month"
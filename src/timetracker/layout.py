@@ -0,0 +1,92 @@
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import chain, islice
+from operator import attrgetter
+from typing import TYPE_CHECKING, Optional
+from zoneinfo import ZoneInfo
+
+from .settings import Column
+from .time_utils import DEFAULT_FORMAT, DatetimeFormatter, DurationFormatter
+
+if TYPE_CHECKING:
+    from .queries import TaskRow
+
+Cell = Optional[str | int]
+# a renderer turns a chunk of tasks into the cells of one column
+Renderer = Callable[[Sequence["TaskRow"]], list[Cell]]
+
+# the attributes, which are shown as they are, and the fields of TaskRow, which hold them
+FIELDS = {
+    "project": "project",
+    "task": "name",
+    "note": "note",
+    "id": "id_",
+    "task_tags": "task_tags",
+    "project_tags": "project_tags",
+}
+DATETIME_ATTRIBUTES = ["start", "end", "target"]
+CHUNK_SIZE = 1000
+EXPORT_LAYOUT = [
+    Column(attribute="id", header_name="ID"),
+    Column(attribute="project", header_name="Project"),
+    Column(attribute="project_tags", header_name="Project Tags"),
+    Column(attribute="task", header_name="Task"),
+    Column(attribute="task_tags", header_name="Task Tags"),
+    Column(attribute="note", header_name="Note"),
+    Column(attribute="start", header_name="Start"),
+    Column(attribute="end", header_name="End"),
+    Column(attribute="target", header_name="Target"),
+    Column(attribute="duration", header_name="Duration"),
+]
+
+
+def compile_column(column: Column, tz: ZoneInfo) -> Renderer:
+    if column.attribute in FIELDS:
+        get_field = attrgetter(FIELDS[column.attribute])
+
+        def render_field(tasks: Sequence["TaskRow"]) -> list[Cell]:
+            return list(map(get_field, tasks))
+
+        return render_field
+
+    if column.attribute in DATETIME_ATTRIBUTES:
+        get_datetime = attrgetter(column.attribute)
+        datetime_formatter = DatetimeFormatter(tz, column.options.get("format", DEFAULT_FORMAT))
+
+        def render_datetime(tasks: Sequence["TaskRow"]) -> list[Cell]:
+            return list(map(datetime_formatter.format_datetime, map(get_datetime, tasks)))
+
+        return render_datetime
+
+    if column.attribute == "duration":
+        duration_formatter = DurationFormatter()
+
+        def render_duration(tasks: Sequence["TaskRow"]) -> list[Cell]:
+            return [
+                duration_formatter.format_duration((task.end - task.start).total_seconds())
+                for task in tasks
+            ]
+
+        return render_duration
+
+    raise ValueError
+
+
+# the layout is compiled once, so that rendering a cell doesn't depend on its attribute anymore
+def compile_layout(layout: list[Column], tz: ZoneInfo) -> list[Renderer]:
+    return [compile_column(column, tz) for column in layout]
+
+
+def render_chunks(
+    renderers: list[Renderer], tasks: Iterable["TaskRow"], chunk_size: int = CHUNK_SIZE
+) -> Iterator[list[tuple[Cell, ...]]]:
+    # the tasks are rendered in chunks, column by column, so that each renderer is only called
+    # once for each chunk, while no more than one chunk is held in memory
+    tasks = iter(tasks)
+    while chunk := list(islice(tasks, chunk_size)):
+        yield list(zip(*[render(chunk) for render in renderers], strict=True))
+
+
+def render_rows(
+    renderers: list[Renderer], tasks: Iterable["TaskRow"], chunk_size: int = CHUNK_SIZE
+) -> Iterator[tuple[Cell, ...]]:
+    return chain.from_iterable(render_chunks(renderers, tasks, chunk_size))
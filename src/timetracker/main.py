@@ -1,37 +1,38 @@
 import json
 from importlib.resources import files
-from typing import Annotated
 
+import click
 import typer
+from typer.core import TyperGroup
 
 from .commands import app as commands_app
 
-app = typer.Typer(context_settings={"help_option_names": ["-h", "--help"]})
+HELP_OPTION_NAMES = ["-h", "--help"]
+
+
+class HelpGroup(TyperGroup):
+    # help.json is only loaded, if the help is actually going to be displayed
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if len(args) == 0 or any(arg in HELP_OPTION_NAMES for arg in args):
+            add_help_texts(self)
+        return super().parse_args(ctx, args)
+
+
+def add_help_texts(group: click.Group) -> None:
+    with files("timetracker").joinpath("help.json").open("r") as file:
+        help_ = json.load(file)
+
+    for param in group.params:
+        if param.name in help_[group.callback.__name__]["parameters"]:
+            param.help = help_[group.callback.__name__]["parameters"][param.name]
+
+    for command in group.commands.values():
+        function_name = command.callback.__name__
+        command.help = help_[function_name]["help"]
+        for param in command.params:
+            param.help = help_[function_name]["parameters"][param.name]
+
+
+app = typer.Typer(cls=HelpGroup, context_settings={"help_option_names": HELP_OPTION_NAMES})
 app.registered_commands += commands_app.registered_commands
 app.registered_callback = commands_app.registered_callback
-
-# add help texts to commands and arguments
-with files("timetracker").joinpath("help.json").open("r") as file:
-    _help = json.load(file)
-
-for function in app.registered_commands:
-    function_name = function.callback.__name__
-    function.help = _help[function_name]["help"]
-
-    annotations = function.callback.__annotations__
-    for key in annotations:
-        if key == "return":
-            continue
-        if not hasattr(annotations[key], "__metadata__"):
-            annotations[key] = Annotated[annotations[key], typer.Argument()]
-        annotations[key].__metadata__[0].help = _help[function_name]["parameters"][key]
-
-callback = app.registered_callback
-callback_name = callback.callback.__name__
-annotations = callback.callback.__annotations__
-for key in annotations:
-    if key == "return":
-        continue
-    if not hasattr(annotations[key], "__metadata__"):
-        annotations[key] = Annotated[annotations[key], typer.Argument()]
-    annotations[key].__metadata__[0].help = _help[callback_name]["parameters"][key]
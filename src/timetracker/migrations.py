@@ -0,0 +1,682 @@
+# The schema version is stored in `PRAGMA user_version`. A database with version n has had the
+# first n migrations applied. New migrations must only ever be appended to `MIGRATIONS`.
+from calendar import timegm
+from collections.abc import Callable
+from datetime import datetime
+from typing import Optional
+
+from peewee import SqliteDatabase
+
+
+def add_indexes(db: SqliteDatabase) -> None:
+    # `recap` and `export` filter and sort by the time columns
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "task_start" ON "task" ("start")')
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "task_end" ON "task" ("end") WHERE "end" IS NOT NULL'
+    )
+    # `start`, `stop` and `status` look for the running task, of which there is at most one
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "task_running" ON "task" ("end") WHERE "end" IS NULL'
+    )
+
+    # the primary keys of the link tables only cover the lookup of tags by task/project,
+    # these indexes cover the reverse direction without having to visit the table
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "task_to_tag_tag_id_task_id" '
+        'ON "task_to_tag" ("tag_id", "task_id")'
+    )
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "project_to_tag_tag_id_project_id" '
+        'ON "project_to_tag" ("tag_id", "project_id")'
+    )
+    # made redundant by the primary keys and the indexes above
+    for index in [
+        "task_to_tag_task_id",
+        "task_to_tag_tag_id",
+        "project_to_tag_project_id",
+        "project_to_tag_tag_id",
+    ]:
+        db.execute_sql(f'DROP INDEX IF EXISTS "{index}"')
+
+
+def add_task_interval_index(db: SqliteDatabase) -> None:
+    # R*Tree over the intervals of finished tasks in seconds since the epoch, which allows `recap`
+    # to find all tasks that overlap with a date range without scanning the task table;
+    # the coordinates are 32-bit floats, which SQLite rounds outwards, so the matches are a
+    # superset and the exact comparison still has to be done on the task table
+    db.execute_sql(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "task_interval" USING rtree("id", "start", "end")'
+    )
+    db.execute_sql(
+        'INSERT INTO "task_interval" ("id", "start", "end") '
+        """SELECT "id", strftime('%s', "start"), strftime('%s', "end") FROM "task" """
+        'WHERE "end" IS NOT NULL'
+    )
+    create_task_interval_triggers(db, lambda column: f"strftime('%s', {column})")
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_interval_delete" AFTER DELETE ON "task" BEGIN '
+        'DELETE FROM "task_interval" WHERE "id" = OLD."id"; '
+        "END"
+    )
+
+
+def create_task_interval_triggers(
+    db: SqliteDatabase, to_seconds: Callable[[str], str] = lambda column: column
+) -> None:
+    # the datetimes of the tasks were stored as ISO text, before they were stored in seconds
+    start, end = to_seconds('NEW."start"'), to_seconds('NEW."end"')
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_interval_insert" AFTER INSERT ON "task" '
+        'WHEN NEW."end" IS NOT NULL BEGIN '
+        f'INSERT INTO "task_interval" ("id", "start", "end") VALUES (NEW."id", {start}, {end}); '
+        "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_interval_update" '
+        'AFTER UPDATE OF "id", "start", "end" ON "task" BEGIN '
+        'DELETE FROM "task_interval" WHERE "id" = OLD."id"; '
+        f'INSERT INTO "task_interval" ("id", "start", "end") SELECT NEW."id", {start}, {end} '
+        'WHERE NEW."end" IS NOT NULL; '
+        "END"
+    )
+
+
+# the current time in the format, in which the datetimes are stored, with milliseconds
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+# the tables with `created_at` and `updated_at` and their primary keys
+TRACKED_TABLES = {
+    "project": ("id",),
+    "task": ("id",),
+    "task_to_tag": ("task_id", "tag_id"),
+    "project_to_tag": ("project_id", "tag_id"),
+}
+
+
+def add_change_tracking(db: SqliteDatabase) -> None:
+    # `export --since-last` only exports the tasks, which have changed since its last run; the
+    # timestamps are set by triggers, so that every write path, including `edit`, is covered
+    for table, keys in TRACKED_TABLES.items():
+        columns = [column.name for column in db.get_columns(table)]
+        for column in ["created_at", "updated_at"]:
+            if column not in columns:
+                db.execute_sql(f'ALTER TABLE "{table}" ADD COLUMN "{column}" DATETIME')
+        # existing tasks and projects are assumed to have been created when they were started,
+        # whose datetimes are already stored in seconds in a database, which has just been created
+        created_at = (
+            """CASE typeof("start") WHEN 'integer' """
+            """THEN strftime('%Y-%m-%d %H:%M:%f', "start", 'unixepoch') ELSE "start" END"""
+            if table in ["project", "task"]
+            else NOW
+        )
+        db.execute_sql(
+            f'UPDATE "{table}" SET "created_at" = {created_at}, "updated_at" = {NOW} '
+            'WHERE "created_at" IS NULL'
+        )
+
+        row = " AND ".join(f'"{key}" = NEW."{key}"' for key in keys)
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_set_created_at" AFTER INSERT ON "{table}" '
+            "BEGIN "
+            f'UPDATE "{table}" SET "created_at" = {NOW}, "updated_at" = {NOW} WHERE {row}; '
+            "END"
+        )
+        create_updated_at_trigger(db, table, keys)
+
+    # the exported row of a task includes its tags and the tags of its project, so changing
+    # them changes the task or project itself
+    for table, parent in [("task_to_tag", "task"), ("project_to_tag", "project")]:
+        touch_new = f'UPDATE "{parent}" SET "updated_at" = {NOW} WHERE "id" = NEW."{parent}_id"; '
+        touch_old = f'UPDATE "{parent}" SET "updated_at" = {NOW} WHERE "id" = OLD."{parent}_id"; '
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_insert_{parent}" AFTER INSERT ON "{table}" '
+            f"BEGIN {touch_new}END"
+        )
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_update_{parent}" '
+            f'AFTER UPDATE OF "{parent}_id", "tag_id" ON "{table}" BEGIN {touch_old}{touch_new}END'
+        )
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_delete_{parent}" AFTER DELETE ON "{table}" '
+            f"BEGIN {touch_old}END"
+        )
+
+    # deleted tasks leave a tombstone, so that the next export can report their deletion
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "task_tombstone" '
+        '("id" INTEGER NOT NULL PRIMARY KEY, "deleted_at" DATETIME NOT NULL)'
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_tombstone_insert" AFTER DELETE ON "task" BEGIN '
+        f'INSERT OR REPLACE INTO "task_tombstone" ("id", "deleted_at") VALUES (OLD."id", {NOW}); '
+        "END"
+    )
+
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "task_updated_at" ON "task" ("updated_at")')
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "task_tombstone_deleted_at" ON "task_tombstone" ("deleted_at")'
+    )
+
+
+def create_updated_at_trigger(db: SqliteDatabase, table: str, keys: tuple[str, ...]) -> None:
+    # updates, which only set the timestamps, mustn't trigger another one, so the trigger lists
+    # all other columns and has to be recreated, whenever a column is added
+    columns = [column.name for column in db.get_columns(table)]
+    tracked = ", ".join(
+        f'"{column}"'
+        for column in columns
+        if column not in ["created_at", "updated_at", "change_seq"]
+    )
+    row = " AND ".join(f'"{key}" = NEW."{key}"' for key in keys)
+    db.execute_sql(
+        f'CREATE TRIGGER IF NOT EXISTS "{table}_set_updated_at" '
+        f'AFTER UPDATE OF {tracked} ON "{table}" BEGIN '
+        f'UPDATE "{table}" SET "updated_at" = {NOW} WHERE {row}; '
+        "END"
+    )
+
+
+def allow_explicit_timestamps(db: SqliteDatabase) -> None:
+    # `import` sets the timestamps of its rows itself, as updating every row after inserting it
+    # makes up a large part of a bulk import
+    for table, keys in TRACKED_TABLES.items():
+        row = " AND ".join(f'"{key}" = NEW."{key}"' for key in keys)
+        db.execute_sql(f'DROP TRIGGER IF EXISTS "{table}_set_created_at"')
+        db.execute_sql(
+            f'CREATE TRIGGER "{table}_set_created_at" AFTER INSERT ON "{table}" '
+            'WHEN NEW."created_at" IS NULL OR NEW."updated_at" IS NULL BEGIN '
+            f'UPDATE "{table}" SET "created_at" = {NOW}, "updated_at" = {NOW} WHERE {row}; '
+            "END"
+        )
+
+
+def add_tag_reference_counts(db: SqliteDatabase) -> None:
+    # every tag counts the tasks and projects that link to it, so that unused tags are found
+    # through an index, instead of searching both link tables for each tag
+    columns = [column.name for column in db.get_columns("tag")]
+    if "reference_count" not in columns:
+        db.execute_sql(
+            'ALTER TABLE "tag" ADD COLUMN "reference_count" INTEGER NOT NULL DEFAULT 0'
+        )
+    db.execute_sql(
+        'UPDATE "tag" SET "reference_count" = '
+        '(SELECT COUNT(*) FROM "task_to_tag" WHERE "tag_id" = "tag"."id") + '
+        '(SELECT COUNT(*) FROM "project_to_tag" WHERE "tag_id" = "tag"."id")'
+    )
+    for table in ["task_to_tag", "project_to_tag"]:
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_insert_tag" AFTER INSERT ON "{table}" BEGIN '
+            'UPDATE "tag" SET "reference_count" = "reference_count" + 1 '
+            'WHERE "id" = NEW."tag_id"; '
+            "END"
+        )
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_update_tag" '
+            f'AFTER UPDATE OF "tag_id" ON "{table}" BEGIN '
+            'UPDATE "tag" SET "reference_count" = "reference_count" - 1 '
+            'WHERE "id" = OLD."tag_id"; '
+            'UPDATE "tag" SET "reference_count" = "reference_count" + 1 '
+            'WHERE "id" = NEW."tag_id"; '
+            "END"
+        )
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_delete_tag" AFTER DELETE ON "{table}" BEGIN '
+            'UPDATE "tag" SET "reference_count" = "reference_count" - 1 '
+            'WHERE "id" = OLD."tag_id"; '
+            "END"
+        )
+    # only the unused tags are indexed, so the index only changes, when a tag becomes unused or
+    # is used again
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "tag_unused" ON "tag" ("reference_count") '
+        'WHERE "reference_count" = 0'
+    )
+
+
+def get_local_day(start: str) -> str:
+    # the day, on which a task started, in the local time of the offset span, which contains it
+    offset = (
+        f'(SELECT "offset" FROM "utc_offset" WHERE "start" <= {start} '
+        'ORDER BY "start" DESC LIMIT 1)'
+    )
+    return f"date({start} + COALESCE({offset}, 0), 'unixepoch')"
+
+
+def get_milliseconds(start: str, end: str) -> str:
+    return f"({end} - {start}) * 1000"
+
+
+def get_rollup_upsert(rows: str) -> str:
+    return (
+        'INSERT INTO "task_rollup" ("day", "project_id", "milliseconds", "count") '
+        f'{rows} ON CONFLICT ("day", "project_id") DO UPDATE SET '
+        '"milliseconds" = "milliseconds" + excluded."milliseconds", '
+        '"count" = "count" + excluded."count"; '
+    )
+
+
+def get_task_rollup_rows(row: str, sign: str) -> str:
+    # a finished task adds its duration to the total of its project
+    day = get_local_day(f'{row}."start"')
+    milliseconds = get_milliseconds(f'{row}."start"', f'{row}."end"')
+    return (
+        f'SELECT {day}, {row}."project_id", {sign}{milliseconds}, {sign}1 '
+        f'WHERE {row}."end" IS NOT NULL'
+    )
+
+
+def set_utc_offsets(db: SqliteDatabase, offsets: list[tuple[datetime, int]]) -> None:
+    db.execute_sql('DELETE FROM "utc_offset"')
+    db.cursor().executemany(
+        'INSERT INTO "utc_offset" ("start", "offset") VALUES (?, ?)',
+        [(timegm(start.timetuple()), offset) for start, offset in offsets],
+    )
+
+
+def rebuild_task_rollup(db: SqliteDatabase) -> None:
+    day = get_local_day('t."start"')
+    milliseconds = get_milliseconds('t."start"', 't."end"')
+    db.execute_sql('DELETE FROM "task_rollup"')
+    db.execute_sql(
+        'INSERT INTO "task_rollup" ("day", "project_id", "milliseconds", "count") '
+        f'SELECT {day} AS "day", t."project_id", SUM({milliseconds}), COUNT(*) '
+        'FROM "task" AS t WHERE t."end" IS NOT NULL GROUP BY "day", t."project_id"'
+    )
+
+
+def create_rollup_table(db: SqliteDatabase) -> bool:
+    # the total duration and number of the finished tasks of each project for each local day;
+    # the tasks count towards the day, on which they started, like in the sections of the recap
+    replaced = False
+    if db.table_exists("task_rollup") and "tag_id" in [
+        column.name for column in db.get_columns("task_rollup")
+    ]:
+        # earlier versions also kept the totals of each task tag, which were never read, but
+        # had to be updated on every change of the tags of a task
+        for trigger in ROLLUP_TRIGGERS:
+            db.execute_sql(f'DROP TRIGGER IF EXISTS "{trigger}"')
+        db.execute_sql('DROP TABLE "task_rollup"')
+        replaced = True
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "task_rollup" ("day" TEXT NOT NULL, '
+        '"project_id" INTEGER NOT NULL, "milliseconds" INTEGER NOT NULL, '
+        '"count" INTEGER NOT NULL, PRIMARY KEY ("day", "project_id")) WITHOUT ROWID'
+    )
+    return replaced
+
+
+def add_daily_rollup(db: SqliteDatabase) -> None:
+    create_rollup_table(db)
+    # SQLite doesn't know about timezones, so the start of each span with a different UTC offset
+    # is stored for the timezone of the settings, which is rewritten, whenever it changes
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "utc_offset" '
+        '("start" TEXT PRIMARY KEY, "offset" INTEGER NOT NULL) WITHOUT ROWID'
+    )
+    create_rollup_triggers(db)
+
+    from .models import get_timezone
+    from .time_utils import get_utc_offsets
+
+    set_utc_offsets(db, get_utc_offsets(get_timezone()))
+    rebuild_task_rollup(db)
+
+
+def create_rollup_triggers(db: SqliteDatabase) -> None:
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_rollup_insert" AFTER INSERT ON "task" '
+        'WHEN NEW."end" IS NOT NULL BEGIN '
+        + get_rollup_upsert(get_task_rollup_rows("NEW", ""))
+        + "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_rollup_update" '
+        'AFTER UPDATE OF "start", "end", "project_id" ON "task" BEGIN '
+        + get_rollup_upsert(get_task_rollup_rows("OLD", "-"))
+        + get_rollup_upsert(get_task_rollup_rows("NEW", ""))
+        + "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_rollup_delete" AFTER DELETE ON "task" '
+        'WHEN OLD."end" IS NOT NULL BEGIN '
+        + get_rollup_upsert(get_task_rollup_rows("OLD", "-"))
+        + "END"
+    )
+
+
+# the triggers of the rollup, including those of the totals of the task tags of earlier versions
+ROLLUP_TRIGGERS = [
+    "task_rollup_insert",
+    "task_rollup_update",
+    "task_rollup_delete",
+    "task_to_tag_rollup_insert",
+    "task_to_tag_rollup_update",
+    "task_to_tag_rollup_delete",
+]
+# the triggers, which read the datetimes of tasks and projects
+DATETIME_TRIGGERS = [
+    "task_interval_insert",
+    "task_interval_update",
+    "task_rollup_insert",
+    "task_rollup_update",
+    "task_rollup_delete",
+    "project_set_updated_at",
+    "task_set_updated_at",
+]
+
+
+def store_epoch_seconds(db: SqliteDatabase) -> None:
+    # the datetimes of tasks and projects are stored as integer seconds since the epoch instead
+    # of ISO text, so that SQLite compares and subtracts them as numbers; the triggers are
+    # dropped while the rows are converted, since they would misread the new values and mark
+    # every task as changed for `export --since-last`
+    for trigger in DATETIME_TRIGGERS:
+        db.execute_sql(f'DROP TRIGGER IF EXISTS "{trigger}"')
+    for table, columns in [("task", ["start", "end", "target"]), ("project", ["start", "end"])]:
+        # "%s" rounds down to the whole second on purpose, like the field, which compares the
+        # end of a date range, 23:59:59.999999, with the second 23:59:59 instead of the next day
+        seconds = ", ".join(
+            f"\"{column}\" = CAST(strftime('%s', \"{column}\") AS INTEGER)" for column in columns
+        )
+        db.execute_sql(f"""UPDATE "{table}" SET {seconds} WHERE typeof("start") = 'text'""")
+        create_updated_at_trigger(db, table, TRACKED_TABLES[table])
+    create_task_interval_triggers(db)
+    create_rollup_table(db)
+    create_rollup_triggers(db)
+
+    # the offset spans start at integers as well, which a TEXT column would compare as text
+    db.execute_sql('DROP TABLE IF EXISTS "utc_offset"')
+    db.execute_sql(
+        'CREATE TABLE "utc_offset" '
+        '("start" INTEGER PRIMARY KEY, "offset" INTEGER NOT NULL) WITHOUT ROWID'
+    )
+
+    from .models import get_timezone
+    from .time_utils import get_utc_offsets
+
+    set_utc_offsets(db, get_utc_offsets(get_timezone()))
+    rebuild_task_rollup(db)
+
+
+def intern_task_texts(db: SqliteDatabase) -> None:
+    # the names and notes of tasks are moved into a table of their own, which the tasks reference
+    # by id, so that the task table stays narrow and tasks are grouped by integers; databases,
+    # which have just been created, already store them like that
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "task_text" '
+        '("id" INTEGER NOT NULL PRIMARY KEY, "text" VARCHAR(255) NOT NULL)'
+    )
+    db.execute_sql('CREATE UNIQUE INDEX IF NOT EXISTS "task_text_text" ON "task_text" ("text")')
+    if "name" not in [column.name for column in db.get_columns("task")]:
+        return
+
+    db.execute_sql(
+        'INSERT INTO "task_text" ("text") SELECT "name" FROM "task" '
+        'UNION SELECT "note" FROM "task" WHERE "note" IS NOT NULL'
+    )
+    # the trigger lists the columns, which are replaced, and would mark every task as changed
+    db.execute_sql('DROP TRIGGER IF EXISTS "task_set_updated_at"')
+    # columns, which are added to a table, can't be NOT NULL without a default
+    for column in ["name", "note"]:
+        db.execute_sql(
+            f'ALTER TABLE "task" ADD COLUMN "{column}_id" INTEGER REFERENCES "task_text" ("id")'
+        )
+        db.execute_sql(
+            f'UPDATE "task" SET "{column}_id" = '
+            f'(SELECT "id" FROM "task_text" WHERE "text" = "task"."{column}")'
+        )
+        db.execute_sql(f'ALTER TABLE "task" DROP COLUMN "{column}"')
+    create_updated_at_trigger(db, "task", TRACKED_TABLES["task"])
+
+
+def get_search_texts(row: str, project: Optional[str] = None) -> str:
+    # the texts of a task, as they are indexed; a contentless index has to be given the same
+    # texts again to delete a task, which is why a renamed project passes its old name
+    project = project or f'(SELECT "name" FROM "project" WHERE "id" = {row}."project_id")'
+    return (
+        f'(SELECT "text" FROM "task_text" WHERE "id" = {row}."name_id"), '
+        f'(SELECT "text" FROM "task_text" WHERE "id" = {row}."note_id"), {project}'
+    )
+
+
+def get_search_insert(rows: str, *, delete: bool = False) -> str:
+    if delete:
+        return (
+            'INSERT INTO "task_search" ("task_search", "rowid", "name", "note", "project") '
+            f"SELECT 'delete', {rows}; "
+        )
+    return f'INSERT INTO "task_search" ("rowid", "name", "note", "project") SELECT {rows}; '
+
+
+def add_task_search(db: SqliteDatabase) -> None:
+    # FTS5 index over the names, notes and project names of the tasks, keyed by the ids of the
+    # tasks; it's contentless, since the texts are already stored in their own tables, so only
+    # the index itself takes up space
+    db.execute_sql(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS "task_search" USING fts5("name", "note", "project", '
+        "content='', tokenize='unicode61 remove_diacritics 2')"
+    )
+    # matches in the name weigh the most and those in the note the least
+    db.execute_sql(
+        """INSERT INTO "task_search" ("task_search", "rank") VALUES ('rank', 'bm25(3, 1, 2)')"""
+    )
+    db.execute_sql(get_search_insert(f't."id", {get_search_texts("t")} FROM "task" AS t'))
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_search_insert" AFTER INSERT ON "task" BEGIN '
+        + get_search_insert(f'NEW."id", {get_search_texts("NEW")}')
+        + "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_search_update" '
+        'AFTER UPDATE OF "name_id", "note_id", "project_id" ON "task" BEGIN '
+        + get_search_insert(f'OLD."id", {get_search_texts("OLD")}', delete=True)
+        + get_search_insert(f'NEW."id", {get_search_texts("NEW")}')
+        + "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "task_search_delete" AFTER DELETE ON "task" BEGIN '
+        + get_search_insert(f'OLD."id", {get_search_texts("OLD")}', delete=True)
+        + "END"
+    )
+    # the tasks of a renamed project are indexed again with the new name
+    old_texts, new_texts = get_search_texts("t", 'OLD."name"'), get_search_texts("t", 'NEW."name"')
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "project_search_update" '
+        'AFTER UPDATE OF "name" ON "project" BEGIN '
+        + get_search_insert(
+            f't."id", {old_texts} FROM "task" AS t WHERE t."project_id" = OLD."id"', delete=True
+        )
+        + get_search_insert(
+            f't."id", {new_texts} FROM "task" AS t WHERE t."project_id" = NEW."id"'
+        )
+        + "END"
+    )
+
+
+def add_tag_postings(db: SqliteDatabase) -> None:
+    # inverted index of the tags: the ids of the tasks of each tag, including the tasks of the
+    # projects with the tag, sorted by id within the primary key; the tags count their tasks, so
+    # that tag queries can start from the shortest list
+    columns = [column.name for column in db.get_columns("tag")]
+    if "task_count" not in columns:
+        db.execute_sql('ALTER TABLE "tag" ADD COLUMN "task_count" INTEGER NOT NULL DEFAULT 0')
+    db.execute_sql(
+        'CREATE TABLE IF NOT EXISTS "tag_posting" ("tag_id" INTEGER NOT NULL, '
+        '"task_id" INTEGER NOT NULL, PRIMARY KEY ("tag_id", "task_id")) WITHOUT ROWID'
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "tag_posting_insert" AFTER INSERT ON "tag_posting" BEGIN '
+        'UPDATE "tag" SET "task_count" = "task_count" + 1 WHERE "id" = NEW."tag_id"; '
+        "END"
+    )
+    db.execute_sql(
+        'CREATE TRIGGER IF NOT EXISTS "tag_posting_delete" AFTER DELETE ON "tag_posting" BEGIN '
+        'UPDATE "tag" SET "task_count" = "task_count" - 1 WHERE "id" = OLD."tag_id"; '
+        "END"
+    )
+    db.execute_sql(
+        'INSERT OR IGNORE INTO "tag_posting" ("tag_id", "task_id") '
+        'SELECT "tag_id", "task_id" FROM "task_to_tag" UNION '
+        'SELECT l."tag_id", t."id" FROM "project_to_tag" AS l '
+        'JOIN "task" AS t ON t."project_id" = l."project_id"'
+    )
+
+    # a task keeps a tag, as long as either the task itself or its project has it
+    project_has_tag = (
+        'EXISTS (SELECT 1 FROM "task" AS t JOIN "project_to_tag" AS l '
+        'ON l."project_id" = t."project_id" WHERE t."id" = {row}."task_id" '
+        'AND l."tag_id" = {row}."tag_id")'
+    )
+    task_has_tag = (
+        'EXISTS (SELECT 1 FROM "task_to_tag" AS l WHERE l."task_id" = "tag_posting"."task_id" '
+        'AND l."tag_id" = "tag_posting"."tag_id")'
+    )
+    insert_task_tag = (
+        'INSERT OR IGNORE INTO "tag_posting" ("tag_id", "task_id") '
+        'VALUES ({row}."tag_id", {row}."task_id"); '
+    )
+    delete_task_tag = (
+        'DELETE FROM "tag_posting" WHERE "tag_id" = {row}."tag_id" '
+        f'AND "task_id" = {{row}}."task_id" AND NOT {project_has_tag}; '
+    )
+    insert_project_tag = (
+        'INSERT OR IGNORE INTO "tag_posting" ("tag_id", "task_id") '
+        'SELECT {row}."tag_id", "id" FROM "task" WHERE "project_id" = {row}."project_id"; '
+    )
+    delete_project_tag = (
+        'DELETE FROM "tag_posting" WHERE "tag_id" = {row}."tag_id" AND "task_id" IN '
+        '(SELECT "id" FROM "task" WHERE "project_id" = {row}."project_id") '
+        f"AND NOT {task_has_tag}; "
+    )
+    insert_task = (
+        'INSERT OR IGNORE INTO "tag_posting" ("tag_id", "task_id") '
+        'SELECT "tag_id", {row}."id" FROM "project_to_tag" '
+        'WHERE "project_id" = {row}."project_id"; '
+    )
+    delete_task = (
+        'DELETE FROM "tag_posting" WHERE "task_id" = {row}."id" AND "tag_id" IN '
+        '(SELECT "tag_id" FROM "project_to_tag" WHERE "project_id" = {row}."project_id") '
+        f"AND NOT {task_has_tag}; "
+    )
+    triggers = {
+        "task_to_tag_posting_insert": ('AFTER INSERT ON "task_to_tag"', insert_task_tag, "NEW"),
+        "task_to_tag_posting_delete": ('AFTER DELETE ON "task_to_tag"', delete_task_tag, "OLD"),
+        "task_to_tag_posting_update": (
+            'AFTER UPDATE OF "task_id", "tag_id" ON "task_to_tag"',
+            delete_task_tag.format(row="OLD") + insert_task_tag,
+            "NEW",
+        ),
+        "project_to_tag_posting_insert": (
+            'AFTER INSERT ON "project_to_tag"', insert_project_tag, "NEW"
+        ),
+        "project_to_tag_posting_delete": (
+            'AFTER DELETE ON "project_to_tag"', delete_project_tag, "OLD"
+        ),
+        "project_to_tag_posting_update": (
+            'AFTER UPDATE OF "project_id", "tag_id" ON "project_to_tag"',
+            delete_project_tag.format(row="OLD") + insert_project_tag,
+            "NEW",
+        ),
+        "task_posting_insert": ('AFTER INSERT ON "task"', insert_task, "NEW"),
+        "task_posting_update": (
+            'AFTER UPDATE OF "project_id" ON "task"',
+            delete_task.format(row="OLD") + insert_task,
+            "NEW",
+        ),
+        # the index is searched by tag, so the tags of a deleted task are looked up first
+        "task_posting_delete": (
+            'AFTER DELETE ON "task"',
+            'DELETE FROM "tag_posting" WHERE "task_id" = {row}."id" AND "tag_id" IN '
+            '(SELECT "tag_id" FROM "project_to_tag" WHERE "project_id" = {row}."project_id" '
+            'UNION SELECT "tag_id" FROM "task_to_tag" WHERE "task_id" = {row}."id"); ',
+            "OLD",
+        ),
+    }
+    for name, (event, body, row) in triggers.items():
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{name}" {event} BEGIN {body.format(row=row)}END'
+        )
+
+
+def add_change_sequence(db: SqliteDatabase) -> None:
+    # `export --since-last` compares the changes with a counter instead of their timestamps: a
+    # change, which the export can't see yet, is only committed after the export has read the
+    # counter, so it's always numbered higher, while its timestamp could still be the same
+    db.execute_sql('CREATE TABLE IF NOT EXISTS "change_sequence" ("value" INTEGER NOT NULL)')
+    db.execute_sql(
+        'INSERT INTO "change_sequence" ("value") '
+        'SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM "change_sequence")'
+    )
+    # the existing rows are numbered 0, i.e. before the first change, that is counted
+    for table, stamp in [("project", "updated_at"), ("task", "updated_at"),
+                         ("task_tombstone", "deleted_at")]:
+        columns = [column.name for column in db.get_columns(table)]
+        if "change_seq" not in columns:
+            db.execute_sql(f'ALTER TABLE "{table}" ADD COLUMN "change_seq" INTEGER')
+        db.execute_sql(f'UPDATE "{table}" SET "change_seq" = 0 WHERE "change_seq" IS NULL')
+        number = (
+            'UPDATE "change_sequence" SET "value" = "value" + 1; '
+            f'UPDATE "{table}" SET "change_seq" = (SELECT "value" FROM "change_sequence") '
+            'WHERE "id" = NEW."id"; '
+        )
+        # `import` numbers its rows itself, like it sets their timestamps
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_insert_change_seq" AFTER INSERT ON "{table}" '
+            f'WHEN NEW."change_seq" IS NULL BEGIN {number}END'
+        )
+        # every change of a row or its links updates its timestamp through the other triggers
+        db.execute_sql(
+            f'CREATE TRIGGER IF NOT EXISTS "{table}_update_change_seq" '
+            f'AFTER UPDATE OF "{stamp}" ON "{table}" BEGIN {number}END'
+        )
+    db.execute_sql('CREATE INDEX IF NOT EXISTS "task_change_seq" ON "task" ("change_seq")')
+    db.execute_sql(
+        'CREATE INDEX IF NOT EXISTS "task_tombstone_change_seq" ON "task_tombstone" ("change_seq")'
+    )
+
+
+def remove_rollup_tags(db: SqliteDatabase) -> None:
+    # the rollup only keeps the totals of the projects, which databases, that have just been
+    # created, already do
+    if create_rollup_table(db):
+        create_rollup_triggers(db)
+        rebuild_task_rollup(db)
+
+
+MIGRATIONS: list[Callable[[SqliteDatabase], None]] = [
+    add_indexes,
+    add_task_interval_index,
+    add_change_tracking,
+    allow_explicit_timestamps,
+    add_tag_reference_counts,
+    add_daily_rollup,
+    store_epoch_seconds,
+    intern_task_texts,
+    add_task_search,
+    add_tag_postings,
+    add_change_sequence,
+    remove_rollup_tags,
+]
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_version(db: SqliteDatabase, schema: Optional[str] = None) -> int:
+    return db.pragma("user_version", schema=schema)
+
+
+def is_outdated(db: SqliteDatabase, schema: Optional[str] = None) -> bool:
+    # a database without tables hasn't been initialized yet, which is reported by the commands
+    return get_version(db, schema) < LATEST_VERSION and db.table_exists("task", schema)
+
+
+def migrate(db: SqliteDatabase) -> None:
+    if not is_outdated(db):
+        return
+    version = get_version(db)
+
+    for migration in MIGRATIONS[version:]:
+        with db.atomic():
+            migration(db)
+            version += 1
+            db.pragma("user_version", version)
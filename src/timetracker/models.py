@@ -1,11 +1,114 @@
+import json
+from calendar import timegm
+from collections.abc import Iterable, Sequence
 from datetime import datetime
+from importlib.abc import Traversable
 from importlib.resources import files
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Optional
+from zoneinfo import ZoneInfo
 
-from peewee import CharField, CompositeKey, DateTimeField, ForeignKeyField, Model, SqliteDatabase
+from peewee import (
+    SQL,
+    CharField,
+    CompositeKey,
+    DateTimeField,
+    Field,
+    ForeignKeyField,
+    IntegerField,
+    Model,
+    ModelSelect,
+    SqliteDatabase,
+    Table,
+)
 from rich.prompt import Confirm
 
+from .attached import create_union_views, get_schemas
+from .error_utils import print_error_box
+from .migrations import is_outdated, migrate
+
 DB_FILE = files("timetracker").joinpath("timetracker.db")
-db = SqliteDatabase(None, pragmas={"foreign_keys": 1})
+SETTINGS_FILE = files("timetracker").joinpath("settings.json")
+# these can be changed with the settings command
+DEFAULT_PRAGMAS = {
+    "journal_mode": "wal",
+    "busy_timeout": 5000,
+    "synchronous": "normal",
+    "cache_size": -8000,
+    "mmap_size": 67108864,
+}
+
+
+class TimeTrackerDatabase(SqliteDatabase):
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        super().__init__(*args, **kwargs)
+        # the databases, which are read together with this one
+        self.attached: list[Path] = []
+        self.readonly = False
+
+    # existing databases are upgraded in place the first time they are opened for writing, a
+    # read-only connection can't apply the migrations, so it refuses outdated databases instead
+    def _initialize_connection(self, conn: Connection) -> None:
+        super()._initialize_connection(conn)
+        if not self.readonly:
+            migrate(self)
+        elif is_outdated(self):
+            print_error_box(
+                "The database is out of date, it's upgraded by any command that writes to it, "
+                "like rollup!"
+            )
+        if self.attached:
+            schemas = get_schemas(len(self.attached) + 1)
+            for path, schema in zip(self.attached, schemas[1:], strict=True):
+                conn.execute("ATTACH DATABASE ? AS ?", (get_readonly_uri(path), schema))
+                if is_outdated(self, schema):
+                    print_error_box(
+                        f"The database {path} is out of date, it's upgraded by any command that "
+                        f'writes to it, like "timet -d {path} rollup"!'
+                    )
+            create_union_views(self, schemas)
+
+
+db = TimeTrackerDatabase(None, pragmas={"foreign_keys": 1})
+
+
+class IsoDateTimeField(DateTimeField):
+    # peewee tries its formats one after the other with strptime, while fromisoformat parses the
+    # ISO format, in which the change timestamps are stored, many times faster
+    def adapt(self, value: Optional[str | datetime]) -> Optional[str | datetime]:
+        if value and isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                return super().adapt(value)
+        return value
+
+
+def to_epoch_seconds(value: Optional[datetime]) -> Optional[int]:
+    # aware datetimes are converted to UTC, naive ones are already in UTC; the microseconds are
+    # dropped, i.e. rounded down
+    return None if value is None else timegm(value.utctimetuple())
+
+
+class EpochDateTimeField(Field):
+    # naive UTC datetimes are stored as whole seconds since the epoch, which SQLite compares and
+    # subtracts as integers and which take up 4 bytes instead of up to 26 characters
+    field_type = "INTEGER"
+
+    def db_value(self, value: Optional[int | str | datetime]) -> Optional[int]:
+        if isinstance(value, int):
+            return value
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return to_epoch_seconds(value)
+
+    def python_value(self, value: Optional[int | datetime]) -> Optional[datetime]:
+        # several times faster than adding a timedelta to the epoch
+        if isinstance(value, int):
+            return datetime.utcfromtimestamp(value)  # noqa: DTZ004
+        # values, which have already been converted, are passed through like by DateTimeField
+        return value
 
 
 class BaseModel(Model):
@@ -16,26 +119,110 @@ class BaseModel(Model):
 
 class Project(BaseModel):
     name = CharField(unique=True)
-    start = DateTimeField()
-    end = DateTimeField(null=True)
+    start = EpochDateTimeField()
+    end = EpochDateTimeField(null=True)
+    created_at = IsoDateTimeField(null=True)
+    updated_at = IsoDateTimeField(null=True)
+    # the number of the latest change, which is also set by triggers
+    change_seq = IntegerField(null=True)
+
+
+class TaskText(BaseModel):
+    # the names and notes of tasks are stored once and referenced by id, since the same few
+    # hundred of them are repeated by thousands of tasks
+    text = CharField(unique=True)
+
+
+def intern_texts(texts: Iterable[Optional[str]]) -> dict[str, int]:
+    # like the tags, all texts are inserted with one upsert and looked up with one query
+    new_texts = [text for text in dict.fromkeys(texts) if text is not None]
+    if len(new_texts) == 0:
+        return {}
+    insert_texts = TaskText.insert_many([(text,) for text in new_texts], fields=[TaskText.text])
+    insert_texts.on_conflict(action="nothing").execute()
+    return dict(TaskText.select(TaskText.text, TaskText.id)
+                        .where(TaskText.text.in_(new_texts))
+                        .tuples())
+
+
+class InternedText:
+    # the name or note of a task reads like a column: on the model, it's a subquery of the text,
+    # which can be selected and compared, on an instance, it's the text itself, which is looked
+    # up on first access and interned, when the task is saved
+    def __init__(self, field_name: str) -> None:
+        self.field_name = field_name
+
+    def __set_name__(self, owner: type["Task"], name: str) -> None:
+        self.name = name
+
+    def __get__(
+        self, instance: Optional["Task"], owner: type["Task"]
+    ) -> ModelSelect | Optional[str]:
+        field = getattr(owner, self.field_name)
+        if instance is None:
+            return TaskText.select(TaskText.text).where(TaskText.id == field)
+        texts = instance.__dict__.setdefault("_texts", {})
+        if self.name not in texts:
+            text_id = instance.__data__.get(self.field_name)
+            # the rows are read to the end by unpacking them, unlike by get or next, which would
+            # leave the statement and its read lock open, until it's garbage collected
+            if text_id is None:
+                texts[self.name] = None
+            else:
+                query = TaskText.select(TaskText.text).where(TaskText.id == text_id)
+                (texts[self.name],) = query.scalars()
+        return texts[self.name]
+
+    def __set__(self, instance: "Task", value: Optional[str]) -> None:
+        instance.__dict__.setdefault("_texts", {})[self.name] = value
+        # peewee clears the dirty fields of the tasks, which it has just loaded; it has no public
+        # way to mark a field as dirty
+        instance._dirty.add(self.name)  # noqa: SLF001
 
 
 class Task(BaseModel):
-    name = CharField()
-    note = CharField(null=True)
-    start = DateTimeField()
-    end = DateTimeField(null=True)
-    target = DateTimeField(null=True)
+    # SQLite would group the tasks by name along an index of the ids, which takes several times
+    # longer than sorting them, as it has to look up every task on its own
+    name_text = ForeignKeyField(TaskText, column_name="name_id", index=False)
+    note_text = ForeignKeyField(TaskText, column_name="note_id", null=True, index=False)
+    name = InternedText("name_text")
+    note = InternedText("note_text")
+    start = EpochDateTimeField()
+    end = EpochDateTimeField(null=True)
+    target = EpochDateTimeField(null=True)
     project = ForeignKeyField(Project, backref="tasks")
+    created_at = IsoDateTimeField(null=True)
+    updated_at = IsoDateTimeField(null=True)
+    change_seq = IntegerField(null=True)
+
+    def save(
+        self, *, force_insert: bool = False, only: Optional[Sequence[Field]] = None
+    ) -> int:
+        texts = {
+            name: text
+            for name, text in self.__dict__.get("_texts", {}).items()
+            if name in self._dirty
+        }
+        text_ids = intern_texts(texts.values())
+        for name, text in texts.items():
+            setattr(self, f"{name}_text", None if text is None else text_ids[text])
+            self._dirty.discard(name)
+        return super().save(force_insert=force_insert, only=only)
 
 
 class Tag(BaseModel):
     name = CharField(unique=True)
+    # maintained by triggers, the default also applies to tags inserted with plain SQL
+    reference_count = IntegerField(default=0, constraints=[SQL("DEFAULT 0")])
+    # the number of tasks with the tag, directly or through their project, also from triggers
+    task_count = IntegerField(default=0, constraints=[SQL("DEFAULT 0")])
 
 
 class TaskToTag(BaseModel):
     task = ForeignKeyField(Task)
     tag = ForeignKeyField(Tag)
+    created_at = IsoDateTimeField(null=True)
+    updated_at = IsoDateTimeField(null=True)
 
     class Meta:
         primary_key = CompositeKey("task", "tag")
@@ -44,12 +231,85 @@ class TaskToTag(BaseModel):
 class ProjectToTag(BaseModel):
     project = ForeignKeyField(Project)
     tag = ForeignKeyField(Tag)
+    created_at = IsoDateTimeField(null=True)
+    updated_at = IsoDateTimeField(null=True)
 
     class Meta:
         primary_key = CompositeKey("project", "tag")
 
 
-MODELS = [Project, Task, Tag, TaskToTag, ProjectToTag]
+MODELS = [Project, TaskText, Task, Tag, TaskToTag, ProjectToTag]
+
+# R*Tree over the intervals of finished tasks, which is created by the migrations and kept in sync
+# with the task table by triggers, so it's not part of `MODELS`
+task_interval = Table("task_interval", ("id", "start", "end"))
+# the ids of deleted tasks, which are also maintained by triggers; like `created_at` and
+# `updated_at`, the deletion times are set by SQLite and stored with milliseconds
+task_tombstone = Table("task_tombstone", ("id", "deleted_at", "change_seq"))
+# the number of the latest change of the tasks and projects, which counts up with every change
+change_sequence = Table("change_sequence", ("value",))
+# the total duration and number of the finished tasks of each local day and project, which is
+# maintained by triggers as well
+task_rollup = Table("task_rollup", ("day", "project_id", "milliseconds", "count"))
+# the inverted index of the tags, which lists the ids of the tasks of each tag in order, including
+# the tasks of the projects with the tag, maintained by triggers
+tag_posting = Table("tag_posting", ("tag_id", "task_id"))
+# the UTC offsets of the configured timezone from the start of each span in seconds since the
+# epoch onwards
+utc_offset = Table("utc_offset", ("start", "offset"))
+
+
+def get_task_search(schema: str = "main") -> Table:
+    # the full-text index over the names, notes and project names of the tasks, whose rows are
+    # the ids of the tasks; each attached database has an index of its own, which can't be
+    # combined by a view, as SQLite only passes MATCH on to the virtual table itself
+    return Table("task_search", ("rowid", "task_search", "rank"), schema=schema)
+
+
+def read_settings() -> dict[str, object]:
+    # the settings are read without pydantic, as importing it would slow down every command,
+    # their values have already been validated by the settings command
+    try:
+        with SETTINGS_FILE.open("r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def get_pragmas() -> dict[str, str | int]:
+    settings = read_settings()
+    pragmas = {key: settings.get(key, default) for key, default in DEFAULT_PRAGMAS.items()}
+    pragmas["foreign_keys"] = 1
+    return pragmas
+
+
+def upgrade_db(db_file: Path) -> None:
+    with TimeTrackerDatabase(db_file, pragmas=get_pragmas()):
+        pass
+
+
+def get_readonly_uri(db_file: Path | Traversable) -> str:
+    return Path(str(db_file)).resolve().as_uri() + "?mode=ro"
+
+
+def get_timezone() -> ZoneInfo:
+    return ZoneInfo(read_settings().get("tz", "UTC"))
+
+
+def init_db(
+    db_file: Path | Traversable, *, readonly: bool = False, attached: Sequence[Path] = ()
+) -> None:
+    # the database is only opened by the first query, so that `--help` doesn't touch it
+    pragmas = get_pragmas()
+    db.attached = list(attached)
+    db.readonly = readonly
+    if readonly:
+        # the journal mode can't be changed by a read-only connection, which also doesn't create
+        # a missing database
+        del pragmas["journal_mode"]
+        db.init(get_readonly_uri(db_file), pragmas=pragmas, uri=True)
+    else:
+        db.init(db_file, pragmas=pragmas)
 
 
 def init_database() -> None:
@@ -63,10 +323,11 @@ def init_database() -> None:
     with DB_FILE.open("w"):
         pass
 
-    db.init(DB_FILE, pragmas={"foreign_keys": 1})
+    init_db(DB_FILE)
     with db:
         db.create_tables(MODELS)
         Project.create(name="Default", start=datetime.utcnow())
+    migrate(db)
 
 
 if __name__ == "__main__":
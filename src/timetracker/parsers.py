@@ -1,11 +1,20 @@
 import re
 from calendar import monthrange
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from .error_utils import print_error_box
 from .time_utils import handle_two_digit_year
 
+# tags form a hierarchy through their names, e.g. "client/acme/backend" is below "client/acme"
+TAG_SEPARATOR = "/"
+
+
+class TagClause(NamedTuple):
+    # a clause of a tag query matches the tasks with any of its tags, or those without all of them
+    tags: list[str]
+    negated: bool
+
 
 def parse_date(dt: str) -> datetime | None:
     pattern = re.compile(r"(?P<day>\d{1,2})\/(?P<month>\d{1,2})\/(?P<year>(?:\d{2}){1,2})")
@@ -84,3 +93,48 @@ def parse_date_range(start_input: str, end_input: Optional[str]) -> tuple[dateti
     start_dt = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
     end_dt = end_dt.replace(hour=23, minute=59, second=59, microsecond=999999)
     return (start_dt, end_dt)
+
+
+def parse_tags(
+    tags_as_str: Optional[str],
+    task_tags_as_str: Optional[str],
+    project_tags_as_str: Optional[str],
+) -> tuple[list[str], list[str]]:
+    # the general tags match both the tags of tasks and the tags of projects
+    task_tags = []
+    project_tags = []
+    if tags_as_str is not None:
+        task_tags.extend(map(parse_tag, tags_as_str.split(",")))
+        project_tags.extend(map(parse_tag, tags_as_str.split(",")))
+    if task_tags_as_str is not None:
+        task_tags.extend(map(parse_tag, task_tags_as_str.split(",")))
+    if project_tags_as_str is not None:
+        project_tags.extend(map(parse_tag, project_tags_as_str.split(",")))
+    return task_tags, project_tags
+
+
+def parse_tag(tag: str) -> str:
+    # the parts of a path are stripped like the tag itself, so that "client / acme" and
+    # "client/acme/" name the same tag as "client/acme"
+    parts = (part.strip() for part in tag.split(TAG_SEPARATOR))
+    return TAG_SEPARATOR.join(part for part in parts if part != "")
+
+
+def parse_tag_query(query: str) -> list[TagClause]:
+    # e.g. "client/acme AND ANY(urgent, review) AND NOT billed", the keywords are upper case, so
+    # that tags can still be named "and" or "not"
+    clauses = []
+    for clause in re.split(r"\s+AND\s+", query.strip()):
+        negated = clause.startswith("NOT ")
+        operand = clause.removeprefix("NOT ").strip() if negated else clause
+        if any_tags := re.fullmatch(r"ANY\s*\((.*)\)", operand):
+            tags = [parse_tag(tag) for tag in any_tags.group(1).split(",")]
+        else:
+            tags = [parse_tag(operand)]
+        if "" in tags:
+            print_error_box(
+                "Invalid tag query!\n"
+                "a tag query must have the following format: tag AND ANY(tag, tag) AND NOT tag"
+            )
+        clauses.append(TagClause(tags, negated))
+    return clauses
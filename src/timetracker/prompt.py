@@ -0,0 +1,54 @@
+# Minimal entry point for shell prompts, which prints the same as `timet status -d raw`.
+# As long as the state file is up to date, only the standard library is imported.
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from .state import RunningTask, is_state_fresh, read_state, write_state
+from .time_utils import get_raw_status
+
+
+def get_running_task_from_database(db_file: Path) -> Optional[RunningTask]:
+    from peewee import OperationalError
+
+    from .models import db, init_db
+    from .queries import get_running_task
+
+    init_db(db_file, readonly=True)
+    try:
+        with db:
+            return get_running_task()
+    except OperationalError:  # can occur when a table doesn't exist
+        print("The database isn't initialized properly!")
+        raise SystemExit(1) from None
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="timet-prompt", description="print the currently running task"
+    )
+    parser.add_argument(
+        "-d", "--database", type=Path, help="name of alternative database file to use"
+    )
+    # importlib.resources would take longer to import than the rest of this module
+    db_file = parser.parse_args(args).database or Path(__file__).with_name("timetracker.db")
+
+    try:
+        fresh = is_state_fresh(db_file)
+        task = read_state(db_file) if fresh else None
+    except (OSError, ValueError, KeyError):  # can occur when the state file is corrupted
+        fresh = False
+
+    if not fresh:
+        task = get_running_task_from_database(db_file)
+        write_state(db_file, task)
+
+    if task is None:
+        print("There's currently no task running!")
+        raise SystemExit(1)
+
+    print(get_raw_status(task["project"], task["name"], task["start"], task["target"]))
+
+
+if __name__ == "__main__":
+    main()
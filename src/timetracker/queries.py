@@ -0,0 +1,486 @@
+import operator
+from calendar import timegm
+from collections.abc import Callable, Sequence
+from datetime import datetime, timedelta
+from functools import reduce
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from peewee import (
+    JOIN,
+    OP,
+    SQL,
+    Expression,
+    Field,
+    ModelSelect,
+    NodeList,
+    SelectQuery,
+    Tuple,
+    fn,
+)
+
+from .attached import ID_OFFSET, get_schemas
+from .models import (
+    Project,
+    ProjectToTag,
+    Tag,
+    Task,
+    TaskText,
+    TaskToTag,
+    change_sequence,
+    get_task_search,
+    tag_posting,
+    task_interval,
+    task_rollup,
+    task_tombstone,
+    utc_offset,
+)
+from .parsers import TAG_SEPARATOR, TagClause
+from .state import RunningTask
+from .time_utils import get_local_midnight, get_whole_days
+
+# the groups of `report`, which correspond to the sections of `recap`
+SECTION_GROUPS = {"days": "day", "weeks": "week", "months": "month"}
+
+
+# peewee passes NULL as a parameter, which keeps SQLite from using partial indexes
+def is_null(field: Field, *, null: bool = True) -> NodeList:
+    return NodeList((field, SQL("IS NULL" if null else "IS NOT NULL")))
+
+
+def get_running_task_query() -> ModelSelect:
+    return Task.select().where(is_null(Task.end))
+
+
+def get_running_task() -> Optional[RunningTask]:
+    task = get_running_task_query().select_extend(Project).join(Project).get_or_none()
+    if task is None:
+        return None
+    return RunningTask(
+        name=task.name, project=task.project.name, start=task.start, target=task.target
+    )
+
+
+def get_project_list_query(all_: bool) -> ModelSelect:
+    concat_tags = fn.GROUP_CONCAT(Tag.name, ", ").alias("tags")
+    query = (Project.select(Project, concat_tags)
+                    .join(ProjectToTag, JOIN.LEFT_OUTER)
+                    .join(Tag, JOIN.LEFT_OUTER)
+                    .group_by(Project.id))
+    if not all_:
+        query = query.where(Project.end.is_null())
+    return query
+
+
+# recap and export read these columns as plain named tuples, instead of a task model with a
+# joined project model, which costs more than twice as much time and memory for each row
+class TaskRow(NamedTuple):
+    id_: int
+    project: str
+    project_tags: Optional[str]
+    name: str
+    task_tags: Optional[str]
+    note: Optional[str]
+    start: datetime
+    end: Optional[datetime]
+    target: Optional[datetime]
+
+
+def get_task_query() -> ModelSelect:
+    # joining both link tables would multiply the rows of each task by its number of task tags
+    # and project tags, so each list of tags is aggregated on its own by a correlated subquery
+    task_tags = (TaskToTag.select(fn.GROUP_CONCAT(Tag.name))
+                          .join(Tag)
+                          .where(TaskToTag.task_id == Task.id))
+    project_tags = (ProjectToTag.select(fn.GROUP_CONCAT(Tag.name))
+                                .join(Tag)
+                                .where(ProjectToTag.project_id == Project.id))
+    # the interned names and notes are joined, which is faster than looking them up by subqueries
+    name, note = TaskText.alias("name"), TaskText.alias("note")
+    return (Task.select(
+                    Task.id.alias("id_"),
+                    Project.name.alias("project"),
+                    project_tags.alias("project_tags"),
+                    name.text.alias("name"),
+                    task_tags.alias("task_tags"),
+                    note.text.alias("note"),
+                    Task.start,
+                    Task.end,
+                    Task.target,
+                )
+                .join(Project)
+                .join_from(Task, name, on=(name.id == Task.name_text))
+                .join_from(Task, note, JOIN.LEFT_OUTER, on=(note.id == Task.note_text))
+                .objects(TaskRow))
+
+
+def get_match_query(match: str, limit: Optional[int] = None) -> SelectQuery:
+    # the ids and ranks of the tasks, whose name, note or project matches the FTS5 query; the
+    # index of each attached database is searched on its own, with the ids offset like in the
+    # views, but their ranks are only roughly comparable, as each index has its own statistics;
+    # the database, which the models are bound to, is only exposed by the metadata of peewee
+    attached = getattr(Task._meta.database, "attached", [])  # noqa: SLF001
+    selects = []
+    for i, schema in enumerate(get_schemas(len(attached) + 1)):
+        search = get_task_search(schema)
+        id_ = (search.rowid + i * ID_OFFSET if i != 0 else search.rowid).alias("id")
+        query = (search.select(id_, search.rank)
+                       .where(Expression(search.task_search, "MATCH", match)))
+        if limit is not None:
+            # all matches are ranked, but only the best ones of each database are kept, which
+            # SQLite sorts without holding the others; equal ranks go to later tasks
+            query = query.order_by(search.rank, search.rowid.desc()).limit(limit)
+            if len(attached) > 0:
+                # the parts of a compound query can only be ordered and limited as subqueries
+                query = Task.select(SQL("*")).from_(query.alias(f"matches_{i}"))
+        selects.append(query)
+    return reduce(operator.add, selects)
+
+
+def get_tag_condition(tags: Sequence[str]) -> Expression:
+    # a tag also matches the tags below it, whose names all sort between "client/acme/" and
+    # "client/acme0", as "0" follows the separator, so each tag takes a lookup and a range scan
+    # of the index of the tag names, instead of comparing the pattern with every tag
+    after_separator = chr(ord(TAG_SEPARATOR) + 1)
+    return reduce(operator.or_, [
+        (Tag.name == tag)
+        | ((Tag.name >= tag + TAG_SEPARATOR) & (Tag.name < tag + after_separator))
+        for tag in tags
+    ])
+
+
+def get_tag_query_condition(clauses: Sequence[TagClause]) -> Expression:
+    # the clauses are evaluated against the inverted index, starting with the one, whose tags
+    # have the fewest tasks: its tasks are read in a range scan and every other clause only takes
+    # a lookup of each of its tags with the id of the task, so that a query costs time in
+    # proportion to the shortest list of tasks, not to the longest one
+    terms = []
+    for clause in clauses:
+        tags = Tag.select(Tag.id).where(get_tag_condition(clause.tags))
+        count = tags.select(fn.COALESCE(fn.SUM(Tag.task_count), 0)).scalar()
+        terms.append((clause.negated, count, tags))
+    # the tags to exclude are only looked up for the tasks, which all other clauses match
+    terms.sort(key=lambda term: term[:2])
+
+    conditions = []
+    for i, (negated, _, tags) in enumerate(terms):
+        if i == 0 and not negated:
+            tagged_tasks = (tag_posting.select(tag_posting.task_id)
+                                       .where(tag_posting.tag_id.in_(tags)))
+            conditions.append(Task.id.in_(tagged_tasks))
+            continue
+        lookup = (tag_posting.select(SQL("1"))
+                             .where(tag_posting.tag_id.in_(tags))
+                             .where(tag_posting.task_id == Task.id))
+        conditions.append(~fn.EXISTS(lookup) if negated else fn.EXISTS(lookup))
+    return reduce(operator.and_, conditions)
+
+
+def get_overlap_condition(start: datetime, end: datetime) -> Expression:
+    # all tasks that overlap with the date range, including those that span all of it
+    overlapping = (task_interval.select(task_interval.id)
+                                .where(task_interval.start <= timegm(end.timetuple()))
+                                .where(task_interval.end >= timegm(start.timetuple())))
+    return Task.id.in_(overlapping) & (Task.start <= end) & (Task.end >= start)
+
+
+def filter_tasks(
+    query: ModelSelect,
+    date_range: Optional[tuple[datetime, datetime]],
+    project_name: Optional[str],
+    task_tags: Sequence[str],
+    project_tags: Sequence[str],
+    match: Optional[str] = None,
+    tag_query: Sequence[TagClause] = (),
+) -> ModelSelect:
+    # the filters of `recap` and `export`, which are all pushed into SQL
+    if date_range is not None:
+        query = query.where(get_overlap_condition(*date_range))
+
+    if project_name is not None:
+        query = query.where(Project.name == project_name)
+
+    # the tags are looked up first, so that the link tables are searched by tag; a task matches,
+    # if either it or its project has one of the tags
+    tagged = []
+    if len(task_tags) != 0:
+        tagged_tasks = (TaskToTag.select(TaskToTag.task_id)
+                                 .join(Tag)
+                                 .where(get_tag_condition(task_tags)))
+        tagged.append(Task.id.in_(tagged_tasks))
+    if len(project_tags) != 0:
+        tagged_projects = (ProjectToTag.select(ProjectToTag.project_id)
+                                       .join(Tag)
+                                       .where(get_tag_condition(project_tags)))
+        tagged.append(Task.project_id.in_(tagged_projects))
+    if len(tagged) != 0:
+        query = query.where(reduce(operator.or_, tagged))
+
+    if len(tag_query) != 0:
+        query = query.where(get_tag_query_condition(tag_query))
+
+    if match is not None:
+        matches = get_match_query(match).alias("matches")
+        query = query.where(Task.id.in_(Task.select(matches.c.id).from_(matches)))
+
+    return query
+
+
+def get_recap_query(
+    date_range: Optional[tuple[datetime, datetime]],
+    project_name: Optional[str],
+    task_tags: list[str],
+    project_tags: list[str],
+    match: Optional[str] = None,
+    tag_query: Sequence[TagClause] = (),
+) -> ModelSelect:
+    query = get_task_query().where(is_null(Task.end, null=False))
+    query = filter_tasks(
+        query, date_range, project_name, task_tags, project_tags, match, tag_query
+    )
+    return query.order_by(Task.start, Task.id)
+
+
+def get_search_query(match: str, limit: int) -> ModelSelect:
+    # only the best matches are joined with their tasks, so the cost of a search depends on the
+    # number of matches in the index, not on the number of tasks; equal ranks go to later tasks
+    matches = get_match_query(match, limit)
+    matches = (matches.order_by(SQL('"rank"'), SQL('"id" DESC'))
+                      .limit(limit)
+                      .alias("matches"))
+    return (get_task_query().join_from(Task, matches, on=(matches.c.id == Task.id))
+                            .order_by(matches.c.rank, Task.id.desc()))
+
+
+def get_page_query(
+    query: ModelSelect, after: Optional[tuple[datetime, int]], size: int
+) -> ModelSelect:
+    # keyset pagination seeks past the last task of the previous page, so that a page deep into
+    # the recap costs the same as the first one, while OFFSET would step over all previous rows
+    if after is not None:
+        start, id_ = after
+        query = query.where(Tuple(Task.start, Task.id) > Tuple(Task.start.to_value(start), id_))
+    return query.order_by(Task.start, Task.id).limit(size)
+
+
+def get_page_keys(
+    query: ModelSelect, after: Optional[tuple[datetime, int]], pages: int, size: int
+) -> list[tuple[datetime, int]]:
+    # the keys of the following pages, i.e. the key of every `size`th task, are picked out by
+    # SQLite, so that the tasks in between are neither loaded nor converted
+    row_number = fn.ROW_NUMBER().over(order_by=[Task.start, Task.id]).alias("row_number")
+    tasks = get_page_query(query.select(Task.start, Task.id, row_number), after, pages * size)
+    keys = (Task.select(tasks.c.start, tasks.c.id)
+                .from_(tasks)
+                .where(Expression(tasks.c.row_number, OP.MOD, size) == 0)
+                .order_by(tasks.c.row_number)
+                .tuples())
+    return [(Task.start.python_value(start), id_) for start, id_ in keys]
+
+
+def get_local_day(field: Field) -> Expression:
+    # the local day of a datetime in seconds, with the offset of the span, which contains it
+    offset = (utc_offset.select(utc_offset.offset)
+                        .where(utc_offset.start <= field)
+                        .order_by(utc_offset.start.desc())
+                        .limit(1))
+    # without coerce, peewee would convert the day into a datetime like the field
+    return fn.date(field + fn.COALESCE(offset, 0), "unixepoch").coerce(False)
+
+
+def get_group_keys(day: Expression) -> dict[str, Expression]:
+    # weeks start on monday and are named after it
+    return {
+        "project": Project.name,
+        "task": Task.name,
+        "tag": Tag.name,
+        "day": day,
+        "week": fn.date(day, "weekday 0", "-6 days").coerce(False),
+        "month": fn.strftime("%Y-%m", day),
+    }
+
+
+def get_section_key(day: Expression, sections: str) -> Expression:
+    # without sections, all tasks belong to a single section
+    if sections == "none":
+        return SQL("NULL")
+    return get_group_keys(day)[SECTION_GROUPS[sections]]
+
+
+def get_total_seconds() -> Expression:
+    return fn.SUM(Task.end - Task.start).coerce(False) * 1.0
+
+
+def group_by_position(query: ModelSelect, keys: int) -> ModelSelect:
+    # the groups are referred to by their position, so that the keys are only computed once
+    positions = [SQL(str(i)) for i in range(1, keys + 1)]
+    return query.group_by(*positions).order_by(*positions)
+
+
+def get_rollup_query(
+    get_keys: Callable[[Expression], Sequence[Expression]],
+    project_name: Optional[str],
+    date_range: Optional[tuple[datetime, datetime]],
+    tz: ZoneInfo,
+) -> ModelSelect:
+    # without filters on the tasks themselves, the groups are added up from the daily rollup for
+    # the local days, which lie completely within the date range, and from the tasks for the days
+    # at its edges, which include the tasks that have started before the date range
+    days = None if date_range is None else get_whole_days(*date_range, tz)
+    parts = []
+    if date_range is None or days is not None:
+        keys = get_keys(task_rollup.day)
+        query = (Task.select(
+                        *[key.alias(f"key_{i}") for i, key in enumerate(keys, 1)],
+                        fn.SUM(task_rollup.count).alias("count"),
+                        (fn.SUM(task_rollup.milliseconds) / 1000.0).alias("seconds"),
+                    )
+                    .from_(task_rollup)
+                    .join(Project, on=(Project.id == task_rollup.project_id))
+                    # days, whose tasks have all been deleted, keep their rows until the next
+                    # rebuild
+                    .having(fn.SUM(task_rollup.count) > 0))
+        if days is not None:
+            query = query.where(task_rollup.day.between(*[day.isoformat() for day in days]))
+        parts.append(query)
+    if date_range is not None:
+        start, end = date_range
+        edges = get_overlap_condition(start, end)
+        if days is not None:
+            first, last = days
+            whole_start = get_local_midnight(first, tz)
+            whole_end = get_local_midnight(last + timedelta(days=1), tz)
+            edges = (get_overlap_condition(start, whole_start - timedelta(seconds=1))
+                     | (get_overlap_condition(whole_end, end) & (Task.start >= whole_end)))
+        keys = get_keys(get_local_day(Task.start))
+        query = (Task.select(
+                        *[key.alias(f"key_{i}") for i, key in enumerate(keys, 1)],
+                        fn.COUNT(Task.id).alias("count"),
+                        get_total_seconds().alias("seconds"),
+                    )
+                    .join(Project)
+                    .where(is_null(Task.end, null=False))
+                    .where(edges))
+        parts.append(query)
+
+    if project_name is not None:
+        parts = [query.where(Project.name == project_name) for query in parts]
+    parts = [group_by_position(query, len(keys)) for query in parts]
+    if len(parts) == 1:
+        return parts[0].tuples()
+    # the groups of the edges are added to those of the rollup, which may be the same, while the
+    # parts of a compound query can't be ordered
+    union = reduce(operator.add, [query.order_by() for query in parts]).alias("parts")
+    query = (Task.select(
+                    *[getattr(union.c, f"key_{i}") for i in range(1, len(keys) + 1)],
+                    fn.SUM(union.c.count),
+                    fn.SUM(union.c.seconds),
+                )
+                .from_(union))
+    return group_by_position(query, len(keys)).tuples()
+
+
+def get_report_query(
+    groups: Sequence[str],
+    date_range: Optional[tuple[datetime, datetime]],
+    project_name: Optional[str],
+    task_tags: Sequence[str],
+    project_tags: Sequence[str],
+    tz: ZoneInfo,
+) -> ModelSelect:
+    # the tasks are grouped and added up by SQLite, so only one row per group is ever loaded
+    by_task = "task" in groups or "tag" in groups
+    if not by_task and len(task_tags) == 0 and len(project_tags) == 0:
+        return get_rollup_query(
+            lambda day: [get_group_keys(day)[group] for group in groups],
+            project_name,
+            date_range,
+            tz,
+        )
+
+    keys = get_group_keys(get_local_day(Task.start))
+    query = (Task.select(
+                    *[keys[group] for group in groups], fn.COUNT(Task.id), get_total_seconds()
+                )
+                .join(Project)
+                .where(is_null(Task.end, null=False)))
+    if "tag" in groups:
+        # a task counts towards each of its own tags and of the tags of its project, like the tag
+        # filters match both, but only once towards a tag, which both have, as UNION removes the
+        # duplicate links; the tasks without any tags are grouped under NULL
+        tagged = Task.alias("tagged")
+        task_links = TaskToTag.select(TaskToTag.task_id, TaskToTag.tag_id)
+        project_links = (ProjectToTag.select(tagged.id, ProjectToTag.tag_id)
+                                     .join(tagged, on=(tagged.project == ProjectToTag.project)))
+        links = (task_links | project_links).alias("links")
+        query = (query.join_from(Task, links, JOIN.LEFT_OUTER, on=(links.c.task_id == Task.id))
+                      .join_from(Task, Tag, JOIN.LEFT_OUTER, on=(Tag.id == links.c.tag_id)))
+    query = filter_tasks(query, date_range, project_name, task_tags, project_tags)
+    query = group_by_position(query, len(groups))
+    if "task" in groups:
+        # the tasks are grouped by the ids of their names, which are only looked up for each group
+        query = query.group_by(*[
+            Task.name_text if group == "task" else SQL(str(i))
+            for i, group in enumerate(groups, 1)
+        ])
+    return query.tuples()
+
+
+def get_section_summary(query: ModelSelect, sections: str) -> ModelSelect:
+    # the key, the number of tasks and the total duration of each section of a recap, which are
+    # all added up in a single pass over its tasks, in the order of the recap
+    key = get_section_key(get_local_day(Task.start), sections)
+    summary = query.select(key, fn.COUNT(Task.id), get_total_seconds()).order_by()
+    return group_by_position(summary, 1).tuples()
+
+
+def get_rollup_section_summary(
+    project_name: Optional[str],
+    sections: str,
+    date_range: Optional[tuple[datetime, datetime]],
+    tz: ZoneInfo,
+) -> ModelSelect:
+    return get_rollup_query(
+        lambda day: [get_section_key(day, sections)], project_name, date_range, tz
+    )
+
+
+def get_export_query(
+    date_range: Optional[tuple[datetime, datetime]] = None,
+    project_name: Optional[str] = None,
+    task_tags: Sequence[str] = (),
+    project_tags: Sequence[str] = (),
+    match: Optional[str] = None,
+    tag_query: Sequence[TagClause] = (),
+) -> ModelSelect:
+    query = get_task_query().where(is_null(Task.end, null=False))
+    query = filter_tasks(
+        query, date_range, project_name, task_tags, project_tags, match, tag_query
+    )
+    return query.order_by(Task.start, Task.id)
+
+
+def get_change_watermark() -> int:
+    # the number of the latest change, which the current transaction can see; any change it
+    # can't see yet is committed later, as there is only ever one writer, so it's numbered higher
+    return Task.select(change_sequence.value).from_(change_sequence).scalar() or 0
+
+
+def get_changed_export_query(query: ModelSelect, watermark: Optional[int]) -> ModelSelect:
+    if watermark is None:
+        return query
+    changed_projects = Project.select(Project.id).where(Project.change_seq > watermark)
+    return query.where(
+        (Task.change_seq > watermark) | Task.project_id.in_(changed_projects)
+    )
+
+
+def get_deleted_task_ids(watermark: Optional[int]) -> list[int]:
+    if watermark is None:
+        return []
+    deleted = (Task.select(task_tombstone.id)
+                   .from_(task_tombstone)
+                   .where(task_tombstone.change_seq > watermark)
+                   .order_by(task_tombstone.id)
+                   .tuples())
+    return [id_ for id_, in deleted]
@@ -1,8 +1,13 @@
+import json
+from functools import cache
 from typing import Literal
 from zoneinfo import ZoneInfo  # also import tzdata
 
 from pydantic import BaseModel as PydanticBaseModel
-from pydantic import Field, FieldValidationInfo, field_serializer, field_validator
+from pydantic import Field, FieldValidationInfo, ValidationError, field_serializer, field_validator
+
+from .error_utils import print_error_box
+from .models import DEFAULT_PRAGMAS, SETTINGS_FILE
 
 
 class BaseModel(PydanticBaseModel):
@@ -51,6 +56,13 @@ class Settings(BaseModel):
         Column(attribute="target"),
         Column(attribute="duration"),
     ]
+    journal_mode: Literal["delete", "truncate", "persist", "memory", "wal", "off"] = (
+        DEFAULT_PRAGMAS["journal_mode"]
+    )
+    busy_timeout: int = Field(default=DEFAULT_PRAGMAS["busy_timeout"], ge=0)
+    synchronous: Literal["off", "normal", "full", "extra"] = DEFAULT_PRAGMAS["synchronous"]
+    cache_size: int = DEFAULT_PRAGMAS["cache_size"]
+    mmap_size: int = Field(default=DEFAULT_PRAGMAS["mmap_size"], ge=0)
 
     @field_validator("tz", mode="before")
     def parse_tz(cls, value: str) -> ZoneInfo:
@@ -82,6 +94,28 @@ class Settings(BaseModel):
             case _:
                 raise ValueError
 
+    @field_validator("journal_mode", "synchronous", mode="before")
+    def parse_pragma(cls, value: str) -> str:
+        return value.lower()
+
     @field_serializer("tz")
     def serialize_tz(self, tz: ZoneInfo) -> str:
         return tz.key
+
+
+@cache
+def load_settings() -> Settings:
+    try:
+        # somehow model_validate_json raises a NotImplementedError
+        with SETTINGS_FILE.open("r") as file:
+            model_dict = json.load(file)
+        return Settings.model_validate(model_dict)
+    except FileNotFoundError:
+        return Settings()
+    except ValidationError:
+        print_error_box("The validation of the settings failed!")
+
+
+def save_settings(settings: Settings) -> None:
+    with SETTINGS_FILE.open("w") as file:
+        json.dump(settings.model_dump(mode="json"), file, ensure_ascii=False, indent=2)
@@ -0,0 +1,73 @@
+# This module keeps a small JSON file with the currently running task next to the database.
+# It must only depend on the standard library, as it's used by the prompt entry point.
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from importlib.abc import Traversable
+
+STATE_SUFFIX = ".state"
+
+
+class RunningTask(TypedDict):
+    name: str
+    project: str
+    start: datetime
+    target: Optional[datetime]
+
+
+def get_state_path(db_file: "Path | Traversable | str") -> Path:
+    db_path = Path(str(db_file))
+    return db_path.with_name(db_path.name + STATE_SUFFIX)
+
+
+def write_state(db_file: "Path | Traversable | str", task: Optional[RunningTask]) -> None:
+    state = None
+    if task is not None:
+        state = {
+            "name": task["name"],
+            "project": task["project"],
+            "start": task["start"].isoformat(),
+            "target": None if task["target"] is None else task["target"].isoformat(),
+        }
+
+    # the state is written to a temporary file first, so that readers never see a partial file
+    path = get_state_path(db_file)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with temp_path.open("w", encoding="utf-8") as file:
+            json.dump({"task": state}, file, ensure_ascii=False)
+        temp_path.replace(path)
+    except OSError:
+        # the state file is only a cache, so failing to write it must not fail the command
+        temp_path.unlink(missing_ok=True)
+
+
+def is_state_fresh(db_file: "Path | Traversable | str") -> bool:
+    # any write to the database that happened after the state was written makes it stale
+    db_path = Path(str(db_file))
+    try:
+        state_mtime = get_state_path(db_path).stat().st_mtime_ns
+        db_mtime = db_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+    wal_path = db_path.with_name(db_path.name + "-wal")
+    if wal_path.exists():
+        db_mtime = max(db_mtime, wal_path.stat().st_mtime_ns)
+    return state_mtime >= db_mtime
+
+
+def read_state(db_file: "Path | Traversable | str") -> Optional[RunningTask]:
+    with get_state_path(db_file).open("r", encoding="utf-8") as file:
+        state = json.load(file)["task"]
+    if state is None:
+        return None
+    return RunningTask(
+        name=state["name"],
+        project=state["project"],
+        start=datetime.fromisoformat(state["start"]),
+        target=None if state["target"] is None else datetime.fromisoformat(state["target"]),
+    )
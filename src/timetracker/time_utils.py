@@ -1,9 +1,26 @@
 import re
-from datetime import datetime
+import time
+from bisect import bisect_right, insort
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, timedelta, timezone
+from functools import cache
+from operator import attrgetter, itemgetter
 from zoneinfo import ZoneInfo
 
 DAYS_IN_SECONDS = 60 * 60 * 24
 YEARS_IN_SECONDS = DAYS_IN_SECONDS * 365.25
+DEFAULT_FORMAT = "%d/%m/%Y %H:%M:%S"
+# a span is only searched for transitions within this distance of the first datetime in it
+MAX_SPAN = timedelta(days=366)
+# the range, in which the UTC offsets are stored in the database for the daily rollup
+OFFSET_RANGE = (datetime(1970, 1, 1), datetime(2100, 1, 1))
+# the formatters forget what they've cached, once they hold this many strings
+MAX_CACHE_SIZE = 4096
+# the time directives, which DatetimeFormatter fills in itself, mapped to the index of their field
+# in TIME_FIELDS and their format
+TIME_FIELDS = attrgetter("hour", "minute", "second", "microsecond")
+TIME_FORMATS = {"H": (0, "%02d"), "M": (1, "%02d"), "S": (2, "%02d"), "f": (3, "%06d")}
+TIME_DIRECTIVES = set("cfHIklMprRsSTX")
 NUMBERS = [
     "████████\n██    ██\n██    ██\n██    ██\n██    ██\n██    ██\n████████",
     "      ██\n      ██\n      ██\n      ██\n      ██\n      ██\n      ██",
@@ -65,15 +82,280 @@ def format_seconds(total_seconds: float) -> str:
     return result
 
 
+def get_status_message_without_target(start: datetime) -> str:
+    delta = datetime.utcnow() - start
+    string = format_seconds(delta.total_seconds())
+    return f"The task has been running for {string}"
+
+
+def get_status_message_with_target(start: datetime, target: datetime) -> str:
+    now = datetime.utcnow().replace(microsecond=0)
+    start_delta = now - start
+    start_string = format_seconds(start_delta.total_seconds())
+    target_delta = target - now
+    target_string = format_seconds(target_delta.total_seconds())
+
+    message = f"The task has been running for {start_string} and the target "
+    if target_delta.total_seconds() > 0:
+        message += f"is reached in {target_string}"
+    else:
+        message += f"has been reached {target_string} ago"
+
+    return message
+
+
+def get_raw_status(
+    project_name: str, task_name: str, start: datetime, target: datetime | None
+) -> str:
+    # this is to avoid rounding errors
+    start = start.replace(microsecond=0)
+    target = None if target is None else target.replace(microsecond=0)
+    if target is None:
+        message = get_status_message_without_target(start)
+    else:
+        message = get_status_message_with_target(start, target)
+    return f"{project_name} > {task_name}\n{message}"
+
+
 # "dt" is expected to be a naive datetime
-def to_aware_string(dt: datetime | None, tz: ZoneInfo, template: str = "%d/%m/%Y %H:%M:%S") -> str:
+def to_aware_string(dt: datetime | None, tz: ZoneInfo, template: str = DEFAULT_FORMAT) -> str:
     if dt is None:
         return "N/A"
-    utc_dt = dt.replace(tzinfo=ZoneInfo("UTC"))
+    utc_dt = dt.replace(tzinfo=UTC)
     adjusted_dt = utc_dt.astimezone(tz)
     return adjusted_dt.strftime(template)
 
 
+class OffsetSpans:
+    # the UTC offset of a timezone only changes at its transitions, so it's looked up once for
+    # each span between two transitions, instead of once for each datetime
+    def __init__(self, tz: ZoneInfo) -> None:
+        self.tz = tz
+        # (start, end, offset) of each known span in naive UTC, sorted by start
+        self.spans: list[tuple[datetime, datetime, timezone]] = []
+        self.last_span: tuple[datetime, datetime, timezone] | None = None
+
+    # "dt" is expected to be a naive datetime in UTC
+    def get_offset(self, dt: datetime) -> timezone:
+        span = self.last_span
+        # the tasks are mostly formatted in order, so the span of the previous datetime is checked
+        # before the others
+        if span is None or not span[0] <= dt < span[1]:
+            i = bisect_right(self.spans, dt, key=itemgetter(0)) - 1
+            if i >= 0 and dt < self.spans[i][1]:
+                span = self.spans[i]
+            else:
+                span = self.find_span(dt)
+                insort(self.spans, span, key=itemgetter(0))
+            self.last_span = span
+        return span[2]
+
+    def lookup(self, dt: datetime) -> timezone:
+        local_dt = dt.replace(tzinfo=UTC).astimezone(self.tz)
+        return timezone(local_dt.utcoffset(), local_dt.tzname())
+
+    def find_span(self, dt: datetime) -> tuple[datetime, datetime, timezone]:
+        offset = self.lookup(dt)
+        start = self.find_transition(dt, dt - MAX_SPAN, offset)
+        end = self.find_transition(dt, dt + MAX_SPAN, offset)
+        return start, end, offset
+
+    # returns the transition between "inside" and "limit", i.e. the first datetime of the span
+    # when going back and the first one after it when going forward, or "limit", if there's none
+    def find_transition(self, inside: datetime, limit: datetime, offset: timezone) -> datetime:
+        step = timedelta(days=1) if limit > inside else timedelta(days=-1)
+        # offsets change at most a couple of times each year, so walking day by day doesn't skip
+        # over two transitions
+        outside = inside
+        while self.lookup(outside) == offset:
+            if outside == limit:
+                return limit
+            inside = outside
+            outside = limit if abs(limit - inside) <= abs(step) else inside + step
+
+        # transitions happen at full seconds, so the bisection can ignore the microseconds
+        inside -= timedelta(microseconds=inside.microsecond)
+        outside -= timedelta(microseconds=outside.microsecond)
+        while abs(outside - inside) > timedelta(seconds=1):
+            middle = inside + (outside - inside) // 2
+            middle -= timedelta(microseconds=middle.microsecond)
+            if self.lookup(middle) == offset:
+                inside = middle
+            else:
+                outside = middle
+        return outside if step > timedelta() else inside
+
+
+def get_utc_offsets(tz: ZoneInfo) -> list[tuple[datetime, int]]:
+    # the start of each span with a different UTC offset in naive UTC and the offset in seconds;
+    # the offset is looked up at the start of each month, as there's at most one transition in a
+    # month, which is then searched day by day
+    spans = OffsetSpans(tz)
+    start, end = OFFSET_RANGE
+    offset = spans.lookup(start)
+    offsets = [(start, int(offset.utcoffset(None).total_seconds()))]
+    month = start
+    while month < end:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        next_offset = spans.lookup(next_month)
+        if next_offset != offset:
+            transition = spans.find_transition(month, next_month, offset)
+            offsets.append((transition, int(next_offset.utcoffset(None).total_seconds())))
+        month, offset = next_month, next_offset
+    return offsets
+
+
+def get_local_midnight(day: date, tz: ZoneInfo) -> datetime:
+    # the start of a local day as a naive datetime in UTC
+    return datetime.combine(day, datetime.min.time(), tz).astimezone(UTC).replace(tzinfo=None)
+
+
+def get_whole_days(start: datetime, end: datetime, tz: ZoneInfo) -> tuple[date, date] | None:
+    # the first and the last local day, which lie completely within a range of naive datetimes
+    # in UTC; the end is compared to the second, like the epoch seconds of the tasks
+    local_start = start.replace(tzinfo=UTC).astimezone(tz)
+    first = local_start.date()
+    if local_start.time() != datetime.min.time():
+        first += timedelta(days=1)
+    after = end.replace(microsecond=0, tzinfo=UTC) + timedelta(seconds=1)
+    last = after.astimezone(tz).date() - timedelta(days=1)
+    return (first, last) if first <= last else None
+
+
+@cache
+def get_offset_spans(tz: ZoneInfo) -> OffsetSpans:
+    return OffsetSpans(tz)
+
+
+class DatetimeFormatter:
+    # the parts of the template, which only depend on the day, are formatted by strftime once for
+    # each day, while the time is filled in directly, so that formatting scales with the number of
+    # distinct days instead of the number of datetimes
+    def __init__(self, tz: ZoneInfo, template: str = DEFAULT_FORMAT) -> None:
+        self.spans = get_offset_spans(tz)
+        self.template = template
+        # templates with other time directives are formatted by strftime for each datetime
+        self.exact = False
+        self.day_templates: list[str] = []
+        # the pattern takes the formatted day templates and the time fields in the order, in which
+        # they appear in the template
+        self.pattern = ""
+        order: list[tuple[bool, int]] = []
+        for token in re.findall(r"%[-_0^#]*.|[^%]+", template):
+            if token[1:] in TIME_FORMATS:
+                index, format_ = TIME_FORMATS[token[1:]]
+                self.pattern += format_
+                order.append((True, index))
+                continue
+            if token.startswith("%") and token[-1] in TIME_DIRECTIVES:
+                self.exact = True
+            if len(order) != 0 and not order[-1][0]:
+                self.day_templates[-1] += token
+            else:
+                self.pattern += "%s"
+                order.append((False, len(self.day_templates)))
+                self.day_templates.append(token)
+        if len(order) == 0:
+            self.exact = True
+        else:
+            # the time fields are passed after the formatted day templates
+            self.arrange = itemgetter(*[
+                index + len(self.day_templates) if is_time else index for is_time, index in order
+            ])
+        self.cache: dict[tuple[int, timezone], tuple[str, ...]] = {}
+
+    # "dt" is expected to be a naive datetime in UTC
+    def format_datetime(self, dt: datetime | None) -> str:
+        if dt is None:
+            return "N/A"
+        offset = self.spans.get_offset(dt)
+        local_dt = dt + offset.utcoffset(None)
+        if self.exact:
+            return local_dt.replace(tzinfo=offset).strftime(self.template)
+        key = (local_dt.toordinal(), offset)
+        days = self.cache.get(key)
+        if days is None:
+            if len(self.cache) >= MAX_CACHE_SIZE:
+                self.cache.clear()
+            aware_dt = local_dt.replace(tzinfo=offset)
+            days = tuple(aware_dt.strftime(day_template) for day_template in self.day_templates)
+            self.cache[key] = days
+        return self.pattern % self.arrange(days + TIME_FIELDS(local_dt))
+
+    def format_column(self, column: Iterable[datetime | None]) -> list[str]:
+        return [self.format_datetime(dt) for dt in column]
+
+
+class DatetimeParser:
+    # the inverse of DatetimeFormatter for templates with a day and a time separated by a space,
+    # like the default one: both halves are parsed by strptime once and cached, as there are only
+    # so many days and at most one time for each second of a day
+    def __init__(self, tz: ZoneInfo, template: str = DEFAULT_FORMAT) -> None:
+        self.tz = tz
+        self.template = template
+        self.day_template, _, self.time_template = template.partition(" ")
+        day_directives = {token[-1] for token in re.findall(r"%[-_0^#]*.", self.day_template)}
+        time_directives = {token[-1] for token in re.findall(r"%[-_0^#]*.", self.time_template)}
+        # a template with a UTC offset is converted with the offset instead of the timezone
+        self.aware = "z" in day_directives | time_directives
+        # other templates are parsed by strptime as a whole
+        self.exact = (
+            self.aware
+            or " " in self.time_template
+            or len(day_directives & TIME_DIRECTIVES) != 0
+            or not time_directives <= set("HMS%")
+        )
+        self.days: dict[str, datetime] = {}
+        self.times: dict[str, timedelta] = {}
+
+    # the result is a naive datetime in UTC, like the ones in the database
+    def parse(self, value: str | None) -> datetime | None:
+        if value is None or value in ["", "N/A"]:
+            return None
+        if self.aware:
+            return datetime.strptime(value, self.template).astimezone(UTC).replace(tzinfo=None)
+        if self.exact:
+            aware_dt = datetime.strptime(value, self.template).replace(tzinfo=self.tz)
+            return aware_dt.astimezone(UTC).replace(tzinfo=None)
+        # the halves are only parsed into their fields, as attaching the timezone to every
+        # datetime would take longer than parsing them
+        day, _, time_of_day = value.partition(" ")
+        day_dt = self.days.get(day)
+        if day_dt is None:
+            if len(self.days) >= MAX_CACHE_SIZE:
+                self.days.clear()
+            fields = time.strptime(day, self.day_template)
+            day_dt = datetime(fields.tm_year, fields.tm_mon, fields.tm_mday)
+            self.days[day] = day_dt
+        time_delta = self.times.get(time_of_day)
+        if time_delta is None:
+            fields = time.strptime(time_of_day, self.time_template)
+            time_delta = timedelta(
+                hours=fields.tm_hour, minutes=fields.tm_min, seconds=fields.tm_sec
+            )
+            self.times[time_of_day] = time_delta
+        local_dt = day_dt + time_delta
+        return local_dt - self.tz.utcoffset(local_dt)
+
+
+class DurationFormatter:
+    # most tasks take a round number of minutes, so the same durations come up again and again
+    def __init__(self) -> None:
+        self.cache: dict[float, str] = {}
+
+    def format_duration(self, total_seconds: float) -> str:
+        result = self.cache.get(total_seconds)
+        if result is None:
+            if len(self.cache) >= MAX_CACHE_SIZE:
+                self.cache.clear()
+            result = format_seconds(total_seconds)
+            self.cache[total_seconds] = result
+        return result
+
+    def format_column(self, column: Iterable[float]) -> list[str]:
+        return [self.format_duration(total_seconds) for total_seconds in column]
+
+
 def handle_two_digit_year(year: str) -> str:
     if len(year) == 2:
         current_year = datetime.now().year % 100
@@ -0,0 +1,332 @@
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Sequence
+from datetime import datetime
+from typing import ClassVar, NamedTuple, Optional
+
+from peewee import ModelSelect
+from rich.style import Style
+from rich.text import Text
+from textual import work
+from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import Footer, Static
+from textual.worker import get_current_worker
+
+from .layout import Cell, compile_layout, render_rows
+from .models import Task, db
+from .queries import get_page_keys, get_page_query, get_section_summary
+from .settings import Column, Settings
+from .time_utils import format_seconds, get_time_as_ascii_string
+
+
+class StatusDisplay(App):
+    BINDINGS: ClassVar[list[Binding]] = [
+        Binding("q", "quit", "Quit", priority=True),
+    ]
+
+    class Clock(Static):
+        time_str = reactive("00:00:00")
+
+        def __init__(self, task: Task) -> None:
+            super().__init__("")
+            self.task_ = task
+
+        def on_mount(self) -> None:
+            if self.task_.target is not None:
+                self.set_interval(0.25, self.update_target)
+            else:
+                self.set_interval(0.25, self.update_run_time)
+            self.styles.height = "100%"
+            self.styles.content_align = ("center", "middle")
+            self.styles.border = ("heavy", "white")
+            self.styles.border_title_style = "bold"
+            self.border_title = f"{self.task_.project.name} > {self.task_.name}"
+            self.border_subtitle = "press q to quit"
+
+        def update_run_time(self) -> None:
+            delta = datetime.utcnow() - self.task_.start
+            self.time_str = format_seconds(delta.total_seconds())
+
+        def update_target(self) -> None:
+            delta = self.task_.target - datetime.utcnow()
+            self.time_str = format_seconds(delta.total_seconds())
+
+        def watch_time_str(self, time_str: str) -> None:
+            self.update(get_time_as_ascii_string(time_str))
+
+    def __init__(self, task: Task) -> None:
+        super().__init__()
+        self.task_ = task
+
+    def compose(self) -> ComposeResult:
+        clock = self.Clock(self.task_)
+        yield clock
+
+
+# the rendered cells of a task
+Row = tuple[Cell, ...]
+# the key, the number of tasks and the total duration of each section of a recap
+Summarize = Callable[[], Iterable[tuple[Optional[str], int, float]]]
+
+
+class Section(NamedTuple):
+    # the line of the first task and the index of the first task in the recap
+    line: int
+    task: int
+    count: int
+    key: Optional[str]
+    seconds: float
+
+
+class RecapTable(ScrollView, can_focus=True):
+    DEFAULT_CSS = """
+    RecapTable {
+        height: 1fr;
+        overflow-x: hidden;
+    }
+    """
+
+    PAGE_SIZE = 100
+    HEADER_STYLE = Style(bold=True)
+    ROW_STYLES = (Style.parse("white on grey19"), Style.parse("white"))
+    PLACEHOLDER_STYLE = Style(dim=True)
+    SUBTOTAL_STYLE = Style(bold=True, underline=True)
+
+    def __init__(
+        self,
+        query: ModelSelect,
+        settings: Settings,
+        id_: bool,
+        summarize: Optional[Summarize] = None,
+    ) -> None:
+        super().__init__()
+        self.query_ = query
+        self.settings = settings
+        self.id_ = id_
+        # the sections and their totals are computed from the tasks of the query, unless they can
+        # be looked up more cheaply
+        self.summarize = summarize or (lambda: get_section_summary(query, settings.sections))
+        # each section ends with a line for its subtotal
+        self.show_subtotals = settings.sections != "none"
+        layout = settings.recap_layout
+        if id_:
+            layout = [Column(attribute="id", header_name="ID"), *layout]
+        self.headers = [column.header_name for column in layout]
+        self.renderers = compile_layout(layout, settings.tz)
+        self.row_count: Optional[int] = None
+        self.line_count = 0
+        self.total: Optional[str] = None
+        self.sections: list[Section] = []
+        self.section_lines: list[int] = []
+        # only the pages around the visible rows are kept, the others are reloaded on demand
+        self.pages: dict[int, list[Row]] = {}
+        # the key of the last task before each page, i.e. where the keyset pagination resumes
+        self.page_keys: list[Optional[tuple[datetime, int]]] = [None]
+
+    def on_mount(self) -> None:
+        self.load_summary()
+        self.request_pages()
+
+    def on_resize(self) -> None:
+        self.update_virtual_size()
+        self.request_pages()
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        self.request_pages()
+
+    def get_visible_pages(self) -> tuple[int, int]:
+        first_line = int(self.scroll_y)
+        last_line = first_line + self.scrollable_content_region.height
+        first_row = self.locate_line(first_line)[1]
+        last_row = self.locate_line(last_line)[1]
+        return first_row // self.PAGE_SIZE, last_row // self.PAGE_SIZE
+
+    def locate_line(self, line: int) -> tuple[Optional[Section], int]:
+        # the section of a line and the index of its task, which is the index after the last task
+        # of the section for its subtotal; until the sections are known, each line is a task
+        if len(self.sections) == 0:
+            return None, line
+        section = self.sections[bisect_right(self.section_lines, line) - 1]
+        return section, section.task + line - section.line
+
+    def request_pages(self) -> None:
+        first, last = self.get_visible_pages()
+        if self.row_count is not None:
+            last = min(last, max(self.row_count - 1, 0) // self.PAGE_SIZE)
+        if any(page not in self.pages for page in range(first, last + 1)):
+            self.load_pages(first, last)
+
+    @work(exclusive=True, group="pages")
+    def load_pages(self, first: int, last: int) -> None:
+        worker = get_current_worker()
+        # pages can only be loaded after the page before them, since each one starts after the
+        # last task of the previous page
+        with db:
+            known = len(self.page_keys) - 1
+            if first > known:
+                # skipped pages only need their keys, so none of their tasks are loaded
+                skipped_keys = get_page_keys(
+                    self.query_, self.page_keys[known], first - known, self.PAGE_SIZE
+                )
+                if worker.is_cancelled:
+                    return
+                self.app.call_from_thread(self.add_page_keys, known, skipped_keys)
+                if len(skipped_keys) < first - known:
+                    return
+
+            for page in range(first, last + 1):
+                if worker.is_cancelled:
+                    return
+                if page in self.pages and page + 1 < len(self.page_keys):
+                    continue
+                # an additional task is fetched to know, if there's another page
+                after = self.page_keys[page]
+                tasks = list(get_page_query(self.query_, after, self.PAGE_SIZE + 1))
+                rows = list(render_rows(self.renderers, tasks[:self.PAGE_SIZE]))
+                next_key = None
+                if len(tasks) > self.PAGE_SIZE:
+                    next_key = (tasks[-2].start, tasks[-2].id_)
+                self.app.call_from_thread(self.add_page, page, rows, next_key)
+                if next_key is None:
+                    return
+
+    def add_page_keys(self, page: int, keys: list[tuple[datetime, int]]) -> None:
+        # a cancelled worker might have got further meanwhile, but the keys of a page never change
+        if len(self.page_keys) < page + 1 + len(keys):
+            self.page_keys[page + 1:] = keys
+
+    def add_page(
+        self, page: int, rows: list[Row], next_key: Optional[tuple[datetime, int]]
+    ) -> None:
+        if next_key is not None and page + 1 == len(self.page_keys):
+            self.page_keys.append(next_key)
+        first, last = self.get_visible_pages()
+        if first - 1 <= page <= last + 1:
+            self.pages[page] = rows
+        for cached_page in list(self.pages):
+            if not first - 1 <= cached_page <= last + 1:
+                del self.pages[cached_page]
+        self.refresh()
+
+    @work(group="summary")
+    def load_summary(self) -> None:
+        sections = []
+        line = row_count = 0
+        total = 0.0
+        with db:
+            for key, count, seconds in self.summarize():
+                sections.append(Section(line, row_count, count, key, seconds))
+                line += count + (1 if self.show_subtotals else 0)
+                row_count += count
+                total += seconds
+        self.app.call_from_thread(
+            self.set_summary, sections, row_count, line, format_seconds(total)
+        )
+
+    def set_summary(
+        self, sections: list[Section], row_count: int, line_count: int, total: str
+    ) -> None:
+        self.sections = sections
+        self.section_lines = [section.line for section in sections]
+        self.row_count = row_count
+        self.line_count = line_count
+        if self.settings.show_total:
+            self.total = total
+        self.update_virtual_size()
+        self.request_pages()
+
+    def update_virtual_size(self) -> None:
+        if self.row_count is None:
+            return
+        # one line for the header, one for each task and subtotal and one for the total
+        height = 1 + self.line_count + (1 if self.total is not None else 0)
+        self.virtual_size = Size(self.scrollable_content_region.width, height)
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        if y == 0:
+            return self.render_cells(self.headers, self.HEADER_STYLE, width)
+
+        line = int(self.scroll_y) + y - 1
+        if self.row_count is not None and line >= self.line_count:
+            return self.render_total(line, width)
+
+        section, index = self.locate_line(line)
+        if section is not None and index == section.task + section.count:
+            return self.render_subtotal(section, width)
+        return self.render_task(index, width)
+
+    def render_total(self, line: int, width: int) -> Strip:
+        # the total follows the last line, below it the lines are blank
+        if line == self.line_count and self.total is not None:
+            cells = [""] * (len(self.headers) - 2) + ["total", self.total]
+            return self.render_cells(cells, self.HEADER_STYLE, width)
+        return Strip.blank(width)
+
+    def render_subtotal(self, section: Section, width: int) -> Strip:
+        subtotal = format_seconds(section.seconds)
+        cells = [""] * (len(self.headers) - 2) + [section.key, subtotal]
+        return self.render_cells(cells, self.SUBTOTAL_STYLE, width)
+
+    def render_task(self, index: int, width: int) -> Strip:
+        # until its page is loaded, a task is shown as a placeholder
+        page, offset = divmod(index, self.PAGE_SIZE)
+        rows = self.pages.get(page)
+        if rows is None or offset >= len(rows):
+            if self.row_count is None and page in self.pages:
+                return Strip.blank(width)
+            return self.render_cells(["..."] * len(self.headers), self.PLACEHOLDER_STYLE, width)
+        style = self.ROW_STYLES[index % 2]
+        # without subtotals, the last task is separated from the total
+        if not self.show_subtotals and index + 1 == self.row_count and self.total is not None:
+            style += Style(underline=True)
+        return self.render_cells(rows[offset], style, width)
+
+    def render_cells(self, cells: Sequence[Cell], style: Style, width: int) -> Strip:
+        column_width, remainder = divmod(width, len(cells))
+        line = Text(style=style, no_wrap=True, end="")
+        for i, cell in enumerate(cells):
+            text = Text(f" {cell}" if cell is not None else "")
+            text.truncate(
+                column_width + (1 if i < remainder else 0) - 1, overflow="ellipsis", pad=True
+            )
+            line.append_text(text)
+            line.append("│" if i < len(cells) - 1 else " ")
+        return Strip(line.render(self.app.console), width)
+
+
+class RecapDisplay(App):
+    BINDINGS: ClassVar[list[Binding]] = [
+        Binding("q", "quit", "Quit", priority=True),
+        Binding("j", "scroll(10)", "Scroll Down", priority=True),
+        Binding("k", "scroll( -10)", "Scroll Up", priority=True),
+    ]
+
+    def __init__(
+        self,
+        query: ModelSelect,
+        settings: Settings,
+        id_: bool,
+        summarize: Optional[Summarize] = None,
+    ) -> None:
+        super().__init__()
+        self.query_ = query
+        self.settings = settings
+        self.id_ = id_
+        self.summarize = summarize
+
+    def action_scroll(self, y: int) -> None:
+        self.query_one(RecapTable).scroll_relative(y=y, animate=False)
+
+    def compose(self) -> ComposeResult:
+        yield RecapTable(self.query_, self.settings, self.id_, self.summarize)
+        yield Footer()
+
+    def on_mount(self) -> None:
+        self.query_one(RecapTable).focus()
@@ -0,0 +1,45 @@
+# This module keeps the watermark of `export --since-last`, i.e. the number of the latest change
+# that has been exported, in a small JSON file next to the database, so that the export doesn't
+# need to write to the database.
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from .error_utils import print_error_box
+
+if TYPE_CHECKING:
+    from importlib.abc import Traversable
+
+WATERMARK_SUFFIX = ".watermark"
+
+
+def get_watermark_path(db_file: "Path | Traversable | str") -> Path:
+    db_path = Path(str(db_file))
+    return db_path.with_name(db_path.name + WATERMARK_SUFFIX)
+
+
+def read_watermark(db_file: "Path | Traversable | str") -> Optional[int]:
+    path = get_watermark_path(db_file)
+    try:
+        with path.open("r", encoding="utf-8") as file:
+            watermark = json.load(file)["watermark"]
+    except FileNotFoundError:
+        return None
+    except (ValueError, TypeError, KeyError):
+        watermark = None
+    # a watermark, which can't be read, would export either all tasks or none of them
+    if isinstance(watermark, bool) or not isinstance(watermark, int):
+        print_error_box(
+            f"The watermark in {path} can't be read, delete it to export all tasks again!"
+        )
+    return watermark
+
+
+def write_watermark(db_file: "Path | Traversable | str", watermark: Optional[int]) -> None:
+    # the watermark is written to a temporary file first, so that it's never lost halfway
+    path = get_watermark_path(db_file)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with temp_path.open("w", encoding="utf-8") as file:
+        json.dump({"watermark": watermark}, file)
+    temp_path.replace(path)
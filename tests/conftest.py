@@ -1,15 +1,24 @@
+import gc
 from datetime import datetime
 from pathlib import Path
 
 import pytest
 from peewee import SqliteDatabase
+from timetracker.migrations import migrate
 from timetracker.models import MODELS, Project
+from timetracker.models import db as app_db
 from typer.testing import CliRunner
 
 
 @pytest.fixture(scope="module", autouse=True)
 def db_path() -> Path:
     path = Path(__file__).parent.joinpath("fixture.db")
+    # the statements of failed commands are kept alive by the cycles of their tracebacks, and
+    # with them the locks of their connections, until they are garbage collected
+    gc.collect()
+    # otherwise the write-ahead log of the previous module would be applied to the new database
+    for suffix in ["-wal", "-shm"]:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
     with path.open("w"):
         pass
     return path
@@ -21,7 +30,12 @@ def db(db_path: Path) -> SqliteDatabase:
     with db.bind_ctx(MODELS):
         db.create_tables(MODELS)
         Project.create(name="Default", start=datetime.utcnow())
-    return db
+    # like by `init_database`, as the reporting commands don't upgrade a database
+    migrate(db)
+    yield db
+    db.close()
+    if not app_db.deferred:
+        app_db.close()
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -1,9 +1,10 @@
+from datetime import datetime
 from pathlib import Path
 
 import pytest
 from peewee import OperationalError, SqliteDatabase
 from timetracker.main import app
-from timetracker.models import MODELS, Project, Task
+from timetracker.models import MODELS, Project, Task, TaskText
 from typer.testing import CliRunner
 
 
@@ -101,6 +102,40 @@ class TestEdit:
         assert "fun" in result.stdout
 
 
+    def test_edit_task_name(self) -> None:
+        result_1 = self.runner.invoke(
+            app, ["-d", self.db_path, "edit", "t", "1", "name", "coding"]
+        )
+        result_2 = self.runner.invoke(app, ["-d", self.db_path, "edit", "t", "1", "note", "bugs"])
+
+        with self.db.bind_ctx(MODELS):
+            task = Task.get_by_id(1)
+            assert (task.name, task.note) == ("coding", "bugs")
+            # the previous name is kept, it's only stored once anyway
+            assert [text.text for text in TaskText.select()] == ["programming", "coding", "bugs"]
+
+        assert result_1.exit_code == 0
+        assert result_2.exit_code == 0
+        assert "One entry has been updated" in result_2.stdout
+
+
+    def test_edit_task_start(self) -> None:
+        result_1 = self.runner.invoke(
+            app, ["-d", self.db_path, "edit", "t", "1", "start", "2023-01-01T10:00+02:00"]
+        )
+        result_2 = self.runner.invoke(
+            app, ["-d", self.db_path, "edit", "t", "1", "start", "2023-01-01 25:00"]
+        )
+
+        with self.db.bind_ctx(MODELS):
+            # the offset is applied, as datetimes are stored in UTC
+            assert Task.get_by_id(1).start == datetime(2023, 1, 1, 8)
+
+        assert result_1.exit_code == 0
+        assert result_2.exit_code == 1
+        assert "isn't a valid start" in result_2.stdout
+
+
     def test_edit_tags(self) -> None:
         result = self.runner.invoke(
             app, ["-d", self.db_path, "edit", "p", "work", "tags", "interesting"]
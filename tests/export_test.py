@@ -0,0 +1,203 @@
+import csv
+import gzip
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.main import app
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Project, ProjectToTag, Tag, Task, TaskToTag
+from timetracker.watermark import get_watermark_path
+from typer.testing import CliRunner
+
+
+class TestExport:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def test_setup(self) -> None:
+        tasks = [
+            ("first", datetime(2020, 1, 1, 8), datetime(2020, 1, 1, 9), "ünïcode"),
+            ("second", datetime(2020, 1, 2, 8), datetime(2020, 1, 2, 10), None),
+            ("running", datetime(2020, 1, 3, 8), None, None),
+        ]
+        for name, start, end, note in tasks:
+            Task.create(name=name, start=start, end=end, note=note, project=1)
+
+        assert Task.select().count() == 3
+
+
+    def test_json_to_stdout(self) -> None:
+        result = self.runner.invoke(app, ["-d", self.db_path, "export", "json", "-o", "-"])
+
+        assert result.exit_code == 0
+        tasks = json.loads(result.stdout)
+        assert [task["task"] for task in tasks] == ["first", "second"]
+        assert tasks[0]["id"] == 1
+        assert tasks[0]["note"] == "ünïcode"
+        assert tasks[1]["duration"] == "02:00:00"
+
+
+    def test_ndjson_to_stdout(self) -> None:
+        result = self.runner.invoke(app, ["-d", self.db_path, "export", "ndjson", "-o", "-"])
+
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert [json.loads(line)["task"] for line in lines] == ["first", "second"]
+
+
+    def test_gzip_to_file(self, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("export.csv.gz")
+        result = self.runner.invoke(
+            app, ["-d", self.db_path, "export", "csv", "-o", path, "--gzip"]
+        )
+
+        assert result.exit_code == 0
+        assert str(path) in result.stdout
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+        assert rows[0][:4] == ["ID", "Project", "Project Tags", "Task"]
+        assert [row[3] for row in rows[1:]] == ["first", "second"]
+
+
+    def test_directory(self, tmp_path: Path) -> None:
+        result = self.runner.invoke(app, ["-d", self.db_path, "export", "json", "-o", tmp_path])
+
+        assert result.exit_code == 0
+        paths = list(tmp_path.glob("*.json"))
+        assert len(paths) == 1
+        assert len(json.loads(paths[0].read_text(encoding="utf-8"))) == 2
+
+
+    def test_filters(self) -> None:
+        def export(*filters: str) -> list[str]:
+            args = ["-d", self.db_path, "export", "ndjson", *filters, "-o", "-"]
+            result = self.runner.invoke(app, args)
+            assert result.exit_code == 0
+            return [json.loads(line)["task"] for line in result.stdout.splitlines()]
+
+        assert export("01/01/2020") == ["first"]
+        assert export("01/01/2020", "02/01/2020", "-p", "Default") == ["first", "second"]
+        assert export("-p", "unknown") == []
+        assert export("-t", "unknown") == []
+
+
+    def test_tag_paths(self) -> None:
+        def export(*filters: str) -> list[str]:
+            args = ["-d", self.db_path, "export", "ndjson", *filters, "-o", "-"]
+            result = self.runner.invoke(app, args)
+            assert result.exit_code == 0
+            return [json.loads(line)["task"] for line in result.stdout.splitlines()]
+
+        TaskToTag.create(task=1, tag=Tag.create(name="client/acme/backend"))
+        TaskToTag.create(task=2, tag=Tag.create(name="client/acme-old"))
+
+        # a tag matches itself and the tags below it, but not those, which only start like it
+        assert export("-t", "client/acme") == ["first"]
+        assert export("-tt", "client") == ["first", "second"]
+        assert export("-tt", "client/acme/backend") == ["first"]
+        assert export("-tt", "client/acme/back") == []
+        assert export("-tt", " client / acme / ,unknown") == ["first"]
+        TaskToTag.delete().execute()
+
+
+    def test_tag_query(self) -> None:
+        def export(tag_query: str) -> list[str]:
+            args = ["-d", self.db_path, "export", "ndjson", "-tq", tag_query, "-o", "-"]
+            result = self.runner.invoke(app, args)
+            assert result.exit_code == 0
+            return [json.loads(line)["task"] for line in result.stdout.splitlines()]
+
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        ProjectToTag.create(project=work, tag=Tag.create(name="client/acme"))
+        Task.update(project=work).where(Task.name == "second").execute()
+        TaskToTag.create(task=1, tag=Tag.create(name="urgent"))
+        TaskToTag.create(task=2, tag=Tag.get(Tag.name == "urgent"))
+        TaskToTag.create(task=1, tag=Tag.create(name="billed"))
+
+        # the tags of a project count as tags of its tasks
+        assert export("client AND urgent") == ["second"]
+        assert export("urgent AND NOT billed") == ["second"]
+        assert export("ANY(client, billed) AND NOT client/acme") == ["first"]
+        assert export("NOT ANY(client, billed)") == []
+        assert export("NOT unknown") == ["first", "second"]
+        assert export("unknown AND urgent") == []
+        assert Tag.get(Tag.name == "urgent").task_count == 2
+
+        # the index follows the tasks to their new project
+        Task.update(project=1).where(Task.name == "second").execute()
+        assert export("client") == []
+        assert Tag.get(Tag.name == "client/acme").task_count == 0
+
+        result = self.runner.invoke(
+            app, ["-d", self.db_path, "export", "ndjson", "-tq", "ANY(urgent, )", "-o", "-"]
+        )
+        assert result.exit_code == 1
+        assert "Invalid tag query" in result.stdout
+        TaskToTag.delete().execute()
+        ProjectToTag.delete().execute()
+        work.delete_instance()
+
+
+    def test_since_last(self) -> None:
+        get_watermark_path(self.db_path).unlink(missing_ok=True)
+        args = ["-d", self.db_path, "export", "ndjson", "-o", "-", "--since-last"]
+
+        def export() -> list[dict]:
+            result = self.runner.invoke(app, args)
+            assert result.exit_code == 0
+            return [json.loads(line) for line in result.stdout.splitlines()]
+
+        assert [task["task"] for task in export()] == ["first", "second"]
+        # saving a model writes back the timestamps, which it has read
+        task = Task.get(Task.name == "second")
+        task.note = "changed"
+        task.save()
+        Task.delete().where(Task.name == "first").execute()
+        tasks = export()
+        assert [(task["id"], task["deleted"]) for task in tasks] == [(1, True), (2, False)]
+        assert tasks[1]["note"] == "changed"
+        assert export() == []
+
+        # the changes are numbered, so a change stamped before the last export is not lost
+        self.db.execute_sql('UPDATE "task" SET "updated_at" = "created_at" WHERE "id" = 2')
+        assert [task["task"] for task in export()] == ["second"]
+
+        # the tags of a project are part of the rows of all its tasks
+        ProjectToTag.create(project=1, tag=Tag.create(name="exported"))
+        tasks = export()
+        assert [task["task"] for task in tasks] == ["second"]
+        assert tasks[0]["project_tags"] == "exported"
+        get_watermark_path(self.db_path).unlink()
+
+
+    def test_invalid_watermark(self) -> None:
+        # e.g. a timestamp, which earlier versions used as the watermark
+        path = get_watermark_path(self.db_path)
+        for content in ['{"watermark": "2020-01-01 08:00:00.000"}', "{", "[]"]:
+            path.write_text(content, encoding="utf-8")
+            result = self.runner.invoke(
+                app, ["-d", self.db_path, "export", "ndjson", "-o", "-", "--since-last"]
+            )
+
+            assert result.exit_code == 1
+            assert "can't be read" in result.stdout
+            assert path.read_text(encoding="utf-8") == content
+        path.unlink()
+
+
+    def test_empty_json(self) -> None:
+        Task.delete().execute()
+        result = self.runner.invoke(app, ["-d", self.db_path, "export", "json", "-o", "-"])
+
+        assert result.exit_code == 0
+        assert json.loads(result.stdout) == []
@@ -0,0 +1,114 @@
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker import commands
+from timetracker.commands import read_tasks_from_json
+from timetracker.main import app
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Project, ProjectToTag, Tag, Task, TaskToTag
+from timetracker.models import db as app_db
+from typer.testing import CliRunner, Result
+
+
+class TestImport:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def invoke_import(self, args: list[str], stdin: Optional[str] = None) -> Result:
+        # the import writes through the connection of the app, which has to hold its write lock
+        with app_db.bind_ctx(MODELS):
+            return self.runner.invoke(app, ["-d", self.db_path, "import", *args], input=stdin)
+
+
+    def test_setup(self) -> None:
+        project = Project.create(name="work", start=datetime(2020, 1, 1))
+        ProjectToTag.create(project=project, tag=Tag.create(name="paid"))
+        task = Task.create(
+            name="first",
+            note="ünïcode",
+            start=datetime(2020, 1, 1, 8),
+            end=datetime(2020, 1, 1, 9),
+            target=datetime(2020, 1, 1, 10),
+            project=project,
+        )
+        TaskToTag.create(task=task, tag=Tag.create(name="a"))
+        TaskToTag.create(task=task, tag=Tag.create(name="b"))
+        Task.create(
+            name="second", start=datetime(2020, 1, 2, 8), end=datetime(2020, 1, 2, 9), project=1
+        )
+
+        assert Task.select().count() == 2
+
+
+    @pytest.mark.parametrize("file_type", ["csv", "json", "ndjson"])
+    def test_round_trip(self, tmp_path: Path, file_type: str) -> None:
+        path = tmp_path.joinpath(f"export.{file_type}")
+        self.runner.invoke(app, ["-d", self.db_path, "export", file_type, "-o", str(path), "-z"])
+        result = self.invoke_import([file_type, str(path), "-z"])
+
+        assert result.exit_code == 0
+        assert "2 tasks have been imported" in result.stdout
+        assert "rows/s" in result.stdout
+        tasks = list(Task.select().where(Task.name == "first").order_by(Task.id.desc()))
+        assert len(tasks) == 2
+        imported, original = tasks
+        for field in ["note", "start", "end", "target", "project_id"]:
+            assert getattr(imported, field) == getattr(original, field)
+        tags = TaskToTag.select(TaskToTag.tag_id).where(TaskToTag.task == imported)
+        assert sorted(tag.tag_id for tag in tags) == [2, 3]
+        assert imported.created_at is not None
+        TaskToTag.delete().where(TaskToTag.task > 2).execute()
+        Task.delete().where(Task.id > 2).execute()
+
+
+    def test_new_project(self) -> None:
+        tasks = [{
+            "project": "new",
+            "project_tags": "paid,new tag",
+            "task": "imported",
+            "task_tags": "a",
+            "note": None,
+            "start": "01/02/2020 08:00:00",
+            "end": "01/02/2020 09:00:00",
+            "target": "N/A",
+        }]
+        result = self.invoke_import(["ndjson", "-"], json.dumps(tasks[0]))
+
+        assert result.exit_code == 0
+        project = Project.get(Project.name == "new")
+        links = ProjectToTag.select().where(ProjectToTag.project == project)
+        project_tags = [link.tag.name for link in links]
+        assert sorted(project_tags) == ["new tag", "paid"]
+        assert Tag.select().count() == 4
+        assert Task.get(Task.name == "imported").project_id == project.id
+
+
+    def test_invalid_file(self, tmp_path: Path) -> None:
+        path = tmp_path.joinpath("export.json")
+        path.write_text('[{"project": "work", "task": "incomplete"}]', encoding="utf-8")
+        result = self.invoke_import(["json", str(path)])
+
+        assert result.exit_code == 1
+        assert Task.select().count() == 3
+
+
+    def test_json_pieces(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        # the objects must be decoded, even if they are split between the pieces of the file
+        monkeypatch.setattr(commands, "READ_SIZE", 7)
+        tasks = [{"task": "a, [b]"}, {"task": "c", "note": "}]"}, {"task": "ü" * 20}]
+        file = io.StringIO(json.dumps(tasks, indent=2, ensure_ascii=False))
+
+        assert list(read_tasks_from_json(file)) == tasks
+        assert list(read_tasks_from_json(io.StringIO(" [ ] "))) == []
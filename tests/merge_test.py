@@ -0,0 +1,203 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.attached import ID_OFFSET
+from timetracker.main import app
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Project, ProjectToTag, Tag, Task, TaskText, TaskToTag
+from timetracker.models import db as app_db
+from timetracker.watermark import get_watermark_path
+from typer.testing import CliRunner, Result
+
+
+def create_database(path: Path) -> None:
+    # a second database, which shares the project "work" and the tag "a" with the fixture
+    db = SqliteDatabase(path, pragmas={"foreign_keys": 1})
+    with db.bind_ctx(MODELS):
+        db.create_tables(MODELS)
+        migrate(db)
+        Project.create(name="Default", start=datetime(2020, 1, 1))
+        home = Project.create(name="home", start=datetime(2020, 1, 1))
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        ProjectToTag.create(project=work, tag=Tag.create(name="other"))
+        ProjectToTag.create(project=work, tag=Tag.create(name="paid"))
+        task = Task.create(
+            name="second", start=datetime(2020, 1, 2, 8), end=datetime(2020, 1, 2, 9), project=work
+        )
+        TaskToTag.create(task=task, tag=Tag.create(name="a"))
+        TaskToTag.create(task=task, tag=Tag.create(name="c"))
+        Task.create(
+            name="third", start=datetime(2020, 1, 3, 8), end=datetime(2020, 1, 3, 9), project=home
+        )
+    db.close()
+
+
+class TestMerge:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def invoke_union(self, other_path: Path, args: list[str]) -> Result:
+        # the views, which combine the databases, only exist on the connection of the app
+        with app_db.bind_ctx(MODELS):
+            return self.runner.invoke(app, ["-d", str(self.db_path), "-d", str(other_path), *args])
+
+
+    def test_setup(self) -> None:
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        ProjectToTag.create(project=work, tag=Tag.create(name="paid"))
+        task = Task.create(
+            name="first", start=datetime(2020, 1, 1, 8), end=datetime(2020, 1, 1, 9), project=work
+        )
+        TaskToTag.create(task=task, tag=Tag.create(name="a"))
+
+        assert Task.select().count() == 1
+
+
+    def test_union_export(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        result = self.invoke_union(other_path, ["export", "ndjson", "-o", "-"])
+
+        assert result.exit_code == 0
+        tasks = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [task["task"] for task in tasks] == ["first", "second", "third"]
+        assert [task["id"] > ID_OFFSET for task in tasks] == [False, True, True]
+        # the project is matched by name and its tags are combined
+        assert [task["project"] for task in tasks] == ["work", "work", "home"]
+        assert sorted(tasks[1]["project_tags"].split(",")) == ["other", "paid"]
+        assert sorted(tasks[1]["task_tags"].split(",")) == ["a", "c"]
+
+        result = self.invoke_union(
+            other_path, ["export", "ndjson", "-o", "-", "-p", "work", "-tt", "a", "02/01/2020"]
+        )
+        assert [json.loads(line)["task"] for line in result.stdout.splitlines()] == ["second"]
+
+        result = self.invoke_union(
+            other_path, ["export", "ndjson", "-o", "-", "-tq", "paid AND a AND NOT c"]
+        )
+        assert [json.loads(line)["task"] for line in result.stdout.splitlines()] == ["first"]
+
+
+    def test_union_list(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        result = self.invoke_union(other_path, ["list", "-r"])
+
+        assert result.exit_code == 0
+        assert result.stdout.count("work") == 1
+        assert "home" in result.stdout
+
+
+    def test_union_search(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        # the index of each database is searched on its own
+        result = self.invoke_union(other_path, ["search", "work", "-r"])
+
+        assert result.exit_code == 0
+        ids = [int(line.split(" | ")[0]) for line in result.stdout.splitlines()[1:]]
+        assert sorted(ids) == [1, ID_OFFSET + 1]
+
+        result = self.invoke_union(
+            other_path, ["export", "ndjson", "-o", "-", "-m", "third OR first"]
+        )
+        assert [json.loads(line)["task"] for line in result.stdout.splitlines()] == [
+            "first", "third"
+        ]
+
+
+    def test_union_since_last(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        # the changes of each database are numbered on their own
+        result = self.invoke_union(other_path, ["export", "ndjson", "-o", "-", "--since-last"])
+
+        assert result.exit_code == 1
+        assert not get_watermark_path(self.db_path).exists()
+
+
+    def test_union_read_only(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        result = self.invoke_union(other_path, ["create", "new"])
+
+        assert result.exit_code == 1
+        assert Project.get_or_none(Project.name == "new") is None
+
+        result = self.runner.invoke(
+            app, ["-d", str(self.db_path), "-d", str(tmp_path.joinpath("missing.db")), "list"]
+        )
+        assert result.exit_code == 1
+
+
+    def test_merge(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "merge", str(other_path)])
+
+        assert result.exit_code == 0
+        assert '2 tasks have been merged from "' in result.stdout
+        second = Task.get(Task.name == "second")
+        assert second.project.name == "work"
+        assert sorted(tag.name for tag in Tag.select().join(TaskToTag).where(
+            TaskToTag.task == second
+        )) == ["a", "c"]
+        assert Task.get(Task.name == "third").project.name == "home"
+        work_tags = Tag.select().join(ProjectToTag).join(Project).where(Project.name == "work")
+        assert sorted(tag.name for tag in work_tags) == ["other", "paid"]
+        assert Tag.select().where(Tag.name == "a").count() == 1
+
+        # the tasks, which have already been merged, are skipped
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "merge", str(other_path)])
+        assert "0 tasks have been merged" in result.stdout
+        assert Task.select().count() == 3
+
+
+    def test_merge_since_last(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        # tasks, which haven't been merged yet, but were last changed long before the export
+        other = SqliteDatabase(other_path)
+        with other.bind_ctx(MODELS):
+            TaskText.update(text=TaskText.text.concat(" again")).execute()
+            for model in [Project, Task, TaskToTag, ProjectToTag]:
+                model.update(
+                    created_at=datetime(2020, 1, 1), updated_at=datetime(2020, 1, 1)
+                ).execute()
+        other.close()
+        get_watermark_path(self.db_path).unlink(missing_ok=True)
+        args = ["-d", str(self.db_path), "export", "ndjson", "-o", "-", "--since-last"]
+        self.runner.invoke(app, args)
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "merge", str(other_path)])
+
+        assert "2 tasks have been merged" in result.stdout
+        result = self.runner.invoke(app, args)
+        assert [json.loads(line)["task"] for line in result.stdout.splitlines()] == [
+            "second again", "third again"
+        ]
+        get_watermark_path(self.db_path).unlink()
+
+
+    def test_running_tasks(self, tmp_path: Path) -> None:
+        other_path = tmp_path.joinpath("other.db")
+        create_database(other_path)
+        other = SqliteDatabase(other_path)
+        with other.bind_ctx(MODELS):
+            Task.create(name="running", start=datetime(2020, 1, 4), project=1)
+        other.close()
+        Task.create(name="running here", start=datetime(2020, 1, 4), project=1)
+        count = Task.select().count()
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "merge", str(other_path)])
+
+        assert result.exit_code == 1
+        assert Task.select().count() == count
@@ -229,3 +229,29 @@ class TestProject:
 
         assert result.exit_code == 0
         assert '"work" has been succesfully deleted!' in result.stdout
+
+
+    def test_list_missing_database(self, tmp_path: Path) -> None:
+        db_path = tmp_path.joinpath("missing.db")
+        result_1 = self.runner.invoke(app, ["-d", db_path, "list", "--help"])
+        result_2 = self.runner.invoke(app, ["-d", db_path, "list"])
+
+        assert result_1.exit_code == 0
+        assert result_2.exit_code == 1
+        assert "The database isn't initialized properly!" in result_2.stdout
+        # the reporting commands don't create a database
+        assert not db_path.exists()
+
+
+    def test_list_outdated_database(self, tmp_path: Path) -> None:
+        db_path = tmp_path.joinpath("outdated.db")
+        outdated = SqliteDatabase(db_path)
+        with outdated.bind_ctx(MODELS):
+            outdated.create_tables(MODELS)
+        result = self.runner.invoke(app, ["-d", db_path, "list"])
+
+        assert result.exit_code == 1
+        assert "out of date" in result.stdout
+        # the reporting commands don't upgrade a database
+        assert outdated.pragma("user_version") == 0
+        outdated.close()
@@ -0,0 +1,140 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from peewee import SQL, ModelSelect, SqliteDatabase
+from timetracker.attached import create_union_views, get_schemas
+from timetracker.migrations import LATEST_VERSION, get_version, migrate
+from timetracker.models import MODELS, Tag
+from timetracker.parsers import parse_tag_query
+from timetracker.queries import (
+    get_export_query,
+    get_project_list_query,
+    get_recap_query,
+    get_running_task,
+    get_running_task_query,
+)
+
+DATE_RANGE = (datetime(2020, 1, 1), datetime(2020, 1, 31, 23, 59, 59))
+
+
+def get_query_plan(db: SqliteDatabase, query: ModelSelect) -> list[str]:
+    sql, params = query.sql()
+    return [row[3] for row in db.execute_sql("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+class TestQueryPlan:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase) -> None:
+        self.db_path = db_path
+        self.db = db
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def test_migrations(self) -> None:
+        assert get_version(self.db) == LATEST_VERSION
+        indexes = [index.name for index in self.db.get_indexes("task")]
+        assert "task_start" in indexes
+        assert "task_end" in indexes
+        assert "task_running" in indexes
+        assert "task_updated_at" in indexes
+        columns = [column.name for column in self.db.get_columns("task")]
+        assert columns[-3:] == ["created_at", "updated_at", "change_seq"]
+
+
+    def test_running_task(self) -> None:
+        plan = get_query_plan(self.db, get_running_task_query())
+
+        assert plan == ["SEARCH t1 USING INDEX task_running (end=?)"]
+        assert get_running_task() is None
+
+
+    def test_list(self) -> None:
+        plan = get_query_plan(self.db, get_project_list_query(True))
+
+        assert not any(step.startswith("SCAN t3") for step in plan)
+        assert any("sqlite_autoindex_project_to_tag_1" in step for step in plan)
+
+
+    def test_recap_date_range(self) -> None:
+        plan = get_query_plan(self.db, get_recap_query(DATE_RANGE, None, [], []))
+
+        assert "SEARCH t1 USING INTEGER PRIMARY KEY (rowid=?)" in plan
+        assert any("VIRTUAL TABLE INDEX" in step for step in plan)
+        assert not any(step.startswith("SCAN t1") for step in plan)
+
+
+    def test_recap_project(self) -> None:
+        plan = get_query_plan(self.db, get_recap_query(None, "Default", [], []))
+
+        assert "SEARCH t2 USING COVERING INDEX project_name (name=?)" in plan
+        assert "SEARCH t1 USING INDEX task_project_id (project_id=?)" in plan
+
+
+    def test_recap_tags(self) -> None:
+        plan = get_query_plan(self.db, get_recap_query(None, None, ["a"], ["b"]))
+
+        assert any("USING COVERING INDEX task_to_tag_tag_id_task_id" in step for step in plan)
+        assert any(
+            "USING COVERING INDEX project_to_tag_tag_id_project_id" in step for step in plan
+        )
+
+
+    def test_recap_tag_paths(self) -> None:
+        plan = get_query_plan(self.db, get_recap_query(None, None, ["client/acme"], []))
+
+        # the tags below the given one are found by a range scan instead of comparing every tag
+        assert any("USING COVERING INDEX tag_name (name=?)" in step for step in plan)
+        assert any("USING COVERING INDEX tag_name (name>? AND name<?)" in step for step in plan)
+
+
+    def test_recap_tag_query(self) -> None:
+        clauses = parse_tag_query("a AND b AND NOT c")
+        plan = get_query_plan(self.db, get_recap_query(None, None, [], [], tag_query=clauses))
+
+        # the tasks of one tag are read from the index, the other tags are looked up for each
+        assert any("USING PRIMARY KEY (tag_id=?)" in step for step in plan)
+        assert any("USING PRIMARY KEY (tag_id=? AND task_id=?)" in step for step in plan)
+
+
+    def test_export(self) -> None:
+        plan = get_query_plan(self.db, get_export_query())
+
+        # the export includes every task, so only the task table itself may be scanned
+        assert [step for step in plan if step.startswith("SCAN")] == [
+            "SCAN t1 USING INDEX task_start"
+        ]
+        # the tags must be aggregated per task, without grouping or sorting all the rows
+        assert not any(step.startswith("USE TEMP B-TREE") for step in plan)
+
+
+    def test_filtered_export(self) -> None:
+        plan = get_query_plan(self.db, get_export_query(DATE_RANGE, "Default", ["a"], []))
+
+        assert any("VIRTUAL TABLE INDEX" in step for step in plan)
+        assert "SEARCH t2 USING COVERING INDEX project_name (name=?)" in plan
+        assert any("USING COVERING INDEX task_to_tag_tag_id_task_id" in step for step in plan)
+
+
+    def test_unused_tags(self) -> None:
+        sql, params = Tag.delete().where(Tag.reference_count == SQL("0")).sql()
+        plan = [row[3] for row in self.db.execute_sql("EXPLAIN QUERY PLAN " + sql, params)]
+
+        # the other steps are the foreign key checks of the deleted tags
+        assert plan[0] == "SEARCH tag USING COVERING INDEX tag_unused (reference_count=?)"
+
+
+    def test_union_recap(self) -> None:
+        # the database is attached to itself, its views are dropped with the connection
+        union_db = SqliteDatabase(self.db_path)
+        union_db.execute_sql("ATTACH DATABASE ? AS db1", (str(self.db_path),))
+        create_union_views(union_db, get_schemas(2))
+        with union_db.bind_ctx(MODELS):
+            plan = get_query_plan(union_db, get_recap_query(DATE_RANGE, None, [], []))
+        union_db.close()
+
+        # the date range is pushed down into the R*Tree and the task table of both databases
+        assert sum("VIRTUAL TABLE INDEX" in step for step in plan) == 2
+        assert sum("USING INDEX task_end (end>?)" in step for step in plan) == 2
@@ -0,0 +1,145 @@
+import asyncio
+import gc
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Task, init_db
+from timetracker.models import db as app_db
+from timetracker.queries import (
+    get_page_keys,
+    get_page_query,
+    get_recap_query,
+    get_rollup_section_summary,
+    get_section_summary,
+)
+from timetracker.settings import load_settings
+from timetracker.tui import RecapDisplay, RecapTable
+
+DAY = (datetime(2020, 1, 2), datetime(2020, 1, 2, 23, 59, 59, 999999))
+
+
+def get_task_names(date_range: tuple[datetime, datetime]) -> list[str]:
+    return [task.name for task in get_recap_query(date_range, None, [], [])]
+
+
+class TestRecap:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase) -> None:
+        self.db_path = db_path
+        self.db = db
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def test_setup(self) -> None:
+        tasks = [
+            ("before", datetime(2020, 1, 1, 8), datetime(2020, 1, 1, 9)),
+            ("into", datetime(2020, 1, 1, 22), datetime(2020, 1, 2, 2)),
+            ("inside", datetime(2020, 1, 2, 8), datetime(2020, 1, 2, 9)),
+            ("span", datetime(2020, 1, 1, 8), datetime(2020, 1, 3, 9)),
+            ("out of", datetime(2020, 1, 2, 22), datetime(2020, 1, 3, 2)),
+            ("after", datetime(2020, 1, 3, 8), datetime(2020, 1, 3, 9)),
+            ("running", datetime(2020, 1, 2, 10), None),
+        ]
+        for name, start, end in tasks:
+            Task.create(name=name, start=start, end=end, project=1)
+
+        assert Task.select().count() == 7
+
+
+    def test_overlapping_tasks(self) -> None:
+        assert get_task_names(DAY) == ["span", "into", "inside", "out of"]
+
+
+    def test_boundaries(self) -> None:
+        assert get_task_names((datetime(2020, 1, 1, 9), datetime(2020, 1, 1, 9))) == [
+            "before",
+            "span",
+        ]
+        assert get_task_names((datetime(2020, 1, 3, 2, 0, 1), datetime(2020, 1, 3, 7))) == [
+            "span"
+        ]
+
+
+    def test_index_follows_updates(self) -> None:
+        Task.update(end=datetime(2020, 1, 2, 12)).where(Task.name == "running").execute()
+        Task.update(start=datetime(2020, 1, 1, 10)).where(Task.name == "inside").execute()
+        Task.update(end=datetime(2020, 1, 1, 11)).where(Task.name == "inside").execute()
+        Task.delete().where(Task.name == "span").execute()
+
+        assert get_task_names(DAY) == ["into", "running", "out of"]
+
+
+    def test_pages(self) -> None:
+        # a task with the same start as another one must neither be skipped nor repeated
+        Task.create(
+            name="tie", start=datetime(2020, 1, 1, 8), end=datetime(2020, 1, 1, 9), project=1
+        )
+        query = get_recap_query(None, None, [], [])
+
+        names = []
+        after = None
+        while tasks := list(get_page_query(query, after, 2)):
+            names.extend(task.name for task in tasks)
+            after = (tasks[-1].start, tasks[-1].id_)
+
+        assert names == ["before", "tie", "inside", "into", "running", "out of", "after"]
+        assert get_page_keys(query, None, 4, 2) == [
+            (datetime(2020, 1, 1, 8), 8),
+            (datetime(2020, 1, 1, 22), 2),
+            (datetime(2020, 1, 2, 22), 5),
+        ]
+        assert get_page_keys(query, (datetime(2020, 1, 1, 8), 8), 1, 2) == [
+            (datetime(2020, 1, 1, 22), 2)
+        ]
+
+
+    def test_section_summary(self) -> None:
+        query = get_recap_query(None, None, [], [])
+        days = [("2020-01-01", 4, 7 * 3600), ("2020-01-02", 2, 6 * 3600), ("2020-01-03", 1, 3600)]
+
+        assert list(get_section_summary(query, "days")) == days
+        assert list(get_rollup_section_summary(None, "days", None, ZoneInfo("UTC"))) == days
+        assert list(get_section_summary(query, "weeks")) == [("2019-12-30", 7, 14 * 3600)]
+        assert list(get_section_summary(query, "none")) == [(None, 7, 14 * 3600)]
+        assert list(get_section_summary(get_recap_query(DAY, None, [], []), "months")) == [
+            ("2020-01", 3, 10 * 3600)
+        ]
+        assert list(get_rollup_section_summary(None, "none", DAY, ZoneInfo("UTC"))) == list(
+            get_section_summary(get_recap_query(DAY, None, [], []), "none")
+        )
+
+
+    def test_subtotals(self) -> None:
+        settings = load_settings().model_copy(update={"show_total": True, "sections": "days"})
+        app = RecapDisplay(get_recap_query(None, None, [], []), settings, False)
+
+        async def render() -> list[str]:
+            async with app.run_test(size=(120, 20)) as pilot:
+                table = app.query_one(RecapTable)
+                while table.row_count is None or 0 not in table.pages:
+                    await pilot.pause(0.01)
+                return [table.render_line(y).text for y in range(12)]
+
+        # the display opens its own connections to the database
+        init_db(self.db_path, readonly=True)
+        with app_db.bind_ctx(MODELS):
+            lines = asyncio.run(render())
+        # the statements of the worker threads are only finalized by the garbage collector, until
+        # then their closed connections keep the database locked for the next module
+        gc.collect()
+
+        assert ["before" in line for line in lines[1:5]] == [True, False, False, False]
+        assert "2020-01-01" in lines[5]
+        assert "07:00:00" in lines[5]
+        assert "2020-01-02" in lines[8]
+        assert "06:00:00" in lines[8]
+        assert "2020-01-03" in lines[10]
+        assert "01:00:00" in lines[10]
+        assert "total" in lines[11]
+        assert "14:00:00" in lines[11]
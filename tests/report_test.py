@@ -0,0 +1,156 @@
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.main import app
+from timetracker.migrations import migrate, rebuild_task_rollup, set_utc_offsets
+from timetracker.models import MODELS, Project, ProjectToTag, Tag, Task, TaskToTag
+from timetracker.queries import get_report_query
+from timetracker.time_utils import get_utc_offsets
+from typer.testing import CliRunner
+
+UTC = ZoneInfo("UTC")
+
+
+def get_report(groups: list[str], project_name: str | None = None) -> list[tuple]:
+    return list(get_report_query(groups, None, project_name, [], [], UTC))
+
+
+class TestReport:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def test_setup(self) -> None:
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        a, b = Tag.create(name="a"), Tag.create(name="b")
+        tasks = [
+            ("mail", datetime(2020, 1, 1, 8), datetime(2020, 1, 1, 9), 1, [a]),
+            ("code", datetime(2020, 1, 1, 23, 30), datetime(2020, 1, 2, 1), work, [a, b]),
+            ("code", datetime(2020, 1, 6, 8), datetime(2020, 1, 6, 10), work, []),
+            ("mail", datetime(2020, 2, 3, 8), datetime(2020, 2, 3, 8, 30), work, [b]),
+            ("running", datetime(2020, 2, 4, 8), None, 1, [a]),
+        ]
+        for name, start, end, project, tags in tasks:
+            task = Task.create(name=name, start=start, end=end, project=project)
+            for tag in tags:
+                TaskToTag.create(task=task, tag=tag)
+
+        assert Task.select().count() == 5
+
+
+    def test_groups(self) -> None:
+        assert get_report(["project"]) == [("Default", 1, 3600), ("work", 3, 4 * 3600)]
+        assert get_report(["task", "project"]) == [
+            ("code", "work", 2, 3.5 * 3600),
+            ("mail", "Default", 1, 3600),
+            ("mail", "work", 1, 1800),
+        ]
+        # a task counts towards each of its tags
+        assert get_report(["tag"]) == [(None, 1, 2 * 3600), ("a", 2, 2.5 * 3600), ("b", 2, 7200)]
+
+
+    def test_periods(self) -> None:
+        assert get_report(["week"]) == [
+            ("2019-12-30", 2, 2.5 * 3600), ("2020-01-06", 1, 7200), ("2020-02-03", 1, 1800)
+        ]
+        assert get_report(["month", "project"], "work") == [
+            ("2020-01", "work", 2, 3.5 * 3600), ("2020-02", "work", 1, 1800)
+        ]
+        assert get_report(["day", "tag"]) == [
+            ("2020-01-01", "a", 2, 2.5 * 3600),
+            ("2020-01-01", "b", 1, 1.5 * 3600),
+            ("2020-01-06", None, 1, 7200),
+            ("2020-02-03", "b", 1, 1800),
+        ]
+
+
+    def test_project_tags(self) -> None:
+        # the tasks of a project count towards its tags as well, but only once towards each tag
+        link = ProjectToTag.create(project=Project.get(Project.name == "work"), tag=2)
+        assert get_report(["tag"]) == [("a", 2, 2.5 * 3600), ("b", 3, 4 * 3600)]
+        assert list(get_report_query(["tag"], None, None, [], ["b"], UTC)) == [
+            ("a", 1, 1.5 * 3600), ("b", 3, 4 * 3600)
+        ]
+        link.delete_instance()
+
+
+    def test_local_days(self) -> None:
+        set_utc_offsets(self.db, get_utc_offsets(ZoneInfo("Europe/Zurich")))
+        rebuild_task_rollup(self.db)
+
+        # the rollup and the tasks agree on the day of the task, which starts before midnight
+        days = [("2020-01-01", 1, 3600), ("2020-01-02", 1, 1.5 * 3600)]
+        assert get_report(["day"])[:2] == days
+        assert get_report(["day", "task"])[:2] == [
+            ("2020-01-01", "mail", 1, 3600), ("2020-01-02", "code", 1, 1.5 * 3600)
+        ]
+
+        set_utc_offsets(self.db, get_utc_offsets(ZoneInfo("UTC")))
+        rebuild_task_rollup(self.db)
+
+
+    def test_filters(self) -> None:
+        date_range = (datetime(2020, 1, 1), datetime(2020, 1, 31, 23, 59, 59))
+        assert list(get_report_query(["project"], date_range, None, ["b"], [], UTC)) == [
+            ("work", 1, 1.5 * 3600)
+        ]
+
+
+    def test_date_ranges(self) -> None:
+        # the whole days are added up from the rollup, the tasks at the edges of the date range
+        # count with their whole duration, like in the recap
+        month = (datetime(2020, 1, 1), datetime(2020, 1, 31, 23, 59, 59, 999999))
+        assert list(get_report_query(["project"], month, None, [], [], UTC)) == [
+            ("Default", 1, 3600), ("work", 2, 3.5 * 3600)
+        ]
+        edges = (datetime(2020, 1, 1, 12), datetime(2020, 1, 6, 9))
+        assert list(get_report_query(["project"], edges, None, [], [], UTC)) == [
+            ("work", 2, 3.5 * 3600)
+        ]
+        # a task, which has started the day before, counts towards its own day
+        days = (datetime(2020, 1, 2), datetime(2020, 1, 6, 23, 59, 59, 999999))
+        totals = [("2020-01-01", 1, 1.5 * 3600), ("2020-01-06", 1, 7200)]
+        assert list(get_report_query(["day"], days, None, [], [], UTC)) == totals
+        assert list(get_report_query(["day"], days, "Default", [], [], UTC)) == []
+        # without a whole day, all tasks are added up from the tasks themselves
+        part = (datetime(2020, 1, 1, 12), datetime(2020, 1, 1, 23, 59, 59))
+        assert list(get_report_query(["month"], part, None, [], [], UTC)) == [
+            ("2020-01", 1, 1.5 * 3600)
+        ]
+
+        zurich = ZoneInfo("Europe/Zurich")
+        set_utc_offsets(self.db, get_utc_offsets(zurich))
+        rebuild_task_rollup(self.db)
+        # the first local day of the date range only starts at 1 am, so it's one of the edges
+        totals = [("2020-01-02", 1, 1.5 * 3600), ("2020-01-06", 1, 7200)]
+        assert list(get_report_query(["day"], days, None, [], [], zurich)) == totals
+
+        set_utc_offsets(self.db, get_utc_offsets(UTC))
+        rebuild_task_rollup(self.db)
+
+
+    def test_report_command(self) -> None:
+        result = self.runner.invoke(
+            app, ["-d", str(self.db_path), "report", "-b", "month", "-b", "project", "-r"]
+        )
+
+        assert result.exit_code == 0
+        assert result.stdout.splitlines() == [
+            "Month | Project | Tasks | Duration",
+            "2020-01 | Default | 1 | 01:00:00",
+            "2020-01 | work | 2 | 03:30:00",
+            "2020-02 | work | 1 | 00:30:00",
+        ]
+
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "report", "-p", "missing"])
+        assert result.exit_code == 0
+        assert "No tasks found!" in result.stdout
@@ -0,0 +1,211 @@
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.main import app
+from timetracker.migrations import (
+    MIGRATIONS,
+    add_change_sequence,
+    intern_task_texts,
+    migrate,
+    rebuild_task_rollup,
+    remove_rollup_tags,
+    set_utc_offsets,
+    store_epoch_seconds,
+)
+from timetracker.models import MODELS, Project, Tag, Task, TaskText, TaskToTag
+from timetracker.time_utils import get_utc_offsets
+from typer.testing import CliRunner
+
+
+def create_legacy_database(until: Callable[[SqliteDatabase], None]) -> SqliteDatabase:
+    # a database with the task table of the first version, which has been upgraded up to the
+    # given migration
+    legacy = SqliteDatabase(":memory:")
+    with legacy.bind_ctx(MODELS):
+        legacy.create_tables(MODELS)
+    legacy.execute_sql('DROP TABLE "task"')
+    legacy.execute_sql(
+        'CREATE TABLE "task" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+        '"note" VARCHAR(255), "start" DATETIME NOT NULL, "end" DATETIME, "target" DATETIME, '
+        '"project_id" INTEGER NOT NULL, FOREIGN KEY ("project_id") REFERENCES "project" ("id"))'
+    )
+    legacy.execute_sql('CREATE INDEX "task_project_id" ON "task" ("project_id")')
+    for migration in MIGRATIONS[:MIGRATIONS.index(until)]:
+        migration(legacy)
+
+    # the datetimes are stored as seconds from the migration onwards
+    if MIGRATIONS.index(until) > MIGRATIONS.index(store_epoch_seconds):
+        project_start, running = 1577750400, 1577952000
+        first = (1577865600, 1577869200, 1577872800)
+    else:
+        project_start = "2019-12-31 00:00:00"
+        first = ("2020-01-01 08:00:00.5", "2020-01-01 09:00:00", "2020-01-01 10:00:00")
+        running = "2020-01-02 08:00:00"
+    legacy.execute_sql(
+        'INSERT INTO "project" ("name", "start") VALUES (?, ?)', ("Default", project_start)
+    )
+    legacy.execute_sql(
+        'INSERT INTO "task" ("name", "note", "start", "end", "target", "project_id") '
+        "VALUES (?, ?, ?, ?, ?, 1), (?, NULL, ?, NULL, NULL, 1)",
+        ("first", "meeting", *first, "running", running),
+    )
+    return legacy
+
+
+class TestRollup:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def get_rollup(self) -> list[tuple[str, int, int, int]]:
+        # rows, whose tasks have all been removed again, are only dropped by a rebuild
+        return list(self.db.execute_sql(
+            'SELECT * FROM "task_rollup" WHERE "count" != 0 ORDER BY "day", "project_id"'
+        ))
+
+
+    def test_setup(self) -> None:
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        a, b = Tag.create(name="a"), Tag.create(name="b")
+        first = Task.create(
+            name="first", start=datetime(2020, 1, 1, 8), end=datetime(2020, 1, 1, 9), project=work
+        )
+        TaskToTag.create(task=first, tag=a)
+        TaskToTag.create(task=first, tag=b)
+        # the second task starts on the 2nd of January in Zurich
+        second = Task.create(
+            name="second", start=datetime(2020, 1, 1, 23, 30), end=datetime(2020, 1, 2), project=1
+        )
+        TaskToTag.create(task=second, tag=a)
+
+        # the tags of the tasks don't add any rows
+        assert self.get_rollup() == [
+            ("2020-01-01", 1, 1800 * 1000, 1), ("2020-01-01", work.id, 3600 * 1000, 1)
+        ]
+
+
+    def test_local_days(self) -> None:
+        set_utc_offsets(self.db, get_utc_offsets(ZoneInfo("Europe/Zurich")))
+        rebuild_task_rollup(self.db)
+
+        days = [(day, project_id) for day, project_id, *_ in self.get_rollup()]
+        assert days == [("2020-01-01", 2), ("2020-01-02", 1)]
+
+
+    def test_triggers(self) -> None:
+        # running, stopped, edited, moved and deleted tasks
+        running = Task.create(name="running", start=datetime(2020, 1, 3, 8), project=1)
+        rollup = self.get_rollup()
+        running.end = datetime(2020, 1, 3, 12)
+        running.save()
+        assert len(self.get_rollup()) == len(rollup) + 1
+
+        first = Task.get(Task.name == "first")
+        first.start, first.end = datetime(2020, 1, 3, 7), datetime(2020, 1, 3, 7, 30)
+        first.project = 1
+        first.save()
+        Project.get(Project.name == "work").delete_instance(True)
+        rollup = self.get_rollup()
+
+        rebuild_task_rollup(self.db)
+        assert rollup == self.get_rollup()
+
+
+    def test_rollup_command(self) -> None:
+        self.db.execute_sql('DELETE FROM "task_rollup"')
+        result = self.runner.invoke(app, ["-d", self.db_path, "rollup"])
+
+        assert result.exit_code == 0
+        assert "The daily totals have been rebuilt" in result.stdout
+        totals = self.db.execute_sql('SELECT SUM("count"), SUM("milliseconds") FROM "task_rollup"')
+        assert totals.fetchone() == (3, 5 * 3600 * 1000)
+
+
+    def test_epoch_seconds(self) -> None:
+        legacy = create_legacy_database(store_epoch_seconds)
+        updated_at = legacy.execute_sql('SELECT "updated_at" FROM "task"').fetchall()
+
+        store_epoch_seconds(legacy)
+
+        # the half second of the first start is rounded down
+        assert list(legacy.execute_sql('SELECT "start", "end", "target" FROM "task"')) == [
+            (1577865600, 1577869200, 1577872800), (1577952000, None, None)
+        ]
+        assert legacy.execute_sql('SELECT "updated_at" FROM "task"').fetchall() == updated_at
+        assert legacy.execute_sql('SELECT "start" FROM "project"').fetchone() == (1577750400,)
+        assert legacy.execute_sql('SELECT COUNT(*) FROM "task_interval"').fetchone() == (1,)
+        legacy.close()
+
+
+    def test_interned_texts(self) -> None:
+        legacy = create_legacy_database(intern_task_texts)
+        updated_at = legacy.execute_sql('SELECT "updated_at" FROM "task"').fetchall()
+
+        intern_task_texts(legacy)
+
+        columns = [column.name for column in legacy.get_columns("task")]
+        assert "name" not in columns
+        assert "note" not in columns
+        assert legacy.execute_sql('SELECT "updated_at" FROM "task"').fetchall() == updated_at
+        # the models include the columns of the later migrations
+        add_change_sequence(legacy)
+        with legacy.bind_ctx(MODELS):
+            first, running = Task.select().order_by(Task.id)
+            assert (first.name, first.note) == ("first", "meeting")
+            assert first.start == datetime(2020, 1, 1, 8)
+            assert (running.name, running.note) == ("running", None)
+            assert TaskText.select().count() == 3
+
+            running.end = datetime(2020, 1, 2, 9)
+            running.save()
+            assert list(legacy.execute_sql('SELECT * FROM "task_rollup"')) == [
+                ("2020-01-01", 1, 3600 * 1000, 1), ("2020-01-02", 1, 3600 * 1000, 1)
+            ]
+            assert legacy.execute_sql('SELECT COUNT(*) FROM "task_interval"').fetchone() == (2,)
+            assert legacy.execute_sql('SELECT "updated_at" FROM "task"').fetchall() != updated_at
+        legacy.close()
+
+
+    def test_removed_tags(self) -> None:
+        legacy = create_legacy_database(intern_task_texts)
+        for migration in MIGRATIONS[
+            MIGRATIONS.index(intern_task_texts):MIGRATIONS.index(remove_rollup_tags)
+        ]:
+            migration(legacy)
+        # the rollup of earlier versions, which also kept the totals of each task tag
+        legacy.execute_sql('DROP TABLE "task_rollup"')
+        legacy.execute_sql(
+            'CREATE TABLE "task_rollup" ("day" TEXT NOT NULL, "project_id" INTEGER NOT NULL, '
+            '"tag_id" INTEGER NOT NULL, "milliseconds" INTEGER NOT NULL, '
+            '"count" INTEGER NOT NULL, PRIMARY KEY ("day", "project_id", "tag_id")) WITHOUT ROWID'
+        )
+        legacy.execute_sql(
+            'CREATE TRIGGER "task_to_tag_rollup_insert" AFTER INSERT ON "task_to_tag" '
+            'BEGIN SELECT 1; END'
+        )
+
+        remove_rollup_tags(legacy)
+
+        columns = [column.name for column in legacy.get_columns("task_rollup")]
+        assert columns == ["day", "project_id", "milliseconds", "count"]
+        assert list(legacy.execute_sql('SELECT * FROM "task_rollup"')) == [
+            ("2020-01-01", 1, 3600 * 1000, 1)
+        ]
+        triggers = legacy.execute_sql(
+            "SELECT \"name\" FROM \"sqlite_master\" WHERE \"type\" = 'trigger' "
+            "AND \"name\" LIKE '%rollup%' ORDER BY \"name\""
+        )
+        assert [name for name, in triggers] == [
+            "task_rollup_delete", "task_rollup_insert", "task_rollup_update"
+        ]
+        legacy.close()
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from peewee import SqliteDatabase
+from timetracker.main import app
+from timetracker.migrations import migrate
+from timetracker.models import MODELS, Project, Task
+from timetracker.queries import get_recap_query, get_search_query
+from typer.testing import CliRunner
+
+
+def search(match: str, limit: int = 10) -> list[int]:
+    return [task.id_ for task in get_search_query(match, limit)]
+
+
+class TestSearch:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+        with self.db.bind_ctx(MODELS):
+            migrate(self.db)
+            yield
+
+
+    def test_setup(self) -> None:
+        work = Project.create(name="work", start=datetime(2020, 1, 1))
+        tasks = [
+            ("code review", "ticket 1234", datetime(2020, 1, 1, 8), datetime(2020, 1, 1, 9), work),
+            ("mail", None, datetime(2020, 1, 2, 8), datetime(2020, 1, 2, 9), 1),
+            ("Café", "review of the menu", datetime(2020, 1, 3, 8), datetime(2020, 1, 3, 9), 1),
+            ("reviewing", None, datetime(2020, 1, 4, 8), None, work),
+        ]
+        for name, note, start, end, project in tasks:
+            Task.create(name=name, note=note, start=start, end=end, project=project)
+
+        assert Task.select().count() == 4
+
+
+    def test_ranking(self) -> None:
+        # matches in the name rank before those in the note
+        assert search("review") == [1, 3]
+        assert search("review*") == [4, 1, 3]
+        assert search("review*", 1) == [4]
+        assert sorted(search('"code review" OR mail')) == [1, 2]
+        assert search("note:review") == [3]
+        # the project names are indexed as well, diacritics are ignored
+        assert search("work NOT review") == [4]
+        assert search("cafe") == [3]
+
+
+    def test_changes(self) -> None:
+        Task.update(project=1).where(Task.id == 4).execute()
+        assert search("work") == [1]
+
+        Project.update(name="job").where(Project.name == "work").execute()
+        assert search("job") == [1]
+        assert search("work") == []
+
+        task = Task.get_by_id(2)
+        task.note = "urgent"
+        task.save()
+        assert search("urgent") == [2]
+
+        task.delete_instance()
+        assert search("urgent OR mail") == []
+        # a contentless index raises an error, if it's been given the wrong texts to delete
+        self.db.execute_sql(
+            """INSERT INTO "task_search" ("task_search") VALUES ('integrity-check')"""
+        )
+
+
+    def test_match_filter(self) -> None:
+        # the finished tasks in the order of the recap, not by rank
+        assert [task.id_ for task in get_recap_query(None, None, [], [], "review*")] == [1, 3]
+
+        result = self.runner.invoke(
+            app, ["-d", str(self.db_path), "export", "ndjson", "-o", "-", "-m", "review*"]
+        )
+        assert result.exit_code == 0
+        assert [json.loads(line)["task"] for line in result.stdout.splitlines()] == [
+            "code review", "Café"
+        ]
+
+
+    def test_search_command(self) -> None:
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "search", "review*", "-r"])
+
+        assert result.exit_code == 0
+        lines = result.stdout.splitlines()
+        assert lines[0] == "ID | Project | Task | Note | Start | Duration"
+        assert [line.split(" | ")[:4] for line in lines[1:]] == [
+            ["4", "Default", "reviewing", "-"],
+            ["1", "job", "code review", "ticket 1234"],
+            ["3", "Default", "Café", "review of the menu"],
+        ]
+        assert lines[1].endswith(" | -")
+        assert lines[2].endswith(" | 01:00:00")
+
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "search", "missing"])
+        assert result.exit_code == 0
+        assert "No tasks found!" in result.stdout
+
+        result = self.runner.invoke(app, ["-d", str(self.db_path), "search", "review AND ("])
+        assert result.exit_code == 1
+        assert "The search query is invalid" in result.stdout
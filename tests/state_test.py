@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+from freezegun import freeze_time
+from peewee import SqliteDatabase
+from timetracker.main import app
+from timetracker.prompt import main as prompt
+from timetracker.state import get_state_path, is_state_fresh, read_state
+from typer.testing import CliRunner
+
+
+class TestState:
+    @pytest.fixture(autouse=True)
+    def _requests(self, db_path: Path, db: SqliteDatabase, runner: CliRunner) -> None:
+        self.db_path = db_path
+        self.db = db
+        self.runner = runner
+
+
+    @freeze_time("2020-01-01 12:00:00")
+    def test_start_writes_state(self) -> None:
+        get_state_path(self.db_path).unlink(missing_ok=True)
+        result = self.runner.invoke(
+            app, ["-d", self.db_path, "start", "programming", "Default", "-f", "1:30"]
+        )
+
+        assert result.exit_code == 0
+        assert is_state_fresh(self.db_path)
+        state = read_state(self.db_path)
+        assert state["name"] == "programming"
+        assert state["project"] == "Default"
+        assert state["start"].isoformat() == "2020-01-01T12:00:00"
+        assert state["target"].isoformat() == "2020-01-01T13:30:00"
+
+
+    @freeze_time("2020-01-01 12:30:00")
+    def test_prompt_reads_state(self, capsys: pytest.CaptureFixture) -> None:
+        prompt(["-d", str(self.db_path)])
+
+        output = capsys.readouterr().out
+        assert "Default > programming" in output
+        assert "running for 00:30:00 and the target is reached in 01:00:00" in output
+
+
+    @freeze_time("2020-01-01 12:45:00")
+    def test_edit_updates_state(self, capsys: pytest.CaptureFixture) -> None:
+        result = self.runner.invoke(app, ["-d", self.db_path, "edit", "t", "1", "name", "writing"])
+        prompt(["-d", str(self.db_path)])
+
+        assert result.exit_code == 0
+        assert read_state(self.db_path)["name"] == "writing"
+        assert "Default > writing" in capsys.readouterr().out
+
+
+    def test_prompt_falls_back_to_database(self, capsys: pytest.CaptureFixture) -> None:
+        get_state_path(self.db_path).unlink()
+        prompt(["-d", str(self.db_path)])
+
+        assert is_state_fresh(self.db_path)
+        assert "Default > writing" in capsys.readouterr().out
+
+
+    def test_stop_clears_state(self, capsys: pytest.CaptureFixture) -> None:
+        result = self.runner.invoke(app, ["-d", self.db_path, "stop"])
+
+        assert result.exit_code == 0
+        assert read_state(self.db_path) is None
+        with pytest.raises(SystemExit):
+            prompt(["-d", str(self.db_path)])
+        assert "There's currently no task running!" in capsys.readouterr().out
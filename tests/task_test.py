@@ -4,7 +4,7 @@ import pytest
 from freezegun import freeze_time
 from peewee import OperationalError, SqliteDatabase
 from timetracker.main import app
-from timetracker.models import MODELS, Project, Task
+from timetracker.models import MODELS, Project, Tag, Task, TaskToTag
 from typer.testing import CliRunner
 
 
@@ -73,13 +73,20 @@ class TestTask:
     @freeze_time("2020-01-01 12:03:00")
     def test_start_task(self) -> None:
         result = self.runner.invoke(
-            app, ["-d", self.db_path, "start", "programming", "work", "-t", "testing"]
+            app,
+            ["-d", self.db_path, "start", "programming", "work", "-t", "testing, fun, testing"],
         )
 
         try:
-            with self.db:
+            with self.db.bind_ctx(MODELS):
                 assert Project.select().count() == 3
                 assert Task.select().count() == 1
+                # the existing tag is reused and the duplicate is only linked once
+                assert Tag.select().where(Tag.name == "fun").count() == 1
+                assert sorted(tag.name for tag in Tag.select().join(TaskToTag)) == [
+                    "fun",
+                    "testing",
+                ]
         except OperationalError:  # can occur when a table doesn't exist
             print("The database isn't initialized properly!")
 
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from timetracker.time_utils import (
+    DatetimeFormatter,
+    DatetimeParser,
+    DurationFormatter,
+    OffsetSpans,
+    format_seconds,
+    get_utc_offsets,
+    to_aware_string,
+)
+
+TEMPLATES = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y",
+    "%H:%M",
+    "%Y-%m-%dT%H:%M:%S%z %Z",
+    "%%S %S%%",
+    "%d.%m. %I:%M %p",
+    "%-S.%f",
+]
+# templates, which contain the whole datetime up to the second
+PARSER_TEMPLATES = ["%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S%z", "%c"]
+
+
+def get_datetimes(start: datetime, end: datetime, step: timedelta) -> list[datetime]:
+    datetimes = []
+    while start < end:
+        datetimes.append(start)
+        start += step
+    return datetimes
+
+
+class TestTimeUtils:
+    @pytest.mark.parametrize("tz", ["Europe/Zurich", "Australia/Lord_Howe", "America/St_Johns"])
+    @pytest.mark.parametrize("template", TEMPLATES)
+    def test_datetime_formatter(self, tz: str, template: str) -> None:
+        # throughout a year, which includes two transitions, at varying minutes and seconds
+        datetimes = get_datetimes(
+            datetime(2020, 1, 1), datetime(2021, 1, 1), timedelta(minutes=53, seconds=13)
+        )
+        formatter = DatetimeFormatter(ZoneInfo(tz), template)
+
+        assert formatter.format_column(datetimes) == [
+            to_aware_string(dt, ZoneInfo(tz), template) for dt in datetimes
+        ]
+        assert formatter.format_datetime(None) == "N/A"
+
+
+    def test_out_of_order(self) -> None:
+        tz = ZoneInfo("Europe/Zurich")
+        datetimes = [datetime(2020, 7, 1), datetime(2019, 1, 1), datetime(2020, 3, 29, 0, 59, 59)]
+        datetimes += [datetime(2020, 3, 29, 1), datetime(2010, 10, 31, 0, 59, 59, 999999)]
+
+        assert DatetimeFormatter(tz).format_column(datetimes) == [
+            to_aware_string(dt, tz) for dt in datetimes
+        ]
+
+
+    def test_offset_spans(self) -> None:
+        spans = OffsetSpans(ZoneInfo("Europe/Zurich"))
+        spans.get_offset(datetime(2020, 6, 1))
+
+        # the summer time of 2020 lasted from 29/03 01:00 UTC to 25/10 01:00 UTC
+        assert len(spans.spans) == 1
+        start, end, offset = spans.spans[0]
+        assert start == datetime(2020, 3, 29, 1)
+        assert end == datetime(2020, 10, 25, 1)
+        assert offset.utcoffset(None) == timedelta(hours=2)
+
+        spans.get_offset(datetime(2020, 4, 1))
+        assert len(spans.spans) == 1
+        assert spans.get_offset(datetime(2020, 10, 25, 1)).utcoffset(None) == timedelta(hours=1)
+        assert len(spans.spans) == 2
+
+
+    @pytest.mark.parametrize("tz", ["Europe/Zurich", "Australia/Lord_Howe", "America/St_Johns"])
+    def test_utc_offsets(self, tz: str) -> None:
+        offsets = get_utc_offsets(ZoneInfo(tz))
+        datetimes = get_datetimes(
+            datetime(1970, 1, 1), datetime(2100, 1, 1), timedelta(days=3, minutes=53, seconds=13)
+        )
+
+        # the offset of a datetime is the one of the last transition before it
+        i = 0
+        for dt in datetimes:
+            while i + 1 < len(offsets) and offsets[i + 1][0] <= dt:
+                i += 1
+            expected = dt.replace(tzinfo=ZoneInfo("UTC")).astimezone(ZoneInfo(tz)).utcoffset()
+            assert offsets[i][1] == expected.total_seconds()
+
+
+    def test_duration_formatter(self) -> None:
+        durations = [0, 59.5, 3600, 3600, 90061, 40000000, -3600]
+
+        assert DurationFormatter().format_column(durations) == [
+            format_seconds(duration) for duration in durations
+        ]
+
+
+    @pytest.mark.parametrize("tz", ["Europe/Zurich", "Australia/Lord_Howe", "America/St_Johns"])
+    @pytest.mark.parametrize("template", PARSER_TEMPLATES)
+    def test_datetime_parser(self, tz: str, template: str) -> None:
+        datetimes = get_datetimes(
+            datetime(2020, 1, 1), datetime(2021, 1, 1), timedelta(minutes=53, seconds=13)
+        )
+        formatter = DatetimeFormatter(ZoneInfo(tz), template)
+        parser = DatetimeParser(ZoneInfo(tz), template)
+
+        # the local times, which occur twice at the end of the summer time, are ambiguous, so
+        # only the formatted values have to match
+        strings = formatter.format_column(datetimes)
+        assert formatter.format_column(map(parser.parse, strings)) == strings
+        dt = datetime(2020, 7, 1, 12, 34, 56)
+        assert parser.parse(formatter.format_datetime(dt)) == dt
+        assert parser.parse("N/A") is None
@@ -3,7 +3,7 @@ from pathlib import Path
 import pytest
 from peewee import OperationalError, SqliteDatabase
 from timetracker.main import app
-from timetracker.models import MODELS, Project, Tag, Task
+from timetracker.models import MODELS, Project, Tag, Task, TaskToTag
 from typer.testing import CliRunner
 
 
@@ -30,6 +30,7 @@ class TestUnusedTag:
                 assert Project.select().count() == 3
                 assert Task.select().count() == 1
                 assert Tag.select().count() == 3
+                assert [tag.reference_count for tag in Tag.select()] == [1, 1, 1]
         except OperationalError:  # can occur when a table doesn't exist
             print("The database isn't initialized properly!")
 
@@ -56,3 +57,28 @@ class TestUnusedTag:
 
         assert result.exit_code == 0
         assert '"work" has been succesfully deleted!' in result.stdout
+
+
+    def test_reference_counts(self) -> None:
+        self.runner.invoke(app, ["-d", self.db_path, "create", "work", "-t", "interesting, new"])
+        self.runner.invoke(
+            app, ["-d", self.db_path, "start", "reading", "work", "-t", "interesting"]
+        )
+
+        try:
+            with self.db.bind_ctx(MODELS):
+                counts = dict(Tag.select(Tag.name, Tag.reference_count).tuples())
+                assert counts == {"interesting": 3, "new": 1}
+                TaskToTag.update(tag=Tag.get(Tag.name == "new")).execute()
+                counts = dict(Tag.select(Tag.name, Tag.reference_count).tuples())
+                assert counts == {"interesting": 2, "new": 2}
+        except OperationalError:  # can occur when a table doesn't exist
+            print("The database isn't initialized properly!")
+
+        result = self.runner.invoke(app, ["-d", self.db_path, "delete", "work", "-y"])
+
+        assert result.exit_code == 0
+        with self.db.bind_ctx(MODELS):
+            assert list(Tag.select(Tag.name, Tag.reference_count).tuples()) == [
+                ("interesting", 1)
+            ]